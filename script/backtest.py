@@ -1,13 +1,20 @@
+import os
+import sys
 import socket
-import pickle
 import json
+import sqlite3
 import numpy as np
-from sklearn.preprocessing import StandardScaler
+import pandas as pd
 
-# Load trained model from RF_model.py
-MODEL_FILE = "model/RF_model.pkl"
-with open(MODEL_FILE, "rb") as f:
-    model = pickle.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+from batchPredict import load_registered_model, get_feature_columns, load_predictions
+
+# Registered model (config.MODEL_REGISTRY) used for both the precomputed predictions and the row-by-row fallback
+PREDICTION_MODEL = "RandomForest"
+model, scaler, prediction_version = load_registered_model(PREDICTION_MODEL)
+with sqlite3.connect(config.DB_FILE) as conn:
+    feature_columns = get_feature_columns(conn, scaler)
 
 # Initial Trading Capital
 INITIAL_CASH = 100000  # Starting cash
@@ -24,8 +31,19 @@ client.connect((HOST, PORT))
 
 print(f"Connected to market data server at {HOST}:{PORT}\n")
 
-with open("model/scaler.pkl", "rb") as f:
-    scaler = pickle.load(f)
+def utc_timestamps(timestamps):
+    """"%Y-%m-%d %H:%M:%S" in UTC, for merged_data/predictions values ("...+00:00") and tcp_server's naive UTC strings alike."""
+    return pd.to_datetime(pd.Series(timestamps), utc=True).dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
+
+# Precomputed predictions from src/batchPredict.py, keyed by (symbol, UTC timestamp)
+try:
+    precomputed = load_predictions(prediction_version)
+    precomputed_predictions = dict(zip(zip(precomputed["symbol"], utc_timestamps(precomputed["timestamp"])), precomputed["predicted_next_open"]))
+    print(f"Loaded {len(precomputed_predictions)} precomputed predictions for {prediction_version}.")
+except Exception as e:
+    print(f"No precomputed predictions available ({e}). Predicting row by row.")
+    precomputed_predictions = {}
+precomputed_hits = precomputed_misses = 0
 
 def predict_next_open(features):
     """Predicts the next open price using a fixed scaler."""
@@ -93,18 +111,14 @@ try:
         # Store the latest market price
         latest_prices[symbol] = open_price 
 
-        # Extract features for prediction
-        feature_values = np.array([
-            open_price, float(market_data["high"]), float(market_data["low"]),
-            float(market_data["close"]), float(market_data["volume"]), float(market_data["trade_count"]),
-            float(market_data["SMA_20"]), float(market_data["SMA_50"]),
-            float(market_data["SMA_100"]), float(market_data["Volatility"]),
-            float(market_data["Bollinger_Upper"]), float(market_data["Bollinger_Lower"]),
-            float(market_data["weighted_sentiment"])
-        ])
-
-        # Predict next open price
-        predicted_next_open = predict_next_open(feature_values)
+        # Use the precomputed prediction when available, otherwise predict now from the same features batchPredict uses
+        predicted_next_open = precomputed_predictions.get((symbol, utc_timestamps([market_data["timestamp"]])[0]))
+        if predicted_next_open is None:
+            precomputed_misses += 1
+            feature_values = np.array([float(market_data[column]) for column in feature_columns])
+            predicted_next_open = predict_next_open(feature_values)
+        else:
+            precomputed_hits += 1
 
         # Execute trade if criteria met
         execute_trade(symbol, open_price, predicted_next_open)
@@ -141,6 +155,9 @@ finally:
         market_price = latest_prices.get(symbol, avg_price)
         print(f"{symbol}: {quantity} shares @ {market_price:.2f} (Avg Buy: {avg_price:.2f})")
 
+    if precomputed_hits + precomputed_misses:
+        print(f"\nPrecomputed predictions used for {precomputed_hits} of {precomputed_hits + precomputed_misses} rows "
+              f"({precomputed_hits / (precomputed_hits + precomputed_misses):.1%}).")
     print(f"\n💰 Final Cash: {cash:.2f}")
     print(f"📈 Total Portfolio Value: {final_value:.2f} (Initial: {INITIAL_CASH:.2f})")
     print(f"📉 Final Profit & Loss (PnL): {'+' if final_pnl >= 0 else '-'}{abs(final_pnl):.2f}")
@@ -0,0 +1,76 @@
+import os
+import sys
+import math
+import time
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+import services
+import executors
+import logConfig
+import rateLimiter
+import sentimentScoring
+from universe import Universe
+from blueSkySearchServer import BlueSkySearchServer
+
+# Wall time of one download_bluesky_posts() pass at several universe sizes and BLUESKY_CONCURRENCY
+# settings, against the local search stand-in (src/blueSkySearchServer.py) with a fixed latency
+
+async def download(server, port):
+    """Serves the stand-in on this loop (the SDK calls run on executor threads) and times one pass."""
+    import dataFromBlueSky
+    runner = await server.start(port=port)
+    try:
+        # Login and starting the scoring processes are not timed
+        await executors.run_blocking(services.get_bluesky_client, executor="bluesky")
+        await asyncio.gather(*(sentimentScoring.timed_batch(["warm up"], sentimentScoring.scorer_spec()) for _ in range(config.SENTIMENT_WORKERS)))
+        server.requests = server.max_in_flight = 0
+        start = time.perf_counter()
+        await dataFromBlueSky.download_bluesky_posts()
+        return time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+
+def bench(size, concurrency, latency, port, posts, max_pages):
+    services.provide("universe", Universe([f"SYM{i:04d}" for i in range(size)]))
+    services.reset("bluesky")
+    executors.shutdown()  # The "bluesky" pool is sized from config on first use
+    config.BLUESKY_CONCURRENCY = concurrency
+    config.BLUESKY_BASE_URL = f"http://127.0.0.1:{port}"
+    config.BLUESKY_USERNAME, config.BLUESKY_PASSWORD = "bench.bsky.social", "bench"
+    config.RATE_LIMITS = {**config.RATE_LIMITS, "bluesky": (10**9, 1, 1)}  # The stand-in has no quota to respect
+    rateLimiter.reset()
+    config.BLUESKY_MAX_PAGES = max_pages
+
+    server = BlueSkySearchServer(latency=latency, posts_per_query=posts)
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_FILE = os.path.join(tmp, "bench.db")
+        wall = asyncio.run(download(server, port))
+        executors.shutdown()
+        with sqlite3.connect(config.DB_FILE) as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM bluesky_posts").fetchone()[0]
+
+    return {"symbols": size, "concurrency": concurrency, "wall_s": wall, "searches": server.requests, "posts": stored,
+            "max_in_flight": server.max_in_flight, "ideal_s": math.ceil(size / concurrency) * math.ceil(stored / size / config.BLUESKY_PAGE_SIZE) * latency}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BlueSky fetch wall time vs universe size and concurrency")
+    parser.add_argument("-sizes", default="11,44", help="Comma-separated universe sizes")
+    parser.add_argument("-c", "--concurrency", default="1,4,8,16", help="Comma-separated BLUESKY_CONCURRENCY values")
+    parser.add_argument("-l", "--latency", type=float, default=0.2, help="Simulated search latency in seconds")
+    parser.add_argument("-n", "--posts", type=int, default=25, help="Posts matching each symbol's search window")
+    parser.add_argument("-pages", type=int, default=20, help="BLUESKY_MAX_PAGES (1 reads only the first page)")
+    parser.add_argument("-p", "--port", type=int, default=8091)
+    opt = parser.parse_args()
+
+    logConfig.set_level("WARN")
+    print(f"{'symbols':>8} {'threads':>8} {'searches':>9} {'posts':>7} {'in flight':>10} {'wall s':>8} {'ideal s':>8}")
+    for size in (int(size) for size in opt.sizes.split(",")):
+        for concurrency in (int(c) for c in opt.concurrency.split(",")):
+            result = bench(size, concurrency, opt.latency, opt.port, opt.posts, opt.pages)
+            print(f"{result['symbols']:>8} {result['concurrency']:>8} {result['searches']:>9} {result['posts']:>7} "
+                  f"{result['max_in_flight']:>10} {result['wall_s']:>8.2f} {result['ideal_s']:>8.2f}")
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+import services
+import executors
+import logConfig
+import sentimentScoring
+import blueSkyStream
+from universe import Universe, load_universe
+from jetstreamReplay import JetstreamReplay, synthetic_events
+
+# Streaming BlueSky ingestion (src/blueSkyStream.py) against the local Jetstream stand-in
+# (src/jetstreamReplay.py): keyword matching cost per event, end-to-end events/s, and the lag
+# from an event being sent to its post being stored, at several universe sizes
+
+def universe_of(size):
+    """The configured universe, padded with cashtag-only symbols up to `size`."""
+    base = load_universe()
+    extra = [f"SYM{i:04d}" for i in range(max(0, size - len(base)))]
+    return Universe(base.symbols + extra, {symbol: base.keywords[symbol] for symbol in base})
+
+def match_rate(events, matcher):
+    """Events parsed and matched per second, without the network or storage."""
+    messages = [f'{{"time_us":{i},' + json.dumps(event)[1:] for i, event in enumerate(events)]
+    start = time.perf_counter()
+    for message in messages:
+        post = blueSkyStream.parse_event(message)
+        if post is not None:
+            matcher.match(post[3])
+    return len(messages) / (time.perf_counter() - start)
+
+def lag_quantile(histogram, q):
+    """Upper bucket bound holding the q-quantile of a histogram's observations."""
+    child = histogram.labels()
+    target, cumulative = q * child.count, 0
+    for bound, count in zip(child.buckets, child.counts):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return float("inf")
+
+async def stream(replay, workers):
+    await replay.start()
+    try:
+        # The scoring processes are started outside the timing
+        await asyncio.gather(*(sentimentScoring.timed_batch(["warm up"], sentimentScoring.scorer_spec()) for _ in range(workers)))
+        start = time.perf_counter()
+        result = await blueSkyStream.stream_bluesky_posts(url=replay.url, stop_on_close=True, catch_up=False)
+        return result, time.perf_counter() - start
+    finally:
+        await replay.stop()
+
+def bench(size, events, opt):
+    universe = universe_of(size)
+    services.provide("universe", universe)
+    replay = JetstreamReplay(synthetic_events(universe.keywords, events, opt.match), port=opt.port,
+                             rate=opt.rate, disconnect_every=opt.disconnect)
+    matched_per_s = match_rate(synthetic_events(universe.keywords, min(events, 50000), opt.match, seed=1),
+                               blueSkyStream.KeywordMatcher(universe.keywords))
+
+    config.SENTIMENT_WORKERS = opt.workers
+    config.JETSTREAM_BATCH_SIZE = opt.batch_size
+    config.JETSTREAM_RECONNECT_DELAY = 0.1
+    config.JETSTREAM_REWIND = opt.rewind  # Replayed events get their time when first sent, much faster than live
+    blueSkyStream.STREAM_LAG.children.clear()
+    sentimentScoring.score_cache = sentimentScoring.ScoreCache()
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_FILE = os.path.join(tmp, "bench.db")
+        result, wall = asyncio.run(stream(replay, opt.workers))
+        executors.shutdown()
+        with sqlite3.connect(config.DB_FILE) as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM bluesky_posts").fetchone()[0]
+
+    return {"symbols": size, "match_per_s": matched_per_s, "events": replay.sent, "wall_s": wall,
+            "events_per_s": result.events / wall, "matched": result.matched, "stored": stored,
+            "lag_p50": lag_quantile(blueSkyStream.STREAM_LAG, 0.5), "lag_p99": lag_quantile(blueSkyStream.STREAM_LAG, 0.99)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming BlueSky ingestion throughput and lag")
+    parser.add_argument("-n", "--events", type=int, default=100000, help="Jetstream events to replay")
+    parser.add_argument("-sizes", default="11,1000,5000", help="Comma-separated universe sizes")
+    parser.add_argument("-m", "--match", type=float, default=0.02, help="Fraction of posts mentioning a keyword")
+    parser.add_argument("-r", "--rate", type=float, default=0.0, help="Events per second (0: as fast as read)")
+    parser.add_argument("-d", "--disconnect", type=int, default=0, help="Drop the connection every N events")
+    parser.add_argument("-rewind", type=float, default=0.1, help="JETSTREAM_REWIND seconds after a disconnect")
+    parser.add_argument("-w", "--workers", type=int, default=config.SENTIMENT_WORKERS, help="SENTIMENT_WORKERS")
+    parser.add_argument("-b", "--batch-size", type=int, default=config.JETSTREAM_BATCH_SIZE, dest="batch_size")
+    parser.add_argument("-p", "--port", type=int, default=8093)
+    opt = parser.parse_args()
+
+    logConfig.set_level("WARN")
+    print(f"{'symbols':>8} {'match/s':>9} {'events':>8} {'wall s':>7} {'events/s':>9} {'matched':>8} "
+          f"{'stored':>7} {'lag p50':>8} {'lag p99':>8}")
+    for size in (int(s) for s in opt.sizes.split(",")):
+        r = bench(size, opt.events, opt)
+        print(f"{r['symbols']:>8} {r['match_per_s']:>9.0f} {r['events']:>8} {r['wall_s']:>7.2f} {r['events_per_s']:>9.0f} "
+              f"{r['matched']:>8} {r['stored']:>7} {r['lag_p50']:>8g} {r['lag_p99']:>8g}")
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+import argparse
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+import dataFromBlueSky
+from blueSkySearchServer import WORDS, to_iso
+
+# bluesky_posts insert time: the old row-at-a-time path (IntegrityError per duplicate) against the
+# bulk INSERT OR IGNORE path, for a fresh window and for re-fetching a window already stored
+
+def make_posts(count, seed=0):
+    """PostView-shaped objects with the attributes save_posts_to_db reads."""
+    rng = random.Random(seed)
+    start = time.time() - 86400
+    return [SimpleNamespace(
+        author=SimpleNamespace(handle=f"user{rng.randrange(10000)}.bsky.social"),
+        record=SimpleNamespace(created_at=to_iso(start + i * 0.5), text=" ".join(rng.sample(WORDS, 6))),
+        like_count=rng.randrange(50), repost_count=rng.randrange(10), quote_count=rng.randrange(3), reply_count=rng.randrange(5),
+    ) for i in range(count)]
+
+def save_row_at_a_time(posts, keyword, scores):
+    """The insert loop save_posts_to_db used before the bulk path."""
+    with sqlite3.connect(config.DB_FILE) as conn:
+        cursor = conn.cursor()
+        for post, sentiment_score in sorted(zip(posts, scores), key=lambda item: item[0].record.created_at):
+            try:
+                cursor.execute("""
+                    INSERT INTO bluesky_posts (keyword, author, date, likes, shares, quotes, replies, text, sentiment_score)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, dataFromBlueSky.post_row(post, keyword, sentiment_score))
+            except sqlite3.IntegrityError:
+                continue
+        conn.commit()
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bluesky_posts insert throughput")
+    parser.add_argument("-n", "--posts", type=int, default=20000, help="Posts per window")
+    parser.add_argument("-page", type=int, default=100, help="Posts per insert call (one search page)")
+    opt = parser.parse_args()
+
+    posts = make_posts(opt.posts)
+    scores = [0.0] * len(posts)
+    pages = [(posts[i:i + opt.page], scores[i:i + opt.page]) for i in range(0, len(posts), opt.page)]
+    print(f"{len(posts)} posts in pages of {opt.page}")
+    print(f"{'path':>28} {'window':>9} {'wall s':>8} {'posts/s':>9} {'inserted':>9}")
+
+    def bulk(page_posts, keyword, page_scores):
+        return dataFromBlueSky.save_posts_to_db(page_posts, keyword, page_scores)[0]
+
+    def filtered(page_posts, keyword, page_scores):
+        # As fetch_window does: stored posts are dropped before scoring and inserting
+        new_posts = dataFromBlueSky.drop_stored_posts(page_posts, keyword)
+        return dataFromBlueSky.save_posts_to_db(new_posts, keyword, page_scores[:len(new_posts)])[0] if new_posts else 0
+
+    for name, save in (("row at a time", save_row_at_a_time), ("bulk insert or ignore", bulk),
+                       ("stored filter + bulk", filtered)):
+        with tempfile.TemporaryDirectory() as tmp:
+            config.DB_FILE = os.path.join(tmp, "bench.db")
+            dataFromBlueSky.initialize_db()
+            for window in ("new", "refetched"):
+                results, wall = timed(lambda: [save(page_posts, "SYM", page_scores) for page_posts, page_scores in pages])
+                inserted = sum(result or 0 for result in results)
+                print(f"{name:>28} {window:>9} {wall:>8.3f} {len(posts) / wall:>9.0f} {inserted if save is not save_row_at_a_time else '-':>9}")
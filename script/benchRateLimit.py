@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+import logConfig
+import rateLimiter
+from brokerClient import AsyncBroker
+from brokerServer import BrokerServer
+
+# Throughput of AsyncBroker against a local broker with a request quota (src/brokerServer.py -q),
+# with the shared token bucket (src/rateLimiter.py) and without it
+
+async def run(requests, limit, window, burst, port, limited):
+    rateLimiter.reset()
+    config.RATE_LIMITS = {**config.RATE_LIMITS, "alpaca_trading": (limit, window, burst) if limited else (10**9, 1, 1)}
+    server = BrokerServer(latency=0.01, quota=(limit, window))
+    runner = await server.start(port=port)
+    url = f"http://127.0.0.1:{port}"
+    broker = AsyncBroker(key="bench", secret="bench", trading_url=url, data_url=url, per_endpoint=requests)
+    try:
+        # Start on a window boundary, so the first window is not shared with the previous run
+        await asyncio.sleep(window - time.time() % window)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(broker.get_account() for _ in range(requests)), return_exceptions=True)
+        wall = time.perf_counter() - start
+    finally:
+        await broker.close()
+        await runner.cleanup()
+
+    failed = sum(isinstance(result, Exception) for result in results)
+    return {"mode": "limiter" if limited else "none", "ok": requests - failed, "failed": failed,
+            "rate_limited": server.rate_limited, "wall_s": wall, "per_s": (requests - failed) / wall}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rate-limited request throughput against a local quota")
+    parser.add_argument("-n", "--requests", type=int, default=300, help="Concurrent get_account() calls")
+    parser.add_argument("-q", "--quota", default="50/2", help="Server quota as requests/window seconds")
+    parser.add_argument("-b", "--burst", type=int, default=5, help="Token bucket burst")
+    parser.add_argument("-p", "--port", type=int, default=8092)
+    opt = parser.parse_args()
+
+    logConfig.set_level("WARN")
+    limit, window = (float(part) for part in opt.quota.split("/"))
+    print(f"Quota {limit:.0f} requests / {window:g} s = {limit / window:.1f} requests/s")
+    print(f"{'mode':>8} {'ok':>6} {'failed':>7} {'429s':>6} {'wall s':>8} {'ok/s':>7}")
+    for limited in (True, False):
+        result = asyncio.run(run(opt.requests, int(limit), window, opt.burst, opt.port, limited))
+        print(f"{result['mode']:>8} {result['ok']:>6} {result['failed']:>7} {result['rate_limited']:>6} "
+              f"{result['wall_s']:>8.2f} {result['per_s']:>7.1f}")
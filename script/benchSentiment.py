@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+import services
+import executors
+import logConfig
+import sentimentScoring
+from blueSkySearchServer import WORDS
+
+# Sentiment scoring throughput: one post at a time (the old inline path) against the batched
+# process-pool stage with its text cache, on stored bluesky_posts or generated posts
+
+def load_texts(db_file, limit):
+    with sqlite3.connect(db_file) as conn:
+        return [row[0] for row in conn.execute("SELECT text FROM bluesky_posts WHERE text IS NOT NULL LIMIT ?", (limit,))]
+
+def synthetic_texts(count, repeat, seed=0):
+    """Posts of 8-40 words; a `repeat` fraction re-posts an earlier text with different spacing."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        if texts and rng.random() < repeat:
+            texts.append("  ".join(rng.choice(texts).split(" ")) + "\n")
+        else:
+            texts.append(" ".join(rng.choice(WORDS + ["the", "stock", "is", "today", "$AAPL", "really"])
+                                  for _ in range(rng.randint(8, 40))))
+    return texts
+
+async def warm_up(workers):
+    await asyncio.gather(*(sentimentScoring.timed_batch(["warm up"], sentimentScoring.scorer_spec()) for _ in range(workers)))
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentiment scoring throughput")
+    parser.add_argument("-n", "--texts", type=int, default=20000, help="Texts to score")
+    parser.add_argument("-repeat", type=float, default=0.3, help="Fraction of repeated generated texts")
+    parser.add_argument("-db", help="Score bluesky_posts.text from this database instead of generated posts")
+    parser.add_argument("-w", "--workers", default="0,1,2,4", help="Comma-separated SENTIMENT_WORKERS values")
+    parser.add_argument("-b", "--batch-size", type=int, default=256, dest="batch_size")
+    opt = parser.parse_args()
+
+    logConfig.set_level("WARN")
+    texts = load_texts(opt.db, opt.texts) if opt.db else synthetic_texts(opt.texts, opt.repeat)
+    distinct = len({sentimentScoring.normalize_text(text) for text in texts})
+    print(f"{len(texts)} texts, {distinct} distinct after normalization, {os.cpu_count()} CPUs")
+
+    analyzer = services.get_sentiment_analyzer()
+    inline, wall = timed(lambda: [analyzer.polarity_scores(text)["compound"] for text in texts])
+    print(f"{'mode':>22} {'wall s':>8} {'texts/s':>9}")
+    print(f"{'inline, per post':>22} {wall:>8.2f} {len(texts) / wall:>9.0f}")
+
+    for workers in (int(w) for w in opt.workers.split(",")):
+        config.SENTIMENT_WORKERS = workers
+        executors.shutdown()
+        if workers:
+            # Start the worker processes outside the timing
+            asyncio.run(warm_up(workers))
+        for run in ("cold", "warm"):
+            if run == "cold":
+                sentimentScoring.score_cache = sentimentScoring.ScoreCache()
+            scores, wall = timed(lambda: asyncio.run(sentimentScoring.score_texts(texts, opt.batch_size)))
+            mismatches = sum(abs(a - b) > 1e-9 for a, b in zip(scores, inline))
+            label = f"{workers} workers, {run} cache" if workers else f"thread, {run} cache"
+            print(f"{label:>22} {wall:>8.2f} {len(texts) / wall:>9.0f}" + (f"  ({mismatches} scores differ)" if mismatches else ""))
+    executors.shutdown()
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import multiprocessing as mp
+import websockets
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+import services
+import logConfig
+from universe import Universe
+
+# Per-bar ingestion cost (WebSocket message -> price service / tracer / metrics -> SQLite write)
+# at several universe sizes, against the local replay feed (src/replayFeed.py) in its own process
+
+def run_feed(symbols, steps, port, batch_size):
+    from replayFeed import ReplayFeed, synthetic_bars
+
+    async def serve():
+        feed = ReplayFeed(synthetic_bars(symbols, steps), port=port, batch_size=batch_size)
+        await feed.start()
+        await asyncio.Future()
+
+    asyncio.run(serve())
+
+async def ingest(expected):
+    """Runs the live WebSocket handler until the feed closes; returns (bars, wall seconds, CPU seconds)."""
+    import dataFromAlpaca
+    bars = 0
+    started = first_time = None
+
+    def count(bar):
+        # Timed from the first stored bar, so the handshake is excluded; bars of that first bar time are not counted
+        nonlocal bars, started, first_time
+        if started is None:
+            started, first_time = (time.perf_counter(), time.process_time()), bar["t"]
+        if bar["t"] != first_time:
+            bars += 1
+
+    try:
+        # A bar sink stops the handler from running indicator computation, so only ingestion is timed
+        await dataFromAlpaca.alpaca_ws_handler(bar_sink=count)
+    except websockets.ConnectionClosed:
+        pass
+    wall, cpu = time.perf_counter() - started[0], time.process_time() - started[1]
+    if bars != expected:
+        print(f"[WARN] Expected {expected} bars, ingested {bars}")
+    return bars, wall, cpu
+
+def bench(size, steps, port, batch_size):
+    symbols = [f"SYM{i:04d}" for i in range(size)]
+    services.provide("universe", Universe(symbols))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_FILE = os.path.join(tmp, "bench.db")
+        import dataFromAlpaca
+        from tracing import tracer
+        dataFromAlpaca.create_table()
+        tracer.db_file, tracer.table_ready = config.DB_FILE, False
+
+        feed = mp.get_context("spawn").Process(target=run_feed, args=(symbols, steps, port, batch_size), daemon=True)
+        feed.start()
+        config.ALPACA_STREAM_URL = f"ws://127.0.0.1:{port}"
+        for _ in range(100):  # Wait for the feed to listen
+            try:
+                bars, wall, cpu = asyncio.run(ingest(size * (steps - 1)))
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("Replay feed did not start")
+        feed.terminate()
+        feed.join()
+        tracer.flush()  # Before the temporary database goes away
+
+    return {"symbols": size, "bars": bars, "wall_s": wall, "us_per_bar": wall / bars * 1e6,
+            "cpu_us_per_bar": cpu / bars * 1e6, "bars_per_s": bars / wall}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-bar ingestion cost at several universe sizes")
+    parser.add_argument("-sizes", default="10,100,1000", help="Comma-separated universe sizes")
+    parser.add_argument("-steps", type=int, default=50, help="Bar times replayed per size")
+    parser.add_argument("-b", "--batch-size", type=int, default=1000, dest="batch_size",
+                        help="Bars per WebSocket message (1 reproduces one write per bar)")
+    parser.add_argument("-p", "--port", type=int, default=8767)
+    opt = parser.parse_args()
+
+    logConfig.set_level("WARN")
+    print(f"{'symbols':>8} {'bars':>8} {'wall s':>8} {'us/bar':>8} {'cpu us/bar':>11} {'bars/s':>9}")
+    for size in (int(size) for size in opt.sizes.split(",")):
+        result = bench(size, opt.steps, opt.port, opt.batch_size)
+        print(f"{result['symbols']:>8} {result['bars']:>8} {result['wall_s']:>8.2f} {result['us_per_bar']:>8.1f} "
+              f"{result['cpu_us_per_bar']:>11.1f} {result['bars_per_s']:>9.0f}")
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from compiledModel import compile_model
+
+# Checks that the compiled predictor matches sklearn/XGBoost and compares single-row latency
+DB_FILE = "data/trade_data.db"
+MODELS = ["RandomForest", "RandomForest_Tuned", "XGBoost", "LinearRegression"]
+TOLERANCE = 1e-3  # XGBoost sums leaves in float32
+ROWS = 2000
+
+with open("model/scaler.pkl", "rb") as f:
+    scaler = pickle.load(f)
+features = list(scaler.feature_names_in_)
+
+conn = sqlite3.connect(DB_FILE)
+df = pd.read_sql(f"SELECT * FROM merged_data ORDER BY timestamp DESC LIMIT {ROWS}", conn)
+conn.close()
+
+X_raw = df[features].apply(pd.to_numeric, errors="coerce").dropna().to_numpy(dtype=np.float64)
+X_scaled = scaler.transform(pd.DataFrame(X_raw, columns=features))
+
+failed = False
+for model_name in MODELS:
+    path = f"model/{model_name}.pkl"
+    if not os.path.exists(path):
+        continue
+
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+    compiled = compile_model(model, scaler)
+
+    expected = np.asarray(model.predict(X_scaled), dtype=np.float64).ravel()
+    batch = compiled.predict(X_raw)
+    single = np.array([compiled.predict_one(row) for row in X_raw[:200]])
+    max_diff = max(np.abs(expected - batch).max(), np.abs(expected[:200] - single).max())
+
+    start = time.perf_counter()
+    for row in X_raw[:200]:
+        model.predict(scaler.transform(pd.DataFrame([row], columns=features)))
+    library_us = (time.perf_counter() - start) / 200 * 1e6
+
+    start = time.perf_counter()
+    for row in X_raw[:200]:
+        compiled.predict_one(row)
+    compiled_us = (time.perf_counter() - start) / 200 * 1e6
+
+    status = "OK" if max_diff <= TOLERANCE else "MISMATCH"
+    failed |= status != "OK"
+    print(f"{model_name}: {status} | rows: {len(X_raw)} | max diff: {max_diff:.2e} | "
+          f"single row: {library_us:.0f}us -> {compiled_us:.0f}us")
+
+sys.exit(1 if failed else 0)
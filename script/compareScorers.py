@@ -0,0 +1,84 @@
+import os
+import sys
+import csv
+import time
+import sqlite3
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+from scheduler import timeframe_seconds
+from sentimentScoring import VaderScorer, TransformerScorer, normalize_text
+
+# Throughput and agreement of the transformer sentiment backend against VADER on stored
+# bluesky_posts, and accuracy of both on a labeled CSV (text,label) if one is given
+
+def load_posts(db_file, limit):
+    with sqlite3.connect(db_file) as conn:
+        rows = conn.execute("SELECT text FROM bluesky_posts WHERE text IS NOT NULL AND text != '' LIMIT ?", (limit,)).fetchall()
+    return list(dict.fromkeys(normalize_text(row[0]) for row in rows))  # Distinct texts, as the cache would score them
+
+def load_labels(path):
+    """(texts, labels in {-1, 0, 1}) from a CSV with text and label (negative/neutral/positive or -1/0/1) columns."""
+    names = {"negative": -1, "neutral": 0, "positive": 1}
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    labels = [row["label"].strip().lower() for row in rows]
+    return [normalize_text(row["text"]) for row in rows], np.array([names[label] if label in names else int(label) for label in labels])
+
+def classes(scores, neutral_band):
+    scores = np.asarray(scores)
+    return np.where(scores > neutral_band, 1, np.where(scores < -neutral_band, -1, 0))
+
+def timed_score(scorer, texts):
+    start = time.perf_counter()
+    scores = scorer.score(texts)
+    return np.array(scores), time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transformer vs VADER sentiment on stored posts")
+    parser.add_argument("-db", default=config.DB_FILE)
+    parser.add_argument("-n", "--posts", type=int, default=2000, help="Stored posts to score")
+    parser.add_argument("-labels", help="CSV with text,label columns for accuracy")
+    parser.add_argument("-model", default=config.TRANSFORMER_MODEL)
+    parser.add_argument("-threads", default="1,2,4", help="Comma-separated torch thread counts")
+    parser.add_argument("-b", "--batch-size", type=int, default=config.TRANSFORMER_BATCH_SIZE, dest="batch_size")
+    parser.add_argument("-l", "--max-length", type=int, default=config.TRANSFORMER_MAX_LENGTH, dest="max_length")
+    parser.add_argument("-neutral", type=float, default=0.05, help="|score| at or below this counts as neutral")
+    opt = parser.parse_args()
+
+    texts = load_posts(opt.db, opt.posts)
+    if not texts:
+        sys.exit(f"No posts with text in {opt.db}: run the BlueSky fetch first")
+    budget = timeframe_seconds(config.TIMEFRAME)
+    print(f"{len(texts)} distinct posts, mean {np.mean([len(text) for text in texts]):.0f} characters; "
+          f"refresh budget {budget} s ({config.TIMEFRAME})")
+    print(f"{'backend':>34} {'wall s':>8} {'posts/s':>9} {'posts/budget':>13} {'sign agree':>11} {'corr':>6}")
+
+    vader = VaderScorer()
+    vader_scores, wall = timed_score(vader, texts)
+    print(f"{'vader':>34} {wall:>8.2f} {len(texts) / wall:>9.0f} {len(texts) / wall * budget:>13.0f}")
+
+    runs = [(int(threads), True) for threads in opt.threads.split(",")]
+    runs.append((runs[-1][0], False))  # Same threads without length sorting, to show the padding cost
+    transformer = None
+    for threads, sort_by_length in runs:
+        scorer = TransformerScorer(opt.model, opt.max_length, threads, opt.batch_size, sort_by_length)
+        scorer.score(texts[:opt.batch_size])  # Warm up outside the timing
+        scores, wall = timed_score(scorer, texts)
+        agree = np.mean(classes(scores, opt.neutral) == classes(vader_scores, opt.neutral))
+        corr = np.corrcoef(scores, vader_scores)[0, 1]
+        label = f"transformer, {threads} threads" + ("" if sort_by_length else ", unsorted")
+        print(f"{label:>34} {wall:>8.2f} {len(texts) / wall:>9.0f} {len(texts) / wall * budget:>13.0f} "
+              f"{agree:>11.1%} {corr:>6.2f}")
+        transformer = scorer if sort_by_length else transformer
+
+    if opt.labels:
+        label_texts, labels = load_labels(opt.labels)
+        two_class = not (labels == 0).any()
+        print(f"\nAccuracy on {len(labels)} labeled texts ({'positive/negative' if two_class else 'three classes'}):")
+        for name, scorer in (("vader", vader), ("transformer", transformer)):
+            scores = np.array(scorer.score(label_texts))
+            predicted = np.where(scores >= 0, 1, -1) if two_class else classes(scores, opt.neutral)
+            print(f"{name:>34} {np.mean(predicted == labels):>8.1%}")
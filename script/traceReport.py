@@ -0,0 +1,75 @@
+import os
+import sys
+import sqlite3
+import argparse
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import config
+from tracing import STAGES
+
+# p50/p95/p99 latency per pipeline stage from the trace_events table written by src/tracing.py
+
+def load_events(db_file, hours=None):
+    query = "SELECT trace_id, symbol, stage, ts_ns FROM trace_events"
+    params = []
+    if hours:
+        query += " WHERE ts_ns >= ?"
+        params.append(int((pd.Timestamp.now(tz="UTC") - pd.Timedelta(hours=hours)).value))
+    with sqlite3.connect(db_file) as conn:
+        return pd.read_sql(query, conn, params=params)
+
+def stage_latencies(events):
+    """Time spent reaching each stage from the previous stage of the same trace, in ms."""
+    events = events.sort_values(["trace_id", "ts_ns"])
+    events["ms"] = events.groupby("trace_id")["ts_ns"].diff() / 1e6
+    return events.dropna(subset=["ms"])
+
+def end_to_end(events):
+    """Bar arrival to last recorded stage per complete trace, in ms."""
+    spans = events.groupby("trace_id").agg(start=("ts_ns", "min"), end=("ts_ns", "max"), last=("stage", "last"))
+    spans = spans[spans["last"].isin(["decided", "submitted"])]
+    return (spans["end"] - spans["start"]) / 1e6
+
+def percentiles(values):
+    return {"count": len(values), "p50": values.quantile(0.5), "p95": values.quantile(0.95),
+            "p99": values.quantile(0.99), "max": values.max()}
+
+def main(opt):
+    try:
+        events = load_events(opt.db, opt.hours)
+    except Exception as e:
+        print(f"[ERROR] Could not read trace_events: {e}")
+        return 1
+    if events.empty:
+        print("[INFO] No trace events recorded yet.")
+        return 0
+
+    latencies = stage_latencies(events)
+    rows = []
+    for stage in STAGES[1:]:
+        values = latencies.loc[latencies["stage"] == stage, "ms"]
+        if len(values):
+            rows.append({"stage": stage, **percentiles(values)})
+
+    report = pd.DataFrame(rows).set_index("stage")
+    total = end_to_end(events)
+    if len(total):
+        report.loc["end_to_end"] = percentiles(total)
+
+    print(f"Traces: {events['trace_id'].nunique()} | Events: {len(events)}")
+    print("Latency per stage (ms, time since the previous stage):")
+    print(report.round(2).to_string())
+
+    if len(rows):
+        slowest = max(rows, key=lambda row: row["p50"] * row["count"])
+        print(f"\nLargest share of time: {slowest['stage']} (p50 {slowest['p50']:.1f} ms over {slowest['count']} events)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="usage: traceReport [-db data/trade_data.db] [-hours 24]")
+    parser.add_argument("-db", action="store", dest="db", default=config.DB_FILE)
+    parser.add_argument("-hours", action="store", dest="hours", type=float, help="Only traces from the last N hours")
+
+    sys.exit(main(parser.parse_args()))
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import time
 import pickle
@@ -8,6 +9,9 @@ from sklearn.preprocessing import StandardScaler
 from dotenv import load_dotenv
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from priceService import PriceService
+
 dotenv_path = os.path.expanduser("~/.secrets/.env")
 load_dotenv(dotenv_path)
 api_key = os.getenv("alpaca_api_key")
@@ -19,6 +23,8 @@ print("Successfully loaded Alpaca secrets.")
 # Initialize Alpaca API Client
 api = tradeapi.REST(api_key, api_secret, base_url, api_version="v2")
 
+# Last prices per symbol; stale symbols are refreshed together with one snapshot request
+price_service = PriceService()
 
 # Load Trained Model & Scaler
 MODEL_FILE = "model/RF_model.pkl"
@@ -51,11 +57,11 @@ def predict_next_open(features):
 # Function: Get Latest Market Prices
 def get_latest_price(symbol):
     """Fetches the latest price from Alpaca."""
-    try:
-        return float(api.get_latest_trade(symbol).price)
-    except Exception as e:
-        print(f"Error fetching price for {symbol}: {e}")
-        return None
+    return get_latest_prices([symbol]).get(symbol)
+
+def get_latest_prices(symbols):
+    """Fetches the latest prices for many symbols with one snapshot request: {symbol: price}."""
+    return price_service.get_prices_sync(symbols, api)
 pending_orders = {}
 
 def execute_trade(symbol, open_price, predicted_next_open):
@@ -132,12 +138,15 @@ def update_positions():
                 print(f"SELL FILLED: {qty} shares of {symbol} at {price:.2f}")
 
 # Function: Calculate Portfolio Value
-def calculate_portfolio_value():
+def calculate_portfolio_value(market_prices=None):
     """Calculates total portfolio value using real-time Alpaca prices."""
+    if market_prices is None:
+        market_prices = get_latest_prices(list(positions))
+
     portfolio_value = cash
     for symbol, position in positions.items():
         quantity = position["quantity"]
-        market_price = get_latest_price(symbol)
+        market_price = market_prices.get(symbol)
         if market_price:
             portfolio_value += quantity * market_price
     return portfolio_value
@@ -146,8 +155,9 @@ def calculate_portfolio_value():
 def trading_loop(symbols, interval=60):
     """Runs the trading bot in a loop, polling for new data."""
     while True:
+        latest_prices = get_latest_prices(symbols)
         for symbol in symbols:
-            open_price = get_latest_price(symbol)
+            open_price = latest_prices.get(symbol)
             if open_price is None:
                 continue
 
@@ -168,8 +178,9 @@ def trading_loop(symbols, interval=60):
         time.sleep(interval)
         update_positions()
 
-        # Calculate and print portfolio value
-        portfolio_value = calculate_portfolio_value()
+        # Calculate and print portfolio value (one price request for all holdings)
+        market_prices = get_latest_prices(list(positions))
+        portfolio_value = calculate_portfolio_value(market_prices)
         pnl = portfolio_value - INITIAL_CASH
 
         print("\nMarket Update:")
@@ -178,7 +189,7 @@ def trading_loop(symbols, interval=60):
         print("\nCurrent Holdings:")
         for sym, position in positions.items():
             quantity = position["quantity"]
-            market_price = get_latest_price(sym)
+            market_price = market_prices.get(sym)
             if market_price:
                 print(f"  - {sym}: {quantity} shares @ {market_price:.2f}")
 
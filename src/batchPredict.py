@@ -0,0 +1,244 @@
+import os
+import pickle
+import sqlite3
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+import config
+import logConfig
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+### =========================
+###   MODEL REGISTRY
+### =========================
+
+def get_model_version(model_name):
+    """Version string for a registered model: its name plus a hash of the model and scaler files."""
+    hasher = hashlib.sha256()
+    for path in (config.MODEL_REGISTRY[model_name], config.SCALER_FILE):
+        with open(path, "rb") as f:
+            hasher.update(f.read())
+    return f"{model_name}-{hasher.hexdigest()[:10]}"
+
+def load_registered_model(model_name):
+    """Load a registered model together with the scaler it was trained with."""
+    if model_name not in config.MODEL_REGISTRY:
+        raise ValueError(f"Unknown model {model_name}. Registered models: {list(config.MODEL_REGISTRY)}")
+
+    with open(config.MODEL_REGISTRY[model_name], "rb") as f:
+        model = pickle.load(f)
+    with open(config.SCALER_FILE, "rb") as f:
+        scaler = pickle.load(f)
+
+    return model, scaler, get_model_version(model_name)
+
+def get_feature_columns(conn, scaler):
+    """Feature columns in the order the scaler was fitted on."""
+    if hasattr(scaler, "feature_names_in_"):
+        return list(scaler.feature_names_in_)
+
+    cursor = conn.execute("PRAGMA table_info(merged_data);")
+    return [col[1] for col in cursor.fetchall() if col[1] not in ("timestamp", "symbol", "trade_count")]
+
+### =========================
+###   DATABASE FUNCTIONS
+### =========================
+
+def create_predictions_table(conn):
+    """Create the predictions table if it does not exist."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS predictions (
+            model_version TEXT,
+            symbol TEXT,
+            timestamp TEXT,
+            predicted_next_open REAL,
+            created_at TEXT,
+            PRIMARY KEY (model_version, symbol, timestamp)
+        )
+    """)
+    conn.commit()
+
+def upsert_predictions(conn, model_version, predictions_df):
+    """Insert or update predictions for one model version in a single transaction."""
+    created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    rows = zip(
+        [model_version] * len(predictions_df),
+        predictions_df["symbol"].tolist(),
+        predictions_df["timestamp"].tolist(),
+        predictions_df["predicted_next_open"].astype(float).tolist(),
+        [created_at] * len(predictions_df),
+    )
+    with conn:
+        conn.executemany("""
+            INSERT INTO predictions (model_version, symbol, timestamp, predicted_next_open, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (model_version, symbol, timestamp) DO UPDATE SET
+                predicted_next_open = excluded.predicted_next_open,
+                created_at = excluded.created_at
+        """, rows)
+
+def get_symbols(conn):
+    """All symbols present in merged_data."""
+    return [row[0] for row in conn.execute("SELECT DISTINCT symbol FROM merged_data")]
+
+def load_predictions(model_version, symbol=None, since=None, until=None):
+    """Read precomputed predictions for a model version as a DataFrame."""
+    query = "SELECT symbol, timestamp, predicted_next_open FROM predictions WHERE model_version = ?"
+    params = [model_version]
+    if symbol:
+        query += " AND symbol = ?"
+        params.append(symbol)
+    if since:
+        query += " AND timestamp >= ?"
+        params.append(since)
+    if until:
+        query += " AND timestamp <= ?"
+        params.append(until)
+    query += " ORDER BY symbol, timestamp"
+
+    with sqlite3.connect(config.DB_FILE) as conn:
+        return pd.read_sql(query, conn, params=params)
+
+### =========================
+###   BATCH SCORING
+### =========================
+
+def score_symbol(model, scaler, feature_columns, symbol, since, until, chunk_size):
+    """Score every merged_data row of one symbol in the date range, in vectorized chunks."""
+    column_sql = ", ".join(f'"{col}"' for col in feature_columns)
+    query = f"""
+        SELECT symbol, timestamp, {column_sql}
+        FROM merged_data
+        WHERE symbol = ? AND timestamp >= ? AND timestamp <= ?
+        ORDER BY timestamp
+    """
+
+    results = []
+    # Each worker thread uses its own connection; SQLite connections are not shared across threads
+    with sqlite3.connect(config.DB_FILE) as conn:
+        for chunk in pd.read_sql(query, conn, params=(symbol, since, until), chunksize=chunk_size):
+            X = chunk[feature_columns].apply(pd.to_numeric, errors="coerce")
+            valid = X.notna().all(axis=1).to_numpy()
+            if not valid.any():
+                continue
+
+            predicted = model.predict(scaler.transform(X[valid]))
+            results.append(pd.DataFrame({
+                "symbol": chunk["symbol"].to_numpy()[valid],
+                "timestamp": chunk["timestamp"].to_numpy()[valid],
+                "predicted_next_open": np.asarray(predicted, dtype=float).ravel(),
+            }))
+
+    if not results:
+        return pd.DataFrame(columns=["symbol", "timestamp", "predicted_next_open"])
+    return pd.concat(results, ignore_index=True)
+
+def run_batch_predictions(model_name, since=None, until=None, symbols=None, chunk_size=None, max_workers=None):
+    """Score a registered model over a date range of merged_data and upsert into the predictions table."""
+    chunk_size = chunk_size or config.BATCH_PREDICT_CHUNK_SIZE
+    max_workers = max_workers or config.BATCH_PREDICT_WORKERS
+    since = since or "0000-01-01"
+    until = until or "9999-12-31"
+
+    model, scaler, model_version = load_registered_model(model_name)
+
+    with sqlite3.connect(config.DB_FILE) as conn:
+        create_predictions_table(conn)
+        feature_columns = get_feature_columns(conn, scaler)
+        symbols = symbols or get_symbols(conn)
+
+        print(f"[INFO] Scoring {model_version} on {len(symbols)} symbols from {since} to {until}...")
+
+        total = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(score_symbol, model, scaler, feature_columns, symbol, since, until, chunk_size): symbol
+                for symbol in symbols
+            }
+            # Writes stay on this thread; SQLite allows one writer at a time anyway
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    predictions_df = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Batch scoring failed for {symbol}: {e}")
+                    continue
+
+                if not predictions_df.empty:
+                    upsert_predictions(conn, model_version, predictions_df)
+                    total += len(predictions_df)
+                if logConfig.INFO:
+                    print(f"[INFO] {symbol}: {len(predictions_df)} predictions stored.")
+
+    print(f"[INFO] Stored {total} predictions for {model_version}.")
+    return model_version
+
+### =========================
+###   MODEL COMPARISON
+### =========================
+
+def compare_models(model_versions, since=None, until=None):
+    """Compare stored predictions of several model versions against the actual next open."""
+    placeholders = ", ".join("?" for _ in model_versions)
+    query = f"""
+        WITH actual AS (
+            SELECT symbol, timestamp, open,
+                   LEAD(open) OVER (PARTITION BY symbol ORDER BY timestamp) AS next_open
+            FROM merged_data
+        )
+        SELECT p.model_version, p.symbol, p.timestamp, p.predicted_next_open, a.open, a.next_open
+        FROM predictions p
+        JOIN actual a ON a.symbol = p.symbol AND a.timestamp = p.timestamp
+        WHERE p.model_version IN ({placeholders})
+          AND a.next_open IS NOT NULL
+          AND p.timestamp >= ? AND p.timestamp <= ?
+    """
+    params = list(model_versions) + [since or "0000-01-01", until or "9999-12-31"]
+
+    with sqlite3.connect(config.DB_FILE) as conn:
+        df = pd.read_sql(query, conn, params=params)
+
+    error = df["predicted_next_open"] - df["next_open"]
+    df["abs_error"] = error.abs()
+    df["sq_error"] = error ** 2
+    df["direction_correct"] = (
+        np.sign(df["next_open"] - df["open"]) == np.sign(df["predicted_next_open"] - df["open"])
+    ).astype(int)
+
+    summary = df.groupby("model_version").agg(
+        rows=("abs_error", "size"),
+        MAE=("abs_error", "mean"),
+        RMSE=("sq_error", lambda s: np.sqrt(s.mean())),
+        directional_accuracy=("direction_correct", "mean"),
+    )
+    return summary
+
+### =========================
+###   MAIN EXECUTION
+### =========================
+
+def parse_arguments():
+    """Parses command-line arguments for batch scoring."""
+    parser = argparse.ArgumentParser(description="Score registered models over merged_data and store the predictions")
+    parser.add_argument("-models", nargs="+", default=list(config.MODEL_REGISTRY), choices=list(config.MODEL_REGISTRY), help="Registered models to score")
+    parser.add_argument("-since", type=str, help="The start timestamp (YYYY-MM-DD [HH:MM:SS])")
+    parser.add_argument("-until", type=str, help="The end timestamp (YYYY-MM-DD [HH:MM:SS])")
+    parser.add_argument("-symbols", nargs="+", help="Symbols to score (default: all in merged_data)")
+    parser.add_argument("-workers", type=int, default=config.BATCH_PREDICT_WORKERS, help="Parallel symbol workers")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    versions = []
+    for model_name in args.models:
+        if not os.path.exists(config.MODEL_REGISTRY[model_name]):
+            print(f"[WARN] {config.MODEL_REGISTRY[model_name]} not found. Skipping {model_name}.")
+            continue
+        versions.append(run_batch_predictions(model_name, args.since, args.until, args.symbols, max_workers=args.workers))
+
+    if versions:
+        print("\nModel comparison:")
+        print(compare_models(versions, args.since, args.until).to_string())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+import hashlib
+from datetime import datetime, timezone
+from aiohttp import web
+
+# Local HTTP stand-in for the BlueSky XRPC endpoints used by dataFromBlueSky.py (login and searchPosts),
+# pointed at with BLUESKY_BASE_URL, for benchmarks and offline runs
+
+WORDS = ["beats", "misses", "great", "terrible", "earnings", "guidance", "buying", "selling", "calls", "puts",
+         "bullish", "bearish", "strong", "weak", "upgrade", "downgrade", "love", "hate", "rally", "crash"]
+
+def unsigned_jwt(subject, lifetime=3600):
+    """A JWT the atproto client can read the expiry from; the signature is not checked by clients."""
+    encode = lambda part: base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+    now = int(time.time())
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode({'sub': subject, 'iat': now, 'exp': now + lifetime})}.sig"
+
+def to_iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-4] + "Z"
+
+def parse_iso(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+class BlueSkySearchServer:
+    """Answers searchPosts with cursor-paged generated posts after a configurable latency, counting requests in flight."""
+
+    def __init__(self, latency=0.2, posts_per_query=25, rate_limit_probability=0.0):
+        self.latency = latency
+        self.posts_per_query = posts_per_query
+        self.rate_limit_probability = rate_limit_probability
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        """Adds simulated latency and random 429 responses, tracking peak concurrency."""
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if random.random() < self.rate_limit_probability:
+                return web.json_response({"error": "RateLimitExceeded", "message": "Rate Limit Exceeded"}, status=429,
+                                         headers={"RateLimit-Limit": "3000", "RateLimit-Remaining": "0",
+                                                  "RateLimit-Reset": str(int(time.time()) + 1)})
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    async def create_session(self, request):
+        identifier = (await request.json()).get("identifier", "bench.bsky.social")
+        did = f"did:plc:{hashlib.sha1(identifier.encode()).hexdigest()[:24]}"
+        return web.json_response({"did": did, "handle": identifier, "active": True,
+                                  "accessJwt": unsigned_jwt(did), "refreshJwt": unsigned_jwt(did, 86400)})
+
+    async def get_profile(self, request):
+        actor = request.query.get("actor", "bench.bsky.social")
+        return web.json_response({"did": f"did:plc:{hashlib.sha1(actor.encode()).hexdigest()[:24]}", "handle": actor})
+
+    def post(self, keyword, created, rng):
+        """One PostView: author, text mentioning the keyword, engagement counts."""
+        author = rng.randrange(10000)
+        did = f"did:plc:author{author:06d}"
+        rkey = hashlib.sha1(f"{keyword}{created}{author}".encode()).hexdigest()[:13]
+        return {
+            "uri": f"at://{did}/app.bsky.feed.post/{rkey}",
+            "cid": f"bafyrei{rkey}",
+            "author": {"did": did, "handle": f"user{author}.bsky.social"},
+            "record": {"$type": "app.bsky.feed.post", "text": f"{keyword} {' '.join(rng.sample(WORDS, 4))}",
+                       "createdAt": to_iso(created), "langs": ["en"]},
+            "indexedAt": to_iso(created),
+            "likeCount": rng.randrange(50), "repostCount": rng.randrange(10),
+            "quoteCount": rng.randrange(3), "replyCount": rng.randrange(5),
+        }
+
+    async def search_posts(self, request):
+        """Pages through `posts_per_query` posts spread over (since, until], newest first like sort=latest."""
+        query = request.query.get("q", "")
+        until = parse_iso(request.query["until"]) if "until" in request.query else time.time()
+        since = parse_iso(request.query["since"]) if "since" in request.query else until - 3600
+        limit = int(request.query.get("limit", 25))
+        offset = int(request.query.get("cursor", 0))
+        keywords = query.split(" OR ")
+        step = (until - since) / max(self.posts_per_query, 1)
+        posts = []
+        for i in range(offset, min(offset + limit, self.posts_per_query)):
+            rng = random.Random(f"{query}{since}{until}{i}")  # The same post whichever page it lands on
+            posts.append(self.post(rng.choice(keywords), until - i * step, rng))
+        response = {"posts": posts, "hitsTotal": self.posts_per_query}
+        if offset + limit < self.posts_per_query:
+            response["cursor"] = str(offset + limit)
+        return web.json_response(response)
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.add_routes([
+            web.post("/xrpc/com.atproto.server.createSession", self.create_session),
+            web.get("/xrpc/app.bsky.actor.getProfile", self.get_profile),
+            web.get("/xrpc/app.bsky.feed.searchPosts", self.search_posts),
+        ])
+        return app
+
+    async def start(self, host="127.0.0.1", port=8090):
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"[BlueSkySearchServer] Listening on http://{host}:{port}")
+        return runner
+
+
+async def main(opt):
+    server = BlueSkySearchServer(opt.latency, opt.posts, opt.rate_limit)
+    await server.start(opt.host, opt.port)
+    await asyncio.Future()  # Serve until interrupted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="usage: blueSkySearchServer -p port [-l latency] [-n posts]")
+    parser.add_argument("--host", action="store", dest="host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", action="store", dest="port", type=int, default=8090)
+    parser.add_argument("-l", "--latency", action="store", dest="latency", type=float, default=0.2,
+                        help="Simulated search latency in seconds")
+    parser.add_argument("-n", "--posts", action="store", dest="posts", type=int, default=25,
+                        help="Posts matching each search window, paged with a cursor")
+    parser.add_argument("-r", "--rate-limit", action="store", dest="rate_limit", type=float, default=0.0,
+                        help="Probability of answering 429 to a request")
+
+    opt = parser.parse_args()
+    try:
+        asyncio.run(main(opt))
+    except KeyboardInterrupt:
+        print("\nShutting down BlueSky search server...")
@@ -0,0 +1,278 @@
+# blueSkyStream.py
+import re
+import json
+import time
+import asyncio
+import sqlite3
+from urllib.parse import urlencode
+from datetime import datetime, timezone
+import websockets
+import config
+import services
+import metrics
+from executors import run_blocking
+from sentimentScoring import score_texts
+from dataFromBlueSky import initialize_db, insert_posts, download_bluesky_posts
+
+STREAM_EVENTS = metrics.counter("bluesky_stream_events_total", "Jetstream events by outcome", ["result"])
+STREAM_ROWS = metrics.counter("bluesky_stream_rows_total", "Streamed bluesky_posts rows by outcome", ["result"])
+STREAM_LAG = metrics.histogram("bluesky_stream_lag_seconds", "Seconds from a post reaching Jetstream to its insert")
+PIPELINE_ERRORS = metrics.counter("pipeline_errors_total", "Errors by pipeline stage", ["stage"])
+
+# Streaming alternative to the scheduled searches in dataFromBlueSky.py: every new post on the
+# network arrives through Jetstream (JSON over a WebSocket) within seconds, is matched to symbols
+# by keyword here, then scored and inserted in small batches. Jetstream carries the author's DID,
+# not the handle, and no engagement counts (a new post has none yet), so streamed rows store the
+# DID as author and zero likes/shares/quotes/replies.
+
+POST_COLLECTION = "app.bsky.feed.post"
+TOKEN = re.compile(r"\$?\w+")
+
+### =========================
+###   KEYWORD MATCHING
+### =========================
+
+def tokens(text):
+    return TOKEN.findall(text.casefold())
+
+class KeywordMatcher:
+    """
+    Symbols whose keywords appear in a text, matched on whole words, case-insensitively.
+
+    Keywords become token tuples ("Procter & Gamble" -> ("procter", "gamble")), so a text
+    is matched with one dictionary lookup per token and phrase length, whatever the size
+    of the universe.
+    """
+
+    def __init__(self, keywords):
+        self.phrases = {}  # {token tuple: [symbol, ...]}
+        for symbol, words in keywords.items():
+            for word in words:
+                phrase = tuple(tokens(word))
+                if phrase:
+                    self.phrases.setdefault(phrase, []).append(symbol)
+        self.lengths = sorted({len(phrase) for phrase in self.phrases})
+
+    def match(self, text):
+        words = tokens(text)
+        symbols = {}
+        for i in range(len(words)):
+            for length in self.lengths:
+                for symbol in self.phrases.get(tuple(words[i:i + length]), ()):
+                    symbols[symbol] = None
+        return list(symbols)
+
+    def __len__(self):
+        return len({symbol for symbols in self.phrases.values() for symbol in symbols})
+
+### =========================
+###   CURSOR CHECKPOINTS
+### =========================
+
+def initialize_stream_db():
+    """bluesky_posts, plus the last Jetstream time stored per stream URL."""
+    initialize_db()
+    with sqlite3.connect(config.DB_FILE) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS bluesky_stream_cursors (
+                stream TEXT PRIMARY KEY,
+                time_us INTEGER,
+                updated TEXT
+            )
+        """)
+
+def load_stream_cursor(stream):
+    with sqlite3.connect(config.DB_FILE) as conn:
+        row = conn.execute("SELECT time_us FROM bluesky_stream_cursors WHERE stream = ?", (stream,)).fetchone()
+    return row[0] if row else None
+
+def save_stream_cursor(stream, time_us):
+    with sqlite3.connect(config.DB_FILE) as conn:
+        conn.execute("INSERT OR REPLACE INTO bluesky_stream_cursors (stream, time_us, updated) VALUES (?, ?, ?)",
+                     (stream, time_us, datetime.now(timezone.utc).isoformat()))
+
+### =========================
+###   STREAM CONSUMER
+### =========================
+
+def parse_event(message):
+    """(time_us, did, createdAt, text, langs) of a new post event, or None for anything else."""
+    event = json.loads(message)
+    commit = event.get("commit") or {}
+    if event.get("kind") != "commit" or commit.get("operation") != "create" or commit.get("collection") != POST_COLLECTION:
+        return None
+    record = commit.get("record") or {}
+    return event["time_us"], event["did"], record.get("createdAt"), record.get("text") or "", record.get("langs") or []
+
+class BlueSkyStream:
+    """
+    Reads Jetstream post events, queues the ones that mention a symbol, and stores them in
+    batches of up to JETSTREAM_BATCH_SIZE posts or every JETSTREAM_FLUSH_INTERVAL seconds.
+
+    The cursor (Jetstream's time_us of the last event read) is checkpointed after each
+    stored batch; a reconnect resumes JETSTREAM_REWIND seconds before it, so nothing is
+    lost between batches and re-read posts are ignored by the insert. A batch that fails
+    to store drops the connection, and the stream is read again from the checkpoint.
+    """
+
+    def __init__(self, symbols=None, url=None):
+        universe = services.get_universe()
+        self.matcher = KeywordMatcher({symbol: universe.keywords[symbol] for symbol in (symbols or universe.symbols)})
+        self.url = url or config.JETSTREAM_URL
+        self.langs = set(config.JETSTREAM_LANGS)
+        self.queue = asyncio.Queue(config.JETSTREAM_QUEUE_SIZE)
+        self.cursor = None        # time_us of the last event read
+        self.saved_cursor = None  # time_us checkpointed in the database
+        self.ws = None
+        self.start_cursor = None
+        self.resuming = False     # A batch failed: discard queued posts until we reconnect from saved_cursor
+        self.events = self.matched = self.inserted = self.duplicates = 0
+
+    def subscribe_url(self):
+        params = {"wantedCollections": POST_COLLECTION}
+        if self.cursor:
+            params["cursor"] = self.cursor - int(config.JETSTREAM_REWIND * 1e6)
+        return f"{self.url}?{urlencode(params)}"
+
+    async def read(self, ws):
+        """Matches post events until the connection closes; matched posts wait in the queue."""
+        async for message in ws:
+            if self.resuming:
+                return
+            self.events += 1
+            post = parse_event(message)
+            if post is None:
+                STREAM_EVENTS.labels("other").inc()
+                continue
+            time_us, did, created_at, text, langs = post
+            self.cursor = time_us
+            if langs and self.langs and not self.langs.intersection(langs):
+                STREAM_EVENTS.labels("language").inc()
+                continue
+            symbols = self.matcher.match(text)
+            if not symbols or not created_at:
+                STREAM_EVENTS.labels("unmatched").inc()
+                continue
+            STREAM_EVENTS.labels("matched").inc()
+            self.matched += 1
+            await self.queue.put((time_us, did, created_at, text, symbols))  # Waits while the writer is behind
+
+    async def write(self):
+        """Stores queued posts in batches, and checkpoints the cursor while no posts match."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                batch = [await asyncio.wait_for(self.queue.get(), config.JETSTREAM_FLUSH_INTERVAL)]
+            except asyncio.TimeoutError:
+                # Everything read so far is stored: move the checkpoint past the unmatched events
+                if self.cursor != self.saved_cursor and not self.resuming:
+                    try:
+                        await self.checkpoint(self.cursor)
+                    except sqlite3.Error as e:
+                        print(f"Error saving the BlueSky stream cursor: {e}")
+                continue
+            if self.resuming:
+                self.queue.task_done()  # Read again after the reconnect
+                continue
+            deadline = loop.time() + config.JETSTREAM_FLUSH_INTERVAL
+            while len(batch) < config.JETSTREAM_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait() if not self.queue.empty()
+                                 else await asyncio.wait_for(self.queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self.store(batch)
+            except Exception as e:
+                # Not checkpointed. Later batches or the idle checkpoint would move the cursor past
+                # it, so drop the queue and the connection and read again from the last checkpoint.
+                print(f"Error storing {len(batch)} streamed posts: {e}. Resuming from the last checkpoint.")
+                PIPELINE_ERRORS.labels("bluesky_stream").inc()
+                self.resuming = True
+                if self.ws is not None:
+                    await self.ws.close()
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def store(self, batch):
+        """Scores a batch in the "sentiment" pool and inserts one row per matched symbol, in one transaction."""
+        scores = await score_texts([text for _, _, _, text, _ in batch])
+        rows = [(symbol, did, created_at, 0, 0, 0, 0, text.replace("\n", " "), score)
+                for (_, did, created_at, text, symbols), score in zip(batch, scores) for symbol in symbols]
+        inserted, duplicates = await run_blocking(insert_posts, rows, executor="db")
+        self.inserted += inserted
+        self.duplicates += duplicates
+
+        STREAM_ROWS.labels("inserted").inc(inserted)
+        STREAM_ROWS.labels("duplicate").inc(duplicates)
+        now = time.time()
+        for time_us, _, _, _, _ in batch:
+            STREAM_LAG.observe(now - time_us / 1e6)
+        await self.checkpoint(batch[-1][0])
+
+    async def checkpoint(self, time_us):
+        await run_blocking(save_stream_cursor, self.url, time_us, executor="db")
+        self.saved_cursor = time_us
+
+    async def resume(self):
+        """Once the writer has discarded the queue, rewinds the cursor to the last checkpoint."""
+        await self.queue.join()
+        self.cursor = self.saved_cursor or self.start_cursor
+        self.resuming = False
+
+    async def run(self, stop_on_close=False):
+        """
+        Streams until cancelled, reconnecting after errors. With `stop_on_close`, returns once
+        the server ends the stream normally and every queued post is stored (replays, benchmarks).
+        """
+        self.start_cursor = self.cursor or int(time.time() * 1e6)  # Where a failed first batch resumes
+        writer = asyncio.create_task(self.write())
+        try:
+            while True:
+                try:
+                    async with websockets.connect(self.subscribe_url(), max_size=None) as ws:
+                        print(f"Streaming BlueSky posts for {len(self.matcher)} symbols from {self.url}...")
+                        self.ws = ws
+                        await self.read(ws)
+                    if stop_on_close and not self.resuming:
+                        await self.queue.join()  # A batch that fails to store sets resuming
+                        if not self.resuming:
+                            break
+                    if not self.resuming:
+                        print("BlueSky stream closed by the server.")
+                except (websockets.WebSocketException, OSError, asyncio.TimeoutError) as e:
+                    print(f"BlueSky stream disconnected: {e}.")
+                    PIPELINE_ERRORS.labels("bluesky_stream").inc()
+                finally:
+                    self.ws = None
+                if self.resuming:
+                    await self.resume()
+                print(f"Reconnecting to the BlueSky stream in {config.JETSTREAM_RECONNECT_DELAY} seconds...")
+                await asyncio.sleep(config.JETSTREAM_RECONNECT_DELAY)
+            await self.queue.join()
+            if self.cursor != self.saved_cursor:
+                await self.checkpoint(self.cursor)
+        finally:
+            writer.cancel()
+        print(f"BlueSky stream ended: {self.events} events, {self.matched} matched posts, "
+              f"{self.inserted} rows saved ({self.duplicates} already stored).")
+
+async def stream_bluesky_posts(symbols=None, url=None, stop_on_close=False, catch_up=True):
+    """
+    Follows Jetstream for `symbols` (default: the universe), from the stored cursor if there
+    is one. Without a cursor Jetstream can replay, posts since the last run are first fetched
+    by one search pass (download_bluesky_posts), then the stream starts from when the search began.
+    """
+    stream = BlueSkyStream(symbols, url)
+    await run_blocking(initialize_stream_db, executor="db")
+    cursor = await run_blocking(load_stream_cursor, stream.url, executor="db")
+    if cursor and time.time() - cursor / 1e6 < config.JETSTREAM_MAX_REWIND:
+        stream.cursor = stream.saved_cursor = cursor
+    elif catch_up:
+        # Jetstream replays whatever is posted while the search runs
+        search_started = int(time.time() * 1e6)
+        await download_bluesky_posts(symbols)
+        stream.cursor = search_started
+    await stream.run(stop_on_close)
+    return stream
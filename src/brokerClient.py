@@ -0,0 +1,227 @@
+import uuid
+import time
+import asyncio
+import aiohttp
+import config
+import metrics
+import alpaca_trade_api as tradeapi
+from types import SimpleNamespace
+from rateLimiter import rate_limiter, retry_after_seconds
+
+BROKER_REQUEST_SECONDS = metrics.histogram("broker_request_seconds", "Broker REST request latency", ["endpoint"])
+BROKER_RETRIES = metrics.counter("broker_retries_total", "Broker requests retried", ["endpoint", "reason"])
+
+class BrokerError(Exception):
+    """Raised when the broker rejects a request or retries are exhausted."""
+
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+def to_entity(data):
+    """Wraps a JSON object so fields read like alpaca_trade_api entities (order.symbol, position.qty)."""
+    if isinstance(data, list):
+        return [to_entity(item) for item in data]
+    return SimpleNamespace(**data) if isinstance(data, dict) else data
+
+### =========================
+###   BROKER INTERFACE
+### =========================
+
+class Broker:
+    """
+    Async broker interface used by the trading cycle (tradeLogic) and the order book.
+
+    Implemented by AsyncBroker (Alpaca REST) and simBroker.SimBroker (local fill engine).
+    Results read like alpaca_trade_api entities: account.cash, position.qty, order.id, trade.p.
+    """
+
+    async def get_account(self):
+        raise NotImplementedError
+
+    async def list_positions(self):
+        raise NotImplementedError
+
+    async def list_orders(self, status="open", symbols=None, limit=500):
+        raise NotImplementedError
+
+    async def submit_order(self, symbol, qty, side, type="market", time_in_force="gtc",
+                           limit_price=None, client_order_id=None):
+        raise NotImplementedError
+
+    async def submit_orders(self, orders):
+        """Submits many orders concurrently. Returns one order entity or exception per request, in order."""
+        return await asyncio.gather(*(self.submit_order(**order) for order in orders), return_exceptions=True)
+
+    async def get_latest_trades(self, symbols, feed="iex"):
+        raise NotImplementedError
+
+    async def get_snapshots(self, symbols, feed="iex"):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+### =========================
+###   ASYNC BROKER CLIENT
+### =========================
+
+class AsyncBroker(Broker):
+    """
+    Async Alpaca REST client over one pooled keep-alive aiohttp session.
+
+    Requests spend the shared "alpaca_trading" / "alpaca_data" rate limiters, each
+    endpoint has its own concurrency limit, 429s pause the limiter until the server's
+    Retry-After / rate-limit reset, and transient errors retry with exponential
+    backoff. Point `trading_url` / `data_url` at src/brokerServer.py to run locally.
+    """
+
+    def __init__(self, key=None, secret=None, trading_url=None, data_url=None,
+                 max_connections=None, per_endpoint=None, max_retries=None, timeout=10):
+        self.key = key or config.ALPACA_API_KEY
+        self.secret = secret or config.ALPACA_API_SECRET
+        self.trading_url = (trading_url or config.ALPACA_TRADING_URL).rstrip("/")
+        self.data_url = (data_url or config.ALPACA_DATA_URL).rstrip("/")
+        self.max_connections = max_connections or config.BROKER_MAX_CONNECTIONS
+        self.per_endpoint = per_endpoint or config.BROKER_PER_ENDPOINT_CONCURRENCY
+        self.max_retries = max_retries or config.BROKER_MAX_RETRIES
+        self.timeout = timeout
+        self.session = None
+        self.semaphores = {}
+
+    async def _get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"APCA-API-KEY-ID": self.key or "", "APCA-API-SECRET-KEY": self.secret or ""},
+            )
+        return self.session
+
+    def _semaphore(self, endpoint):
+        if endpoint not in self.semaphores:
+            self.semaphores[endpoint] = asyncio.Semaphore(self.per_endpoint)
+        return self.semaphores[endpoint]
+
+    async def request(self, method, url, endpoint, params=None, json=None, limiter="alpaca_trading"):
+        """Sends one request with rate limiting, per-endpoint concurrency, rate-limit aware retry and backoff."""
+        session = await self._get_session()
+        bucket = rate_limiter(limiter)
+        backoff = 0.5
+        start = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await bucket.acquire()
+                async with self._semaphore(endpoint):
+                    async with session.request(method, url, params=params, json=json) as response:
+                        if response.status == 429:
+                            wait_time = retry_after_seconds(response.headers) or backoff
+                            bucket.pause(wait_time)  # Holds back every other request to this API too
+                            BROKER_RETRIES.labels(endpoint, "rate_limited").inc()
+                            print(f"[Broker] Rate limited on {endpoint}. Retrying in {wait_time:.2f} seconds...")
+                        elif response.status >= 500:
+                            wait_time = backoff
+                            BROKER_RETRIES.labels(endpoint, "server_error").inc()
+                            print(f"[Broker] HTTP {response.status} on {endpoint}. Retrying in {wait_time:.2f} seconds...")
+                        elif response.status >= 400:
+                            raise BrokerError(response.status, await response.text())
+                        else:
+                            bucket.observe(response.headers)
+                            BROKER_REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+                            if response.status == 204:
+                                return None
+                            return await response.json()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                wait_time = backoff
+                BROKER_RETRIES.labels(endpoint, "connection").inc()
+                print(f"[Broker] {type(e).__name__} on {endpoint}. Retrying in {wait_time:.2f} seconds...")
+
+            if attempt == self.max_retries:
+                break
+            await asyncio.sleep(wait_time)
+            backoff = min(backoff * 2, 30)
+
+        raise BrokerError(None, f"{method} {endpoint} failed after {self.max_retries} retries")
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    ### Trading API
+
+    async def get_account(self):
+        return to_entity(await self.request("GET", f"{self.trading_url}/v2/account", "account"))
+
+    async def list_positions(self):
+        return to_entity(await self.request("GET", f"{self.trading_url}/v2/positions", "positions"))
+
+    async def list_orders(self, status="open", symbols=None, limit=500):
+        params = {"status": status, "limit": limit}
+        if symbols:
+            params["symbols"] = ",".join(symbols)
+        return to_entity(await self.request("GET", f"{self.trading_url}/v2/orders", "orders", params=params))
+
+    async def submit_order(self, symbol, qty, side, type="market", time_in_force="gtc",
+                           limit_price=None, client_order_id=None):
+        order = {
+            "symbol": symbol,
+            "qty": str(qty),
+            "side": side,
+            "type": type,
+            "time_in_force": time_in_force,
+            # A client id makes retries idempotent: Alpaca rejects a duplicate instead of filling twice
+            "client_order_id": client_order_id or uuid.uuid4().hex,
+        }
+        if limit_price is not None:
+            order["limit_price"] = str(limit_price)
+        return to_entity(await self.request("POST", f"{self.trading_url}/v2/orders", "submit_order", json=order))
+
+    ### Market data API
+
+    async def get_latest_trades(self, symbols, feed="iex"):
+        """Latest trade per symbol in one request: {symbol: trade}."""
+        data = await self.request("GET", f"{self.data_url}/v2/stocks/trades/latest", "latest_trades",
+                                  params={"symbols": ",".join(symbols), "feed": feed}, limiter="alpaca_data")
+        return {symbol: to_entity(trade) for symbol, trade in data.get("trades", {}).items()}
+
+    async def get_latest_quotes(self, symbols, feed="iex"):
+        """Latest quote per symbol in one request: {symbol: quote}."""
+        data = await self.request("GET", f"{self.data_url}/v2/stocks/quotes/latest", "latest_quotes",
+                                  params={"symbols": ",".join(symbols), "feed": feed}, limiter="alpaca_data")
+        return {symbol: to_entity(quote) for symbol, quote in data.get("quotes", {}).items()}
+
+    async def get_snapshots(self, symbols, feed="iex"):
+        """Latest trade, quote and bars per symbol in one request: {symbol: snapshot}."""
+        data = await self.request("GET", f"{self.data_url}/v2/stocks/snapshots", "snapshots",
+                                  params={"symbols": ",".join(symbols), "feed": feed}, limiter="alpaca_data")
+        return {
+            symbol: to_entity({key: to_entity(value) for key, value in snapshot.items()})
+            for symbol, snapshot in (data or {}).items() if snapshot
+        }
+
+### =========================
+###   SYNC REST CLIENT
+### =========================
+
+class RateLimitedREST(tradeapi.REST):
+    """alpaca_trade_api.REST whose requests (its own 429 retries included) spend the shared rate limiters."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session.hooks["response"].append(self._observe)
+
+    def _limiter(self, url):
+        return rate_limiter("alpaca_trading" if str(url).startswith(str(self._base_url)) else "alpaca_data")
+
+    def _one_request(self, method, url, opts, retry):
+        self._limiter(url).acquire_sync()
+        return super()._one_request(method, url, opts, retry)
+
+    def _observe(self, response, *args, **kwargs):
+        bucket = self._limiter(response.url)
+        if response.status_code == 429:
+            bucket.pause(retry_after_seconds(response.headers) or self._retry_wait)
+        else:
+            bucket.observe(response.headers)
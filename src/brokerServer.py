@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from aiohttp import web
+from tradeUpdatesServer import TradeUpdatesServer
+
+# Local HTTP stand-in for the Alpaca trading and market data REST APIs used by brokerClient.py
+
+class BrokerServer:
+    """In-memory account that fills market orders at the last price, with configurable latency and 429s."""
+
+    def __init__(self, latency=0.05, rate_limit_probability=0.0, initial_cash=100000, trade_updates=None, quota=None):
+        self.latency = latency
+        self.rate_limit_probability = rate_limit_probability
+        self.quota = quota      # (requests, window seconds): fixed-window limit with Alpaca's X-RateLimit-* headers
+        self.window_start = 0.0
+        self.window_requests = 0
+        self.requests = 0       # Answered without a 429
+        self.rate_limited = 0   # 429 responses
+        self.cash = float(initial_cash)
+        self.positions = {}     # {symbol: {"qty": int, "avg_entry_price": float}}
+        self.orders = {}        # {order_id: order dict}
+        self.prices = {}        # {symbol: last price}
+        self.trade_updates = trade_updates  # Optional TradeUpdatesServer to publish fills to
+
+    def price(self, symbol):
+        """Random-walk last price per symbol."""
+        last = self.prices.get(symbol, random.uniform(50, 500))
+        self.prices[symbol] = round(last * (1 + random.gauss(0, 0.0005)), 2)
+        return self.prices[symbol]
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        """Adds simulated network latency, random 429 responses and the request quota."""
+        await asyncio.sleep(self.latency)
+        headers = {}
+        if self.quota:
+            limit, window = self.quota
+            now = time.time()
+            if now >= self.window_start + window:
+                self.window_start, self.window_requests = now - now % window, 0
+            self.window_requests += 1
+            reset = self.window_start + window
+            headers = {"X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": str(max(limit - self.window_requests, 0)),
+                       "X-RateLimit-Reset": f"{reset:.3f}"}
+            if self.window_requests > limit:
+                self.rate_limited += 1
+                return web.json_response({"message": "too many requests"}, status=429,
+                                         headers={**headers, "Retry-After": f"{reset - now:.3f}"})
+        if random.random() < self.rate_limit_probability:
+            self.rate_limited += 1
+            return web.json_response({"message": "too many requests"}, status=429, headers={"Retry-After": "0.2"})
+        self.requests += 1
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    async def get_account(self, request):
+        return web.json_response({"cash": str(self.cash), "status": "ACTIVE"})
+
+    async def list_positions(self, request):
+        return web.json_response([
+            {"symbol": symbol, "qty": str(position["qty"]), "avg_entry_price": str(position["avg_entry_price"])}
+            for symbol, position in self.positions.items()
+        ])
+
+    async def list_orders(self, request):
+        status = request.query.get("status", "open")
+        symbols = request.query.get("symbols")
+        symbols = set(symbols.split(",")) if symbols else None
+        open_statuses = {"new", "accepted", "partially_filled"}
+        orders = [
+            order for order in self.orders.values()
+            if (status == "all" or (order["status"] in open_statuses) == (status == "open"))
+            and (symbols is None or order["symbol"] in symbols)
+        ]
+        return web.json_response(orders[-int(request.query.get("limit", 500)):])
+
+    async def submit_order(self, request):
+        body = await request.json()
+        if any(order["client_order_id"] == body.get("client_order_id") for order in self.orders.values()):
+            return web.json_response({"message": "client_order_id must be unique"}, status=422)
+
+        order = {
+            "id": uuid.uuid4().hex,
+            "client_order_id": body.get("client_order_id"),
+            "symbol": body["symbol"],
+            "qty": body["qty"],
+            "filled_qty": "0",
+            "side": body["side"],
+            "type": body.get("type", "market"),
+            "time_in_force": body.get("time_in_force", "gtc"),
+            "limit_price": body.get("limit_price"),
+            "status": "new",
+            "submitted_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.orders[order["id"]] = order
+        await self.publish("new", order)
+
+        price = self.price(order["symbol"])
+        marketable = order["limit_price"] is None or (
+            float(order["limit_price"]) >= price if order["side"] == "buy" else float(order["limit_price"]) <= price
+        )
+        if marketable:
+            await self.fill(order, price)
+        return web.json_response(order)
+
+    async def fill(self, order, price):
+        """Fills the whole order and updates cash and position."""
+        qty = int(float(order["qty"]))
+        signed_qty = qty if order["side"] == "buy" else -qty
+        position = self.positions.get(order["symbol"], {"qty": 0, "avg_entry_price": 0.0})
+        new_qty = position["qty"] + signed_qty
+        if new_qty == 0:
+            self.positions.pop(order["symbol"], None)
+        else:
+            if position["qty"] == 0 or (position["qty"] > 0) != (new_qty > 0):
+                avg = price  # New or flipped position
+            elif abs(new_qty) > abs(position["qty"]):
+                avg = (abs(position["qty"]) * position["avg_entry_price"] + qty * price) / abs(new_qty)
+            else:
+                avg = position["avg_entry_price"]
+            self.positions[order["symbol"]] = {"qty": new_qty, "avg_entry_price": round(avg, 4)}
+
+        self.cash += -qty * price if order["side"] == "buy" else qty * price
+        order.update(status="filled", filled_qty=str(qty), filled_avg_price=str(price),
+                     filled_at=datetime.now(timezone.utc).isoformat())
+        await self.publish("fill", order, qty=qty, price=price, position_qty=new_qty)
+
+    async def publish(self, event, order, **fields):
+        if self.trade_updates is not None:
+            data = {"event": event, "order": dict(order)}
+            data.update({key: str(value) for key, value in fields.items()})
+            await self.trade_updates.publish(data)
+
+    async def latest_trades(self, request):
+        symbols = request.query.get("symbols", "").split(",")
+        now = datetime.now(timezone.utc).isoformat()
+        return web.json_response({"trades": {
+            symbol: {"t": now, "p": self.price(symbol), "s": 100} for symbol in symbols if symbol
+        }})
+
+    async def latest_quotes(self, request):
+        symbols = request.query.get("symbols", "").split(",")
+        now = datetime.now(timezone.utc).isoformat()
+        quotes = {}
+        for symbol in filter(None, symbols):
+            price = self.price(symbol)
+            quotes[symbol] = {"t": now, "bp": round(price - 0.01, 2), "ap": round(price + 0.01, 2), "bs": 1, "as": 1}
+        return web.json_response({"quotes": quotes})
+
+    async def snapshots(self, request):
+        symbols = request.query.get("symbols", "").split(",")
+        now = datetime.now(timezone.utc).isoformat()
+        snapshots = {}
+        for symbol in filter(None, symbols):
+            price = self.price(symbol)
+            snapshots[symbol] = {
+                "latestTrade": {"t": now, "p": price, "s": 100},
+                "latestQuote": {"t": now, "bp": round(price - 0.01, 2), "ap": round(price + 0.01, 2), "bs": 1, "as": 1},
+            }
+        return web.json_response(snapshots)
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.add_routes([
+            web.get("/v2/account", self.get_account),
+            web.get("/v2/positions", self.list_positions),
+            web.get("/v2/orders", self.list_orders),
+            web.post("/v2/orders", self.submit_order),
+            web.get("/v2/stocks/trades/latest", self.latest_trades),
+            web.get("/v2/stocks/quotes/latest", self.latest_quotes),
+            web.get("/v2/stocks/snapshots", self.snapshots),
+        ])
+        return app
+
+    async def start(self, host="127.0.0.1", port=8080):
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"[BrokerServer] Listening on http://{host}:{port}")
+        return runner
+
+
+async def main(opt):
+    trade_updates = None
+    if opt.stream_port:
+        trade_updates = TradeUpdatesServer(opt.host, opt.stream_port)
+        await trade_updates.start()
+
+    quota = tuple(float(part) for part in opt.quota.split("/")) if opt.quota else None
+    server = BrokerServer(opt.latency, opt.rate_limit, trade_updates=trade_updates, quota=quota)
+    await server.start(opt.host, opt.port)
+    await asyncio.Future()  # Serve until interrupted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="usage: brokerServer -p port [-l latency] [-s stream_port]")
+    parser.add_argument("--host", action="store", dest="host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", action="store", dest="port", type=int, default=8080)
+    parser.add_argument("-l", "--latency", action="store", dest="latency", type=float, default=0.05,
+                        help="Simulated round-trip latency in seconds")
+    parser.add_argument("-r", "--rate-limit", action="store", dest="rate_limit", type=float, default=0.0,
+                        help="Probability of answering 429 to a request")
+    parser.add_argument("-q", "--quota", action="store", dest="quota",
+                        help="Requests per window, e.g. 200/60, answered with X-RateLimit-* headers and 429s beyond it")
+    parser.add_argument("-s", "--stream-port", action="store", dest="stream_port", type=int,
+                        help="Also publish trade updates on this WebSocket port")
+
+    opt = parser.parse_args()
+    try:
+        asyncio.run(main(opt))
+    except KeyboardInterrupt:
+        print("\nShutting down broker server...")
@@ -0,0 +1,252 @@
+import json
+import numpy as np
+
+### =========================
+###   COMPILED PREDICTOR
+### =========================
+
+class CompiledModel:
+    """
+    Flat NumPy representation of a trained model with the StandardScaler folded in.
+
+    Tree ensembles are stored as concatenated node arrays (feature, threshold, left, right,
+    value). Leaves point to themselves, so every tree can be advanced one level per step
+    for all rows at once and the loop runs `depth` times regardless of the number of trees.
+    Thresholds are expressed in raw (unscaled) feature units, so no scaler call is needed,
+    and every split is evaluated as `x < threshold` (go left).
+    """
+
+    def __init__(self, kind, n_features, feature=None, threshold=None, left=None, right=None,
+                 missing_left=None, value=None, roots=None, depth=0,
+                 weights=None, base=0.0, factor=1.0):
+        self.kind = kind                    # "tree" or "linear"
+        self.n_features = n_features
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.weights = weights
+        self.base = base
+        self.factor = factor                # 1 / n_trees for forests, 1 for boosting
+
+    def predict(self, X):
+        """Predict a 2D batch of raw (unscaled) feature rows."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if self.kind == "linear":
+            return X @ self.weights + self.base
+
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0]))
+        has_missing = np.isnan(X).any()
+
+        for _ in range(self.depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x < self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return self.value[nodes].sum(axis=1) * self.factor + self.base
+
+    def predict_one(self, x):
+        """Predict a single raw feature row with minimal overhead."""
+        x = np.asarray(x, dtype=np.float64)
+
+        if self.kind == "linear":
+            return float(x @ self.weights + self.base)
+
+        nodes = self.roots
+        has_missing = np.isnan(x).any()
+
+        for _ in range(self.depth):
+            values = x[self.feature[nodes]]
+            go_left = values < self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(values) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return float(self.value[nodes].sum() * self.factor + self.base)
+
+### =========================
+###   COMPILERS
+### =========================
+
+def _scaler_params(scaler, n_features):
+    """Mean and scale vectors of a StandardScaler (identity when no scaler is used)."""
+    mean = np.zeros(n_features)
+    scale = np.ones(n_features)
+    if scaler is not None:
+        if getattr(scaler, "mean_", None) is not None and getattr(scaler, "with_mean", True):
+            mean = np.asarray(scaler.mean_, dtype=np.float64)
+        if getattr(scaler, "scale_", None) is not None:
+            scale = np.asarray(scaler.scale_, dtype=np.float64)
+    return mean, scale
+
+def _raw_threshold(threshold, mean, scale, strict):
+    """
+    Fold the scaler into split thresholds.
+
+    sklearn and XGBoost compare float32((x - mean) / scale) against the threshold
+    (`<= t` for sklearn, `< t` for XGBoost). That is monotonic in x, so each split is
+    equivalent to `x < B` for the smallest raw value B that goes right. B is found by
+    bisecting around t * scale + mean, which keeps predictions identical on exact ties.
+    """
+    def goes_right(x):
+        scaled = ((x - mean) / scale).astype(np.float32)
+        return scaled >= threshold if strict else scaled > threshold
+
+    guess = threshold * scale + mean
+    delta = scale * (np.abs(threshold) + 1.0) * 2.0 ** -20 + np.spacing(np.abs(guess)) * 4
+    low, high = guess - delta, guess + delta
+
+    # Widen the bracket until low stays left and high goes right
+    for _ in range(64):
+        bad_low, bad_high = goes_right(low), ~goes_right(high)
+        if not (bad_low.any() or bad_high.any()):
+            break
+        low = np.where(bad_low, low - delta, low)
+        high = np.where(bad_high, high + delta, high)
+        delta = delta * 2
+
+    for _ in range(80):
+        mid = low + (high - low) / 2
+        right = goes_right(mid)
+        high = np.where(right, mid, high)
+        low = np.where(right, low, mid)
+
+    return high
+
+def _pack_trees(trees, n_features, mean, scale, strict=False, factor=1.0, base=0.0):
+    """Concatenate per-tree node arrays into one CompiledModel, folding the scaler into thresholds."""
+    feature, threshold, left, right, missing_left, value, roots = [], [], [], [], [], [], []
+    depth = 0
+    offset = 0
+
+    for tree in trees:
+        n_nodes = len(tree["feature"])
+        is_leaf = tree["left"] < 0
+        node_ids = np.arange(n_nodes)
+
+        tree_feature = np.where(is_leaf, 0, tree["feature"])
+        tree_threshold = np.where(is_leaf, 0.0, tree["threshold"])
+        tree_threshold = _raw_threshold(tree_threshold, mean[tree_feature], scale[tree_feature], strict)
+        tree_threshold[is_leaf] = np.inf
+
+        feature.append(tree_feature)
+        threshold.append(tree_threshold)
+        left.append(np.where(is_leaf, node_ids, tree["left"]) + offset)
+        right.append(np.where(is_leaf, node_ids, tree["right"]) + offset)
+        missing_left.append(tree["missing_left"])
+        value.append(tree["value"])
+        roots.append(offset)
+        depth = max(depth, tree["depth"])
+        offset += n_nodes
+
+    return CompiledModel(
+        "tree", n_features,
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        left=np.concatenate(left).astype(np.intp),
+        right=np.concatenate(right).astype(np.intp),
+        missing_left=np.concatenate(missing_left).astype(bool),
+        value=np.concatenate(value).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        depth=depth, base=base, factor=factor,
+    )
+
+def _sklearn_tree(estimator, value_scale=1.0):
+    """Extract the node arrays of a fitted sklearn decision tree."""
+    tree = estimator.tree_
+    n_nodes = tree.node_count
+    missing_left = getattr(tree, "missing_go_to_left", None)
+    return {
+        "feature": np.asarray(tree.feature),
+        "threshold": np.asarray(tree.threshold, dtype=np.float64),
+        "left": np.asarray(tree.children_left),
+        "right": np.asarray(tree.children_right),
+        "missing_left": np.asarray(missing_left, dtype=bool) if missing_left is not None else np.zeros(n_nodes, dtype=bool),
+        "value": np.asarray(tree.value[:, 0, 0], dtype=np.float64) * value_scale,
+        "depth": tree.max_depth,
+    }
+
+def _xgboost_trees(booster):
+    """Extract the node arrays of every tree in an XGBoost booster (exact float32 splits from the JSON model)."""
+    gbtree = json.loads(booster.save_raw("json"))["learner"]["gradient_booster"]
+    if "model" not in gbtree:
+        raise TypeError(f"XGBoost booster {gbtree.get('name')} is not supported")
+
+    trees = []
+    for tree in gbtree["model"]["trees"]:
+        left = np.asarray(tree["left_children"])
+        right = np.asarray(tree["right_children"])
+        is_leaf = left < 0
+
+        # Depth by walking children from the root (children always follow their parent)
+        node_depth = np.zeros(len(left), dtype=int)
+        for i in np.flatnonzero(~is_leaf):
+            node_depth[left[i]] = node_depth[i] + 1
+            node_depth[right[i]] = node_depth[i] + 1
+
+        split_conditions = np.asarray(tree["split_conditions"], dtype=np.float32).astype(np.float64)
+        trees.append({
+            "feature": np.asarray(tree["split_indices"]),
+            "threshold": np.where(is_leaf, 0.0, split_conditions),
+            "left": left,
+            "right": right,
+            "missing_left": np.asarray(tree["default_left"], dtype=bool),
+            "value": np.where(is_leaf, split_conditions, 0.0),  # Leaf weights are stored as split conditions
+            "depth": int(node_depth.max()),
+        })
+    return trees
+
+def _xgboost_base_score(booster):
+    """Global bias added to the sum of leaf values."""
+    learner_params = json.loads(booster.save_raw("json"))["learner"]["learner_model_param"]
+    return float(str(learner_params["base_score"]).strip("[]"))
+
+def compile_model(model, scaler=None):
+    """
+    Compile a fitted model (and the StandardScaler it was trained behind) into a CompiledModel.
+
+    Supports sklearn decision trees, random forests / extra trees, gradient boosting,
+    XGBoost regressors and linear models. Raises TypeError for anything else.
+    """
+    n_features = int(getattr(model, "n_features_in_", 0) or getattr(scaler, "n_features_in_", 0))
+    mean, scale = _scaler_params(scaler, n_features)
+    class_name = type(model).__name__
+
+    if hasattr(model, "get_booster"):
+        objective = model.get_params().get("objective")
+        if objective not in (None, "reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror"):
+            raise TypeError(f"XGBoost objective {objective} is not supported")
+        booster = model.get_booster()
+        trees = _xgboost_trees(booster)
+        return _pack_trees(trees, n_features, mean, scale, strict=True, base=_xgboost_base_score(booster))
+
+    if hasattr(model, "estimators_") and class_name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        trees = [_sklearn_tree(estimator) for estimator in model.estimators_]
+        return _pack_trees(trees, n_features, mean, scale, factor=1.0 / len(trees))
+
+    if class_name == "GradientBoostingRegressor":
+        if getattr(model, "init_", None) == "zero" or not hasattr(model.init_, "constant_"):
+            raise TypeError("GradientBoostingRegressor needs the default mean initial estimator")
+        trees = [_sklearn_tree(estimator, model.learning_rate) for estimator in model.estimators_[:, 0]]
+        return _pack_trees(trees, n_features, mean, scale, base=float(np.ravel(model.init_.constant_)[0]))
+
+    if hasattr(model, "tree_"):
+        return _pack_trees([_sklearn_tree(model)], n_features, mean, scale)
+
+    if hasattr(model, "coef_") and np.ndim(model.coef_) == 1:
+        # coef . ((x - mean) / scale) + b  ==  (coef / scale) . x + (b - coef . mean / scale)
+        weights = np.asarray(model.coef_, dtype=np.float64) / scale
+        base = float(model.intercept_) - float(weights @ mean)
+        return CompiledModel("linear", n_features, weights=weights, base=base)
+
+    raise TypeError(f"Cannot compile model of type {class_name}")
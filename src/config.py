@@ -12,6 +12,7 @@ ALPACA_API_SECRET = os.getenv("alpaca_api_secret")
 ALPACA_BASE_URL = os.getenv("alpaca_base_url")
 BLUESKY_USERNAME = os.getenv("blueSky_user_name")
 BLUESKY_PASSWORD = os.getenv('blueSky_password')
+BLUESKY_BASE_URL = os.getenv("bluesky_base_url")  # e.g. http://127.0.0.1:8090 for src/blueSkySearchServer.py
 
 # Stock Symbols
 ALL_SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "PG", "KO", "WMT", "JNJ", "GOLD"]
@@ -45,3 +46,104 @@ STOCK_DICT = {
     "JNJ": ["Johnson & Johnson"],
     "GOLD": ["Barrick Gold"]
 }
+
+# Symbol universe (src/universe.py). Unset: ALL_SYMBOLS and STOCK_DICT above.
+# Otherwise a CSV (symbol,keywords), a text file with one symbol per line, or "table:<name>" in DB_FILE.
+UNIVERSE_SOURCE = os.getenv("universe_source")
+SUBSCRIBE_BATCH_SIZE = 400   # Symbols per WebSocket subscribe message
+BACKFILL_WORKERS = 4         # Threads fetching historical bars, each for its own shard of the universe
+
+# Preprocessed training matrices cache (see train.preprocess_data)
+CACHE_DIR = "data/cache"
+
+# Trained models available for batch scoring (see batchPredict.py)
+SCALER_FILE = "model/scaler.pkl"
+TRADING_MODEL_FILE = "model/RandomForest.pkl"  # Model used by the live trading loop
+MODEL_REGISTRY = {
+    "RandomForest": "model/RandomForest.pkl",
+    "RandomForest_Tuned": "model/RandomForest_Tuned.pkl",
+    "XGBoost": "model/XGBoost.pkl",
+    "LinearRegression": "model/LinearRegression.pkl"
+}
+BATCH_PREDICT_CHUNK_SIZE = 50000
+BATCH_PREDICT_WORKERS = 4
+
+# Alpaca market-data stream; point at src/replayFeed.py for local runs and benchmarks
+ALPACA_STREAM_URL = os.getenv("alpaca_stream_url", "wss://stream.data.alpaca.markets/v2/iex")
+
+# Alpaca trading stream (trade_updates); point at src/tradeUpdatesServer.py for local runs
+ALPACA_TRADE_STREAM_URL = os.getenv("alpaca_trade_stream_url", "wss://paper-api.alpaca.markets/stream")
+
+# Async broker client (src/brokerClient.py); point the URLs at src/brokerServer.py for local runs
+ALPACA_TRADING_URL = os.getenv("alpaca_api_endpoint", "https://paper-api.alpaca.markets")
+ALPACA_DATA_URL = os.getenv("alpaca_data_url", "https://data.alpaca.markets")
+BROKER_MAX_CONNECTIONS = 20          # Pooled keep-alive connections
+BROKER_PER_ENDPOINT_CONCURRENCY = 8  # In-flight requests per endpoint
+BROKER_MAX_RETRIES = 5
+
+# API rate limits (src/rateLimiter.py): {api: (requests, per seconds, burst)}, shared by every client in a process
+RATE_LIMITS = {
+    "alpaca_trading": (200, 60, 10),  # 200 requests per minute per account
+    "alpaca_data": (200, 60, 10),     # Basic market data plan
+    "bluesky": (3000, 300, 30),       # 3000 requests per 5 minutes
+}
+
+# Price service (src/priceService.py): seconds before a symbol's last trade/quote counts as stale
+PRICE_MAX_AGE = 15
+
+# Stage latency tracing (src/tracing.py, report with script/traceReport.py)
+TRACING_ENABLED = True
+TRACE_BUFFER_SIZE = 65536   # Events kept in memory before the oldest unflushed ones are dropped
+TRACE_FLUSH_SIZE = 1000     # Events per batched SQLite write
+
+# Decision loop: wakes when the merge stage stores new features, or after this many seconds
+DECISION_MAX_WAIT = 300
+
+# Executors and event loop monitoring (src/executors.py, src/loopMonitor.py)
+IO_WORKERS = 8                  # Threads for blocking network clients
+BLUESKY_CONCURRENCY = 8         # BlueSky searches in flight at once (threads of the "bluesky" executor)
+LOOP_MONITOR_INTERVAL = 0.1     # Seconds between loop lag ticks
+LOOP_LAG_THRESHOLD = 0.1        # Log ticks that arrive this many seconds late
+
+# BlueSky ingestion: "search" polls searchPosts before each bar close, "stream" follows Jetstream (src/blueSkyStream.py)
+BLUESKY_INGEST_MODE = os.getenv("bluesky_ingest_mode", "search")
+BLUESKY_PAGE_SIZE = 100         # Posts per searchPosts page (the API maximum)
+BLUESKY_MAX_PAGES = 20          # Pages per search window per run; the rest resume from the stored cursor next run
+# Public post stream; point at src/jetstreamReplay.py for local runs and benchmarks
+JETSTREAM_URL = os.getenv("jetstream_url", "wss://jetstream2.us-east.bsky.network/subscribe")
+JETSTREAM_LANGS = ["en"]        # Posts tagged only with other languages are skipped, as searches ask for lang=en
+JETSTREAM_BATCH_SIZE = 500      # Matched posts scored and inserted together
+JETSTREAM_FLUSH_INTERVAL = 1.0  # Longest wait in seconds before a partial batch is stored
+JETSTREAM_QUEUE_SIZE = 20000    # Matched posts waiting to be stored before reading pauses
+JETSTREAM_REWIND = 5            # Seconds replayed before the stored cursor on reconnect (duplicates are ignored)
+JETSTREAM_MAX_REWIND = 86400    # Older cursors are past Jetstream's replay window: searches catch up instead
+JETSTREAM_RECONNECT_DELAY = 5   # Seconds before reconnecting after the stream drops
+
+# Sentiment scoring (src/sentimentScoring.py)
+SENTIMENT_BACKEND = os.getenv("sentiment_backend", "vader")  # "vader" or "transformer"
+SENTIMENT_WORKERS = 2           # Scoring processes (0: score on an "io" thread in this process)
+SENTIMENT_BATCH_SIZE = 256      # Texts per pool task
+SENTIMENT_CACHE_SIZE = 200000   # Distinct normalized texts whose scores are kept
+# Transformer backend (needs transformers and torch): each scoring process loads the model and
+# runs TRANSFORMER_THREADS torch threads, so use few SENTIMENT_WORKERS with several threads each
+TRANSFORMER_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"  # pipeline("sentiment-analysis") default
+TRANSFORMER_MAX_LENGTH = 128    # Tokens per post; longer posts are truncated
+TRANSFORMER_THREADS = 4         # torch CPU threads per scoring process
+TRANSFORMER_BATCH_SIZE = 32     # Posts per forward pass, grouped by length
+
+# Logging and metrics (src/logConfig.py, src/metrics.py)
+LOG_LEVEL = os.getenv("log_level", "INFO")  # DEBUG prints every bar, row and symbol decision
+METRICS_ENABLED = True
+METRICS_PORT = 9100  # Prometheus text format at http://127.0.0.1:9100/metrics
+
+# Multi-process runtime (src/processRuntime.py, src/sharedRing.py)
+INGEST_PROCESSES = 1        # Market-data WebSocket shards, each subscribing to a slice of the universe
+SENTIMENT_PROCESSES = 2     # BlueSky scraping shards, each covering a slice of the universe
+RING_CAPACITY = 4096        # Records per shared-memory ring (power of two)
+RING_POLL_INTERVAL = 0.005  # Longest sleep between checks of an empty ring, in seconds
+PROCESS_RESTART_DELAY = 5   # Seconds before restarting a stage process that exited
+
+# Scheduled refreshes (src/scheduler.py), aligned to TIMEFRAME bar closes during NYSE sessions
+SENTIMENT_REFRESH_OFFSET = -120  # Seconds from each bar close: BlueSky posts are stored before the close's merge
+FEATURE_REFRESH_OFFSET = 5       # Indicators and merge, as a backstop for bars the WebSocket already triggered
+SCHEDULER_LATE_TOLERANCE = 1.0   # Warn when a job starts this many seconds after its time
@@ -1,6 +1,8 @@
 import sqlite3
 import config
+import logConfig
 from datetime import datetime
+from featureCache import feature_cache
 
 ### =========================
 ###   DATABASE FUNCTIONS
@@ -180,6 +182,10 @@ def merge_sentiment_data(start_time, end_time):
 
     print(f"Checking data to merge from {start_time} to {end_time}...")
 
+    # Rows newer than this are the ones merged now
+    cursor.execute("SELECT MAX(timestamp) FROM merged_data")
+    last_merged = cursor.fetchone()[0]
+
     merge_query = f"""
         INSERT INTO merged_data (
             timestamp, symbol, open, high, low, close, volume, 
@@ -205,6 +211,12 @@ def merge_sentiment_data(start_time, end_time):
 
     cursor.execute(merge_query)
     conn.commit()
+
+    # Push the newly merged rows into the in-memory feature cache
+    if feature_cache.loaded:
+        updated = feature_cache.load_latest(conn, since=last_merged)
+        if logConfig.INFO:
+            print(f"[INFO] Feature cache updated for {updated} symbols (version {feature_cache.version}).")
     conn.close()
 
     print(f"Merged stock & sentiment data from {start_time} to {end_time}.")
@@ -1,6 +1,5 @@
 import sqlite3
 import pandas as pd
-import alpaca_trade_api as tradeapi
 from datetime import datetime, timezone, timedelta
 import pandas_market_calendars as mcal
 from dataCombine import merge_sentiment_data, compute_technical_indicators
@@ -10,9 +9,17 @@ import json
 import websockets
 import asyncio
 import config  # Import central config file
-
-# Initialize Alpaca API
-api = tradeapi.REST(config.ALPACA_API_KEY, config.ALPACA_API_SECRET, config.ALPACA_BASE_URL, api_version="v2")
+import services
+from priceService import price_service
+from tracing import tracer
+from executors import run_blocking
+import metrics
+import logConfig
+
+BARS_INGESTED = metrics.counter("bars_ingested_total", "Bars received from the market-data stream", ["symbol"])
+MARKET_MESSAGES = metrics.counter("market_messages_total", "Trade and quote messages received", ["type"])
+PIPELINE_ERRORS = metrics.counter("pipeline_errors_total", "Errors by pipeline stage", ["stage"])
+DATA_PROCESSING_SECONDS = metrics.histogram("data_processing_seconds", "Indicator computation and merge time")
 
 ### =========================
 ###   MARKET TIME HELPERS
@@ -52,7 +59,7 @@ def get_market_open_time():
 
 def create_connection():
     """Create a database connection."""
-    return sqlite3.connect(config.DB_FILE)
+    return sqlite3.connect(config.DB_FILE, timeout=30)  # Backfill shards write concurrently
 
 def create_table(conn):
     """Create the stock_prices table if it does not exist."""
@@ -96,16 +103,13 @@ def save_to_db(conn, df):
 
 
 
-# Initialize Alpaca API
-api = tradeapi.REST(config.ALPACA_API_KEY, config.ALPACA_API_SECRET, config.ALPACA_BASE_URL, api_version="v2")
-
 ### =========================
 ###   DATABASE FUNCTIONS
 ### =========================
 
 def create_connection():
     """Create a database connection."""
-    return sqlite3.connect(config.DB_FILE)
+    return sqlite3.connect(config.DB_FILE, timeout=30)  # Backfill shards write concurrently
 
 def create_table():
     """Create the stock_prices table if it does not exist."""
@@ -127,36 +131,39 @@ def create_table():
 
 
 # dataFromAlpaca.py
-async def save_stock_data(symbol, timestamp, open_price, high, low, close, volume):
-    """Save real-time stock data to SQLite database."""
-    with sqlite3.connect(config.DB_FILE) as conn:
-        cursor = conn.cursor()
+async def save_stock_data(bars):
+    """Save real-time bars (Alpaca "b" messages) to SQLite in one transaction, on the db executor."""
+    await run_blocking(write_stock_data, bars, executor="db")
 
-        # Convert timestamp to UTC
-        dt_object = datetime.fromisoformat(timestamp.replace('Z', '+00:00')) # Convert it to a datatime
-        timestamp_utc = dt_object.strftime("%Y-%m-%d %H:%M:%S")  # Format as string
+def write_stock_data(bars):
+    # Convert timestamps to UTC "YYYY-MM-DD HH:MM:SS" strings
+    rows = [(bar["S"], datetime.fromisoformat(bar["t"].replace('Z', '+00:00')).strftime("%Y-%m-%d %H:%M:%S"),
+             bar["o"], bar["h"], bar["l"], bar["c"], bar["v"]) for bar in bars]
 
-        cursor.execute("""
+    with sqlite3.connect(config.DB_FILE) as conn:
+        conn.executemany("""
             INSERT OR REPLACE INTO stock_prices (symbol, timestamp, open, high, low, close, volume)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (symbol, timestamp_utc, open_price, high, low, close, volume))
-
+        """, rows)
         conn.commit()
-        print(f"✅ [SAVED] {symbol} | {timestamp} | Open: {open_price}")
+
+    if logConfig.DEBUG:
+        for bar in bars:
+            print(f"✅ [SAVED] {bar['S']} | {bar['t']} | Open: {bar['o']}")
 
 ### =========================
 ###   HISTORICAL DATA FETCH
 ### =========================
 
-def fetch_historical_data():
-    """Fetch historical data in chunks and update SQLite database."""
+def fetch_historical_data(symbols=None):
+    """Fetch historical data in chunks and update SQLite database (for `symbols`, default the whole universe)."""
     conn = create_connection()
     create_table()
 
     now = datetime.now(timezone.utc) - timedelta(minutes=15)  # Ensure 15-minute delay
     market_close_time = get_market_close_time()
 
-    for symbol in config.ALL_SYMBOLS:
+    for symbol in symbols or services.get_universe().symbols:
         last_timestamp = get_last_timestamp(conn, symbol)
 
         if last_timestamp:
@@ -178,7 +185,7 @@ def fetch_historical_data():
             print(f"Fetching historical data for {symbol} from {last_timestamp_dt} to {until_time}...")
 
             try:
-                bars = api.get_bars(symbol, config.TIMEFRAME, start=last_timestamp_dt.strftime("%Y-%m-%dT%H:%M:%SZ"), end=until_time, feed="iex").df
+                bars = services.get_rest_api().get_bars(symbol, config.TIMEFRAME, start=last_timestamp_dt.strftime("%Y-%m-%dT%H:%M:%SZ"), end=until_time, feed="iex").df
                 bars["symbol"] = symbol
                 bars.reset_index(inplace=True)
 
@@ -192,16 +199,21 @@ def fetch_historical_data():
 
             except Exception as e:
                 print(f"[{symbol}] Error fetching data: {e}")
+                PIPELINE_ERRORS.labels("historical_fetch").inc()
                 break
 
     conn.close()
     print(" Historical data fetch complete.")
 
+async def backfill(workers=None):
+    """Step 1 for large universes: fetches historical data with one thread per shard of the universe."""
+    shards = services.get_universe().shard(workers or config.BACKFILL_WORKERS)
+    await asyncio.gather(*(run_blocking(fetch_historical_data, symbols) for symbols in shards))
+
 ### =========================
 ###   REAL-TIME DATA FETCH
 ### =========================
 
-ALPACA_WS_URL = "wss://stream.data.alpaca.markets/v2/iex"  # Using IEX
 
 def get_latest_timestamp():
     """Get the latest timestamp from stock_prices, ensuring it does not go after 2024-10-01."""
@@ -233,6 +245,7 @@ def run_data_processing():
         print(f"Computing technical indicators from {start_date} to {end_date}...")
         print(f"Start date {start_date}, end date {end_date}")
         compute_technical_indicators(start_date, end_date)
+        tracer.mark("indicators")
         print("[Step 3] Technical indicators computed successfully.")
     except Exception as e:
         print(f"[ERROR] Failed to compute technical indicators: {e}")
@@ -241,6 +254,7 @@ def run_data_processing():
     try:
         print(f"Merging sentiment data from {start_date} to {end_date}...")
         merge_sentiment_data(start_date, end_date)
+        tracer.mark("merged")
         print("[Step 3] Merging stock and sentiment data completed successfully.")
     except Exception as e:
         print(f"[ERROR] Failed to merge sentiment data: {e}")
@@ -264,9 +278,45 @@ def get_latest_feature_timestamp():
         print(f"[ERROR] Could not retrieve latest timestamp from stock_features: {e}")
         return None
 
-async def alpaca_ws_handler():
-    """Connects to Alpaca WebSocket API and listens for real-time stock data, then triggers data processing."""
-    async with websockets.connect(ALPACA_WS_URL) as ws:
+# Background data processing, so the WebSocket keeps reading while indicators are computed
+processing_task = None
+processing_pending = False
+
+metrics.gauge("data_processing_queued", "1 while new bars wait for a data processing run in progress").set_function(
+    lambda: int(processing_pending))
+
+async def process_new_bars():
+    """Runs data processing on the db executor, once more if bars arrived while it ran."""
+    global processing_pending
+    while True:
+        processing_pending = False
+        print("\n[INFO] Running data processing after new real-time data...")
+        try:
+            with DATA_PROCESSING_SECONDS.time():
+                await run_blocking(run_data_processing, executor="db")
+        except Exception as e:
+            print(f"[ERROR] Data processing failed: {e}")
+            PIPELINE_ERRORS.labels("data_processing").inc()
+        if not processing_pending:
+            break
+
+def schedule_data_processing():
+    """Starts processing new bars unless a run is in progress, in which case it is queued."""
+    global processing_task, processing_pending
+    if processing_task is not None and not processing_task.done():
+        processing_pending = True
+        return
+    processing_task = asyncio.create_task(process_new_bars())
+
+async def alpaca_ws_handler(symbols=None, bar_sink=None, price_sink=None):
+    """
+    Connects to Alpaca WebSocket API and listens for real-time stock data, then triggers data processing.
+
+    In the multi-process runtime, `bar_sink(message)` hands stored bars to the feature
+    process instead of processing them here, and `price_sink(message)` forwards trades/quotes.
+    """
+    symbols = symbols or services.get_universe().symbols
+    async with websockets.connect(config.ALPACA_STREAM_URL, max_size=None) as ws:
         # Authenticate
         auth_msg = json.dumps({
             "action": "auth",
@@ -277,44 +327,67 @@ async def alpaca_ws_handler():
         auth_response = await ws.recv()
         print(f"[Alpaca-IEX] Authenticated: {auth_response}")
 
-        # Subscribe to stock market data
-        subscribe_msg = json.dumps({
-            "action": "subscribe",
-            "bars": config.ALL_SYMBOLS
-        })
-        await ws.send(subscribe_msg)
-        subscribe_response = await ws.recv()
-        print(f" [Subscribed] {subscribe_response}")
+        # Subscribe to stock market data (bars for features, trades/quotes for the price service),
+        # in batches so large universes stay under the stream's message size limit
+        for start in range(0, len(symbols), config.SUBSCRIBE_BATCH_SIZE):
+            batch = symbols[start:start + config.SUBSCRIBE_BATCH_SIZE]
+            subscribe_msg = json.dumps({
+                "action": "subscribe",
+                "bars": batch,
+                "trades": batch,
+                "quotes": batch
+            })
+            await ws.send(subscribe_msg)
+            subscribe_response = await ws.recv()
+            if logConfig.DEBUG:
+                print(f" [Subscribed] {subscribe_response}")
+        print(f" [Subscribed] {len(symbols)} symbols")
 
         while True:
             try:
                 message = await ws.recv()
                 data = json.loads(message)
+                bars = []
 
                 for stock in data:
+                    if price_service.apply_message(stock):  # Trades and quotes only update prices in memory
+                        MARKET_MESSAGES.labels(stock["T"]).inc()
+                        if price_sink is not None:
+                            price_sink(stock)
+                        continue
+
                     if stock.get("T") == "b":  # Only process bar data
                         symbol = stock["S"]
-                        timestamp = stock["t"]  # ISO timestamp
-                        open_price = stock["o"]
-                        high = stock["h"]
-                        low = stock["l"]
-                        close = stock["c"]
-                        volume = stock["v"]
-
-                        print(f"\n[LIVE] {symbol} - {timestamp} | Open: {open_price}, High: {high}, Low: {low}, Close: {close}, Volume: {volume}")
-
-                        # Save the real-time data
-                        await save_stock_data(symbol, timestamp, open_price, high, low, close, volume)
-
-                # Trigger data processing right after new data is stored
-                print("\n[INFO] Running data processing after new real-time data...")
-                run_data_processing()
-
+                        bars.append(stock)
+
+                        BARS_INGESTED.labels(symbol).inc()
+                        if logConfig.DEBUG:
+                            print(f"\n[LIVE] {symbol} - {stock['t']} | Open: {stock['o']}, High: {stock['h']}, Low: {stock['l']}, Close: {stock['c']}, Volume: {stock['v']}")
+
+                if not bars:
+                    continue
+                bar_symbols = [bar["S"] for bar in bars]
+                tracer.start_many(bar_symbols)
+
+                # Save the real-time data: every bar of the message in one write
+                await save_stock_data(bars)
+                tracer.mark("db_written", bar_symbols)
+
+                if bar_sink is not None:
+                    for bar in bars:
+                        bar_sink(bar)
+                else:
+                    # Trigger data processing right after new bars are stored
+                    schedule_data_processing()
+
+            except websockets.ConnectionClosed:
+                raise  # The caller reconnects
             except Exception as e:
                 print(f"[Alpaca-IEX] WebSocket Error: {e}")
+                PIPELINE_ERRORS.labels("websocket").inc()
                 await asyncio.sleep(5)  # Retry after small delay
 
 
-async def fetch_realtime_data():
+async def fetch_realtime_data(symbols=None, bar_sink=None, price_sink=None):
     """Runs Alpaca WebSocket handler asynchronously."""
-    await alpaca_ws_handler()
+    await alpaca_ws_handler(symbols, bar_sink, price_sink)
@@ -2,22 +2,22 @@
 import asyncio
 import sqlite3
 import httpx
-import time
 import config
-from atproto import Client, models
+import services
+from executors import run_blocking
+from rateLimiter import rate_limiter, retry_after_seconds
+from sentimentScoring import score_posts
+import metrics
+from atproto import models
 from atproto_client.exceptions import InvokeTimeoutError
-from datetime import datetime, timezone, timedelta
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from datetime import datetime, timezone
 
-# Initialize BlueSky client
-client = Client()
-client.login(config.BLUESKY_USERNAME, config.BLUESKY_PASSWORD)
+POSTS_FETCHED = metrics.counter("posts_fetched_total", "BlueSky posts fetched", ["symbol"])
+POSTS_DUPLICATE = metrics.counter("posts_duplicate_total", "BlueSky posts fetched again and skipped", ["symbol"])
+BLUESKY_SEARCH_SECONDS = metrics.histogram("bluesky_search_seconds", "BlueSky search_posts latency")
+PIPELINE_ERRORS = metrics.counter("pipeline_errors_total", "Errors by pipeline stage", ["stage"])
 
-# Rate limiting settings
-MAX_REQUESTS = 3000  
-TIME_WINDOW = 300  # 5 minutes
-request_count = 0
-start_time = time.time()
+# The BlueSky client logs in on first use (services.get_bluesky_client())
 
 ### =========================
 ###   DATABASE FUNCTIONS
@@ -41,26 +41,57 @@ def initialize_db():
                 PRIMARY KEY (keyword, author, date)
             )
         """)
+        # Duplicate checks and the latest-post lookup per keyword
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bluesky_keyword_date ON bluesky_posts(keyword, date)")
+        # Search windows still being paged through: `cursor` fetches the next (older) page
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bluesky_cursors (
+                keyword TEXT,
+                since TEXT,
+                until TEXT,
+                cursor TEXT,
+                pages INTEGER DEFAULT 0,
+                updated TEXT,
+                PRIMARY KEY (keyword, until)
+            )
+        """)
         conn.commit()
 
-def save_posts_to_db(posts, keyword):
-    """Save BlueSky posts to the SQLite database."""
+def post_row(post, keyword, sentiment_score):
+    return (keyword, post.author.handle, post.record.created_at, post.like_count, post.repost_count,
+            post.quote_count, post.reply_count, post.record.text.replace("\n", " "), sentiment_score)
+
+def save_posts_to_db(posts, keyword, scores=None):
+    """
+    Bulk-inserts BlueSky posts in one transaction, with scores from the scoring stage (or scored
+    here if not given). Posts already stored are skipped. Returns (inserted, duplicates).
+    """
+    if scores is None:
+        scores = [get_sentiment_score(post.record.text) for post in posts]
+    return insert_posts([post_row(post, keyword, score) for post, score in zip(posts, scores)])
+
+def insert_posts(rows):
+    """Inserts bluesky_posts rows (see post_row) in one transaction, skipping stored ones. Returns (inserted, duplicates)."""
     try:
         with sqlite3.connect(config.DB_FILE) as conn:
-            cursor = conn.cursor()
-            for post in sorted(posts, key=lambda post: post.record.created_at):
-                try:
-                    sentiment_score = get_sentiment_score(post.record.text)
-                    cursor.execute("""
-                        INSERT INTO bluesky_posts (keyword, author, date, likes, shares, quotes, replies, text, sentiment_score)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (keyword, post.author.handle, post.record.created_at, post.like_count, post.repost_count, 
-                          post.quote_count, post.reply_count, post.record.text.replace("\n", " "), sentiment_score))
-                except sqlite3.IntegrityError:
-                    continue  # Skip duplicates
-            conn.commit()
+            before = conn.total_changes  # Ignored rows are not counted as changes
+            conn.executemany("""
+                INSERT OR IGNORE INTO bluesky_posts (keyword, author, date, likes, shares, quotes, replies, text, sentiment_score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            inserted = conn.total_changes - before
     except sqlite3.Error as e:
         print(f"Database error: {e}")
+        return 0, 0
+    return inserted, len(rows) - inserted
+
+def drop_stored_posts(posts, keyword):
+    """Posts not yet stored for `keyword`, so overlapping windows are not scored again. One indexed range read."""
+    dates = [post.record.created_at for post in posts]
+    with sqlite3.connect(config.DB_FILE) as conn:
+        stored = set(conn.execute("SELECT author, date FROM bluesky_posts WHERE keyword = ? AND date BETWEEN ? AND ?",
+                                  (keyword, min(dates), max(dates))))
+    return [post for post in posts if (post.author.handle, post.record.created_at) not in stored]
 
 def get_last_scraped_timestamp(keyword):
     """Retrieve the latest timestamp for a keyword from the database."""
@@ -73,98 +104,180 @@ def get_last_scraped_timestamp(keyword):
     conn.close()
     return result if result else None
 
+def load_checkpoints(keyword):
+    """Unfinished search windows for a keyword, newest first: [(since, until, cursor)]."""
+    with sqlite3.connect(config.DB_FILE) as conn:
+        return conn.execute("SELECT since, until, cursor FROM bluesky_cursors WHERE keyword = ? ORDER BY until DESC",
+                            (keyword,)).fetchall()
+
+def save_checkpoint(keyword, since, until, cursor, pages):
+    """Records how far a search window has been paged, so an interrupted fetch resumes there."""
+    with sqlite3.connect(config.DB_FILE) as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO bluesky_cursors (keyword, since, until, cursor, pages, updated)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (keyword, since, until, cursor, pages, datetime.now(timezone.utc).isoformat()))
+
+def clear_checkpoint(keyword, until):
+    with sqlite3.connect(config.DB_FILE) as conn:
+        conn.execute("DELETE FROM bluesky_cursors WHERE keyword = ? AND until = ?", (keyword, until))
+
 ### =========================
 ###   SENTIMENT ANALYSIS
 ### =========================
 
-analyzer = SentimentIntensityAnalyzer()
-
 def get_sentiment_score(text):
     """Compute sentiment score between -1 and 1."""
-    return analyzer.polarity_scores(text)["compound"]
+    return services.get_sentiment_analyzer().polarity_scores(text)["compound"]
 
 ### =========================
-###   API REQUESTS & RATE LIMITING
+###   API REQUESTS
 ### =========================
 
-def wait_if_needed():
-    """Enforces rate limits by delaying requests if needed."""
-    global request_count, start_time
-    elapsed_time = time.time() - start_time
-
-    if request_count >= MAX_REQUESTS:
-        sleep_time = TIME_WINDOW - elapsed_time
-        if sleep_time > 0:
-            print(f"Rate limit reached. Sleeping for {sleep_time:.2f} seconds...")
-            time.sleep(sleep_time)
-        request_count = 0
-        start_time = time.time()
-
-    request_count += 1  
-
-async def search_bluesky_posts(keyword_list, since, until, limit=100, max_retries=5, timeout=60):
-    """Fetch posts from BlueSky API with retries on timeout errors."""
-    since_str = since.isoformat().replace("+00:00", "Z")
-    until_str = until.isoformat().replace("+00:00", "Z")
+def to_iso(dt):
+    return dt.isoformat().replace("+00:00", "Z")
 
+async def search_page(keyword_list, since, until, cursor=None, limit=100, max_retries=5, timeout=60):
+    """Fetch one page of posts from BlueSky API with retries. Returns (posts, next cursor), or None if every retry failed."""
     query_string = " OR ".join(keyword_list)
     params = models.AppBskyFeedSearchPosts.Params(
-        q=query_string, since=since_str, until=until_str, sort="latest", lang="en", limit=limit
+        q=query_string, since=to_iso(since), until=to_iso(until), sort="latest", lang="en", limit=limit, cursor=cursor
     )
 
+    limiter = rate_limiter("bluesky")  # Shared by every search in this process, retries included
     retries = 0
     while retries < max_retries:
         try:
-            try:
-              response = client.app.bsky.feed.search_posts(params, timeout=timeout)
-              # Attempt to access the status code (this might vary based on the exact library version)
-              status_code = client.app.bsky.feed.search_posts.http.last_response.status
-            except AttributeError:
-              status_code = 200 #If cannot access status code assume success
-            if status_code == 200:
-                return response.posts if hasattr(response, "posts") else []
-            elif status_code == 429:
-                print("Rate limit exceeded.  Waiting and retrying...")
-                await asyncio.sleep(60 * retries)  # Wait longer with each retry
-            else:
-                print(f"HTTP Error: {status_code}. Retrying...")
+            await limiter.acquire()
+            # Both calls block, so they run on the "bluesky" pool: BLUESKY_CONCURRENCY searches are in flight at once
+            client = await run_blocking(services.get_bluesky_client, executor="bluesky")  # Logs in on first use
+            with BLUESKY_SEARCH_SECONDS.time():
+                response = await run_blocking(client.app.bsky.feed.search_posts, params, timeout=timeout, executor="bluesky")
+            return (response.posts or []), response.cursor
 
         except (InvokeTimeoutError, httpx.ReadTimeout) as e:
             retries += 1
             # More aggressive exponential backoff
             wait_time = 10 * retries  
             print(f"Timeout error: {e}. Retrying in {wait_time} seconds... (Attempt {retries}/{max_retries})")
+            PIPELINE_ERRORS.labels("bluesky").inc()
             await asyncio.sleep(wait_time)
         except Exception as e: # Catch other exceptions
             retries += 1
-            wait_time = 10 * retries
-            print(f"General error: {e}. Retrying in {wait_time} seconds... (Attempt {retries}/{max_retries})")
+            # The SDK raises on error statuses; the response (if any) is on the exception, not shared client state
+            response = getattr(e, "response", None)
+            status_code = getattr(response, "status_code", None)
+            PIPELINE_ERRORS.labels("bluesky").inc()
+            if status_code == 429:
+                # Every search waits for the server's reset, not just this one
+                wait_time = retry_after_seconds(response.headers or {}) or 60 * retries
+                limiter.pause(wait_time)
+                print(f"Rate limit exceeded. Retrying in {wait_time:.0f} seconds... (Attempt {retries}/{max_retries})")
+            else:
+                wait_time = 10 * retries
+                print(f"General error: {e}. Retrying in {wait_time} seconds... (Attempt {retries}/{max_retries})")
             await asyncio.sleep(wait_time)
 
-        print("Max retries reached. Skipping this request.")
-        return []
+    print("Max retries reached. Skipping this request.")
+    return None
+
+async def iter_post_pages(keyword_list, since, until, cursor=None, limit=None, max_pages=None):
+    """
+    Yields (posts, next cursor) for each page of a search window, newest first, following
+    cursors until the window is exhausted (next cursor None), `max_pages` pages were read,
+    or a page fails after its retries.
+
+    The next page is requested before a page is yielded, so the caller's scoring and
+    inserts overlap the network round trip.
+    """
+    limit = limit or config.BLUESKY_PAGE_SIZE
+    max_pages = max_pages or config.BLUESKY_MAX_PAGES
+    pending = asyncio.ensure_future(search_page(keyword_list, since, until, cursor, limit))
+    try:
+        for page_number in range(1, max_pages + 1):
+            page = await pending
+            pending = None
+            if page is None:
+                return
+            posts, cursor = page
+            if not posts:
+                cursor = None  # An empty page ends the window even if the server sent a cursor
+            if cursor and page_number < max_pages:
+                pending = asyncio.ensure_future(search_page(keyword_list, since, until, cursor, limit))
+            yield posts, cursor
+            if not cursor:
+                return
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+async def search_bluesky_posts(keyword_list, since, until, limit=None):
+    """Fetch every post in a search window from BlueSky API (all pages)."""
+    posts = []
+    async for page, _ in iter_post_pages(keyword_list, since, until, limit=limit):
+        posts.extend(page)
+    return posts
+
+async def fetch_window(symbol, keywords, since, until, cursor=None):
+    """
+    Pages through one search window, saving each page and checkpointing the cursor after it.
+    Returns (posts inserted, posts already stored).
+    """
+    since_str, until_str = to_iso(since), to_iso(until)
+    inserted = duplicates = pages = 0
+    exhausted = False
+    async for posts, cursor in iter_post_pages(keywords, since, until, cursor):
+        pages += 1
+        # Windows overlap (`since` is inclusive, resumed windows repeat pages): stored posts are dropped before scoring
+        new_posts = await run_blocking(drop_stored_posts, posts, symbol, executor="db") if posts else []
+        duplicates += len(posts) - len(new_posts)
+        if new_posts:
+            scores = await score_posts(new_posts)  # In the "sentiment" process pool, while the next page downloads
+            page_inserted, page_duplicates = await run_blocking(save_posts_to_db, new_posts, symbol, scores, executor="db")
+            inserted += page_inserted
+            duplicates += page_duplicates
+        exhausted = cursor is None
+        if not exhausted:
+            await run_blocking(save_checkpoint, symbol, since_str, until_str, cursor, pages, executor="db")
+
+    if exhausted:
+        await run_blocking(clear_checkpoint, symbol, until_str, executor="db")
+    elif pages:
+        # Failed or hit BLUESKY_MAX_PAGES: the next run continues from the stored cursor
+        print(f"Paused BlueSky posts for {symbol} from {since_str} to {until_str} after {pages} pages.")
+    POSTS_FETCHED.labels(symbol).inc(inserted)
+    POSTS_DUPLICATE.labels(symbol).inc(duplicates)
+    return inserted, duplicates
 
 async def fetch_and_save_posts(symbol, keywords):
-    """Fetch posts for a single symbol and save them to the database."""
-    last_scraped = get_last_scraped_timestamp(symbol)
+    """Fetch posts for a single symbol and save them to the database: new posts first, then unfinished older windows."""
+    last_scraped = await run_blocking(get_last_scraped_timestamp, symbol, executor="db")
+    checkpoints = await run_blocking(load_checkpoints, symbol, executor="db")
     start_time = datetime.strptime(config.SENTIMENT_START_DATE, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc) if not last_scraped else datetime.fromisoformat(last_scraped.replace("Z", "+00:00"))
+    if checkpoints:
+        # Posts newer than an unfinished window's end may not be the newest ones stored; start from that end instead
+        start_time = max(start_time, datetime.fromisoformat(checkpoints[0][1].replace("Z", "+00:00")))
     now = datetime.now(timezone.utc)
     print(f"Fetching BlueSky posts for {symbol} from {start_time} to {now}...")
 
-    wait_if_needed()
-    posts = await search_bluesky_posts(keywords, start_time, now)  # Await the asynchronous call
+    inserted, duplicates = await fetch_window(symbol, keywords, start_time, now)
+    for since, until, cursor in checkpoints:
+        print(f"Resuming BlueSky posts for {symbol} from {since} to {until}...")
+        resumed = await fetch_window(symbol, keywords, datetime.fromisoformat(since.replace("Z", "+00:00")),
+                                     datetime.fromisoformat(until.replace("Z", "+00:00")), cursor)
+        inserted, duplicates = inserted + resumed[0], duplicates + resumed[1]
 
-    if posts:
-        save_posts_to_db(posts, symbol)
-        print(f"Saved {len(posts)} posts for {symbol}.")
+    if inserted:
+        print(f"Saved {inserted} posts for {symbol} ({duplicates} already stored).")
     else:
-        print(f"No new posts found for {symbol}.")
-        await asyncio.sleep(60)  # Wait 60 seconds after a failure for this symbol
+        print(f"No new posts found for {symbol} ({duplicates} already stored).")
 
-async def download_bluesky_posts():
-    """Download BlueSky posts concurrently for all symbols."""
-    initialize_db()
-    tasks = [fetch_and_save_posts(symbol, keywords) for symbol, keywords in config.STOCK_DICT.items()]
+async def download_bluesky_posts(symbols=None):
+    """Download BlueSky posts concurrently for all symbols (or only `symbols`)."""
+    await run_blocking(initialize_db, executor="db")
+    await run_blocking(services.get_bluesky_client, executor="bluesky")  # Log in once, before the searches race to
+    tasks = [fetch_and_save_posts(symbol, keywords) for symbol, keywords in services.get_universe().keywords.items()
+             if symbols is None or symbol in symbols]
     await asyncio.gather(*tasks)  # Run all tasks concurrently
 
     print("Finished fetching BlueSky posts.")
\ No newline at end of file
@@ -0,0 +1,41 @@
+import asyncio
+import functools
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import config
+import metrics
+
+# Dedicated thread pools so blocking calls never run on the event loop:
+#   "db" - one thread, so SQLite writes are serialized instead of fighting over the file lock
+#   "io" - blocking network clients (alpaca_trade_api REST)
+#   "bluesky" - the BlueSky SDK's login and searches, BLUESKY_CONCURRENCY at a time
+#   "sentiment" - worker processes (not threads) for CPU-bound sentiment scoring, outside the GIL
+_executors = {}
+
+def get_executor(name):
+    """Returns the named pool, creating it on first use."""
+    if name == "sentiment" and name not in _executors:
+        # Spawned, not forked: the parent has running threads and open SQLite connections
+        _executors[name] = ProcessPoolExecutor(max_workers=config.SENTIMENT_WORKERS, mp_context=mp.get_context("spawn"))
+    if name not in _executors:
+        workers = {"db": 1, "io": config.IO_WORKERS, "bluesky": config.BLUESKY_CONCURRENCY}[name]
+        _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-worker")
+    return _executors[name]
+
+async def run_blocking(func, *args, executor="io", **kwargs):
+    """Runs a blocking function in an executor and awaits its result, leaving the event loop free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(executor), functools.partial(func, *args, **kwargs))
+
+def queue_depth(executor):
+    if isinstance(executor, ProcessPoolExecutor):
+        return len(executor._pending_work_items)  # Queued and running calls
+    return executor._work_queue.qsize()
+
+metrics.gauge("executor_queue_depth", "Blocking calls waiting for an executor thread", ["executor"]).set_function(
+    lambda: {(name,): queue_depth(executor) for name, executor in list(_executors.items())})
+
+def shutdown(wait=True):
+    for executor in _executors.values():
+        executor.shutdown(wait=wait)
+    _executors.clear()
@@ -0,0 +1,206 @@
+import sqlite3
+import asyncio
+import threading
+import numpy as np
+from datetime import datetime, timezone
+import config
+import services
+import metrics
+
+# merged_data columns that are not model features
+NON_FEATURE_COLUMNS = ["timestamp", "symbol", "trade_count"]
+
+# Latest merged_data row per symbol in one pass
+LATEST_ROWS_QUERY = """
+    SELECT * FROM (
+        SELECT m.*, ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY timestamp DESC) AS row_rank
+        FROM merged_data m
+        WHERE timestamp > ?
+    )
+    WHERE row_rank = 1
+"""
+
+def feature_columns(conn):
+    """merged_data feature columns in table order (the order load_latest() stores them in)."""
+    return [row[1] for row in conn.execute("PRAGMA table_info(merged_data)") if row[1] not in NON_FEATURE_COLUMNS]
+
+### =========================
+###   FEATURE CACHE
+### =========================
+
+class FeatureCache:
+    """
+    Latest feature vector per symbol in a preallocated NumPy matrix.
+
+    The merge stage pushes newly merged rows in with load_latest(). Every row update
+    bumps a global version and stamps the row with it, so the trading loop can ask
+    "what changed since version v" with one vectorized comparison and no SQLite,
+    and can await wait_for_changes() instead of polling.
+    """
+
+    def __init__(self, capacity=None, db_file=None):
+        self.capacity = capacity or 16
+        self.db_file = db_file or config.DB_FILE
+        self.columns = None         # Feature column names, in merged_data order
+        self.matrix = None          # (capacity, n_features) float64, NaN until a row is loaded
+        self.row_versions = np.zeros(self.capacity, dtype=np.int64)
+        self.timestamps = [None] * self.capacity
+        self.symbols = []
+        self.symbol_index = {}
+        self.version = 0
+        self.loaded = False
+        self.changed = asyncio.Event()  # Set whenever load_latest() stores new rows
+        self.loop = None                # Loop of the waiting trading loop, for notifications from threads
+        self.lock = threading.Lock()    # The merge stage updates rows from the db executor thread
+
+    def _allocate(self, columns):
+        self.columns = columns
+        self.matrix = np.full((self.capacity, len(columns)), np.nan, dtype=np.float64)
+        # Universe symbols take their universe IDs as rows; others are appended as they appear
+        if not self.symbols:
+            for symbol in services.get_universe().symbols:
+                self._row(symbol)
+
+    def _row(self, symbol):
+        row = self.symbol_index.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row == self.capacity:
+                self._grow()
+            self.symbol_index[symbol] = row
+            self.symbols.append(symbol)
+        return row
+
+    def _grow(self):
+        self.capacity *= 2
+        matrix = np.full((self.capacity, self.matrix.shape[1]), np.nan, dtype=np.float64)
+        matrix[:len(self.symbols)] = self.matrix[:len(self.symbols)]
+        self.matrix = matrix
+        self.row_versions = np.concatenate([self.row_versions, np.zeros(self.capacity - len(self.row_versions), dtype=np.int64)])
+        self.timestamps.extend([None] * (self.capacity - len(self.timestamps)))
+
+    def update(self, symbol, timestamp, values):
+        """Stores a symbol's feature vector if it is newer than the cached one. Returns True if stored."""
+        row = self._row(symbol)
+        if self.timestamps[row] is not None and timestamp <= self.timestamps[row]:
+            return False
+        self.matrix[row] = values
+        self.timestamps[row] = timestamp
+        self.version += 1
+        self.row_versions[row] = self.version
+        return True
+
+    ### SQLite loading
+
+    def load_latest(self, conn=None, since=None):
+        """Loads the latest merged_data row per symbol (only rows newer than `since`, if given). Returns rows stored."""
+        own_conn = conn is None
+        conn = conn or sqlite3.connect(self.db_file)
+        try:
+            cursor = conn.execute(LATEST_ROWS_QUERY, (since or "",))
+            names = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+
+        columns = [name for name in names if name not in NON_FEATURE_COLUMNS and name != "row_rank"]
+        if self.columns is None:
+            self._allocate(columns)
+        elif columns != self.columns:
+            raise ValueError(f"merged_data columns changed: {columns} != {self.columns}")
+
+        timestamp_at, symbol_at = names.index("timestamp"), names.index("symbol")
+        feature_at = [names.index(name) for name in columns]
+        stored = 0
+        with self.lock:
+            for row in rows:
+                values = [np.nan if row[i] is None else row[i] for i in feature_at]
+                stored += self.update(row[symbol_at], row[timestamp_at], values)
+        if stored:
+            self.notify()
+        return stored
+
+    def apply_rows(self, symbols, timestamps, values):
+        """Stores rows computed in another process (see processRuntime). Returns rows stored."""
+        stored = 0
+        with self.lock:
+            for symbol, timestamp, row in zip(symbols, timestamps, values):
+                stored += self.update(symbol, timestamp, row)
+        if stored:
+            self.notify()
+        return stored
+
+    ### Change notification
+
+    def notify(self):
+        """Wakes wait_for_changes(); safe to call from the event loop or a worker thread."""
+        if self.loop is None:
+            self.changed.set()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.changed.set()
+        else:
+            self.loop.call_soon_threadsafe(self.changed.set)
+
+    async def wait_for_changes(self, version, timeout=None):
+        """Waits until rows change after `version` or `timeout` seconds pass. Returns True if something changed."""
+        self.loop = asyncio.get_running_loop()
+        while self.version <= version:
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return self.version > version
+        return True
+
+    def rebuild(self):
+        """Cold start: loads every symbol's latest row with one window-function query."""
+        stored = self.load_latest()
+        self.loaded = True
+        print(f"[INFO] Feature cache rebuilt: {stored} symbols, {len(self.columns)} features, version {self.version}.")
+        return stored
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.rebuild()
+
+    ### Reads (memory only)
+
+    def changed_since(self, version):
+        """Symbols whose rows changed after `version`: (symbols, feature matrix copy, current version)."""
+        with self.lock:
+            rows = np.flatnonzero(self.row_versions[:len(self.symbols)] > version)
+            symbols = [self.symbols[row] for row in rows]
+            matrix = self.matrix[rows] if self.matrix is not None else np.empty((0, 0))
+            return symbols, matrix, self.version
+
+    def get(self, symbol):
+        """Latest (timestamp, feature vector) for one symbol, or None."""
+        row = self.symbol_index.get(symbol)
+        if row is None or self.timestamps[row] is None:
+            return None
+        return self.timestamps[row], self.matrix[row].copy()
+
+    def staleness(self):
+        """{(symbol,): seconds since the bar behind its cached features}, for the metrics gauge."""
+        now = datetime.now(timezone.utc)
+        ages = {}
+        for symbol, timestamp in zip(self.symbols, self.timestamps):
+            if timestamp is None:
+                continue
+            bar_time = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+            if bar_time.tzinfo is None:
+                bar_time = bar_time.replace(tzinfo=timezone.utc)  # merged_data timestamps are UTC
+            ages[(symbol,)] = (now - bar_time).total_seconds()
+        return ages
+
+# Filled by the merge stage (dataCombine.merge_sentiment_data) and read by the main loop
+feature_cache = FeatureCache()
+
+metrics.gauge("feature_staleness_seconds", "Age of the latest merged bar per symbol", ["symbol"]).set_function(
+    feature_cache.staleness)
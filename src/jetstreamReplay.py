@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+import json
+import time
+import random
+import bisect
+import sqlite3
+import asyncio
+import argparse
+import hashlib
+from urllib.parse import urlparse, parse_qs
+import websockets
+import config
+
+# Local stand-in for Jetstream (JETSTREAM_URL), replaying recorded post events, stored bluesky_posts
+# or generated ones, for local runs and streaming ingestion benchmarks. Recordings are Jetstream
+# events one per line, as written by `jetstreamReplay.py -record file.jsonl`.
+
+WORDS = ["beats", "misses", "great", "terrible", "earnings", "guidance", "buying", "selling", "calls", "puts",
+         "bullish", "bearish", "strong", "weak", "upgrade", "downgrade", "love", "hate", "rally", "crash"]
+FILLER = ["the", "my", "cat", "coffee", "today", "weekend", "game", "music", "photo", "friends", "new", "morning"]
+
+def post_event(did, text, created_at, langs=("en",), operation="create"):
+    """A Jetstream commit event for an app.bsky.feed.post record, without time_us (set when it is sent)."""
+    rkey = hashlib.sha1(f"{did}{created_at}{text}".encode()).hexdigest()[:13]
+    commit = {"rev": rkey, "operation": operation, "collection": "app.bsky.feed.post", "rkey": rkey}
+    if operation != "delete":
+        commit["record"] = {"$type": "app.bsky.feed.post", "createdAt": created_at, "langs": list(langs), "text": text}
+        commit["cid"] = f"bafyrei{rkey}"
+    return {"did": did, "kind": "commit", "commit": commit}
+
+def synthetic_events(keywords, count, match_fraction=0.02, seed=0):
+    """
+    `count` events like the live post stream: a `match_fraction` of posts mention one of the
+    `keywords` ({symbol: [keyword, ...]}), the rest are unrelated, with some other-language
+    posts and deletes mixed in.
+    """
+    rng = random.Random(seed)
+    terms = [word for words in keywords.values() for word in words]
+    start = time.time()
+    events = []
+    for i in range(count):
+        did = f"did:plc:author{rng.randrange(100000):06d}"
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(start + i * 0.001)) + f".{i % 1000:03d}Z"
+        roll = rng.random()
+        if roll < 0.03:
+            events.append(post_event(did, "", created_at, operation="delete"))
+        elif roll < 0.03 + match_fraction:
+            words = rng.sample(WORDS, 4)
+            words.insert(rng.randrange(5), rng.choice(terms))
+            events.append(post_event(did, " ".join(words), created_at))
+        else:
+            text = " ".join(rng.choice(FILLER + WORDS) for _ in range(rng.randint(4, 30)))
+            events.append(post_event(did, text, created_at, ("en",) if rng.random() < 0.7 else ("ja",)))
+    return events
+
+def recorded_events(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def db_events(limit=None, db_file=None):
+    """Events for stored bluesky_posts, oldest first (each post once, even if stored for several keywords)."""
+    with sqlite3.connect(db_file or config.DB_FILE) as conn:
+        rows = conn.execute("SELECT author, date, MIN(text) FROM bluesky_posts WHERE text IS NOT NULL "
+                            "GROUP BY author, date ORDER BY date LIMIT ?", (limit or -1,)).fetchall()
+    return [post_event(author, text, date) for author, date, text in rows]
+
+async def record(url, path, seconds):
+    """Writes the live stream's post events to `path` for `seconds`."""
+    written = 0
+    with open(path, "w") as f:
+        async with websockets.connect(f"{url}?wantedCollections=app.bsky.feed.post", max_size=None) as ws:
+            deadline = time.time() + seconds
+            while time.time() < deadline:
+                try:
+                    message = await asyncio.wait_for(ws.recv(), deadline - time.time())
+                except asyncio.TimeoutError:
+                    break
+                f.write(message + "\n")
+                written += 1
+    print(f"[JetstreamReplay] Recorded {written} events from {url} to {path}.")
+
+class JetstreamReplay:
+    """
+    Serves /subscribe like Jetstream: each event gets its time_us when first sent, and a
+    client with ?cursor= is replayed everything sent from that time on, as after a reconnect.
+    """
+
+    def __init__(self, events, host="127.0.0.1", port=8767, rate=0.0, disconnect_every=0):
+        # Body without "{": time_us goes first. A recorded event's own time_us is dropped, or json.loads
+        # would keep that duplicate key over the replay time
+        self.events = [json.dumps({key: value for key, value in event.items() if key != "time_us"})[1:]
+                       for event in events]
+        self.times = []                           # time_us of events[:len(times)], the ones sent so far
+        self.host = host
+        self.port = port
+        self.rate = rate                          # Events per second (0: as fast as the client reads)
+        self.disconnect_every = disconnect_every  # Drop each connection after this many events (0: never)
+        self.sent = 0
+        self.server = None
+
+    async def handler(self, ws):
+        path = getattr(ws, "path", None) or ws.request.path
+        query = parse_qs(urlparse(path).query)
+        cursor = int(query["cursor"][0]) if "cursor" in query else None
+        index = bisect.bisect_left(self.times, cursor) if cursor is not None else len(self.times)
+        start, sent = time.perf_counter(), 0
+
+        while index < len(self.events):
+            if index == len(self.times):
+                self.times.append(max(int(time.time() * 1e6), self.times[-1] + 1 if self.times else 0))
+            try:
+                await ws.send(f'{{"time_us":{self.times[index]},{self.events[index]}')
+            except websockets.ConnectionClosed:
+                print(f"[JetstreamReplay] Client disconnected after {sent} events.")
+                return
+            index += 1
+            sent += 1
+            self.sent += 1
+            if self.disconnect_every and sent % self.disconnect_every == 0:
+                await ws.close(code=1011, reason="replay disconnect")
+                return
+            if self.rate and (ahead := start + sent / self.rate - time.perf_counter()) > 0:
+                await asyncio.sleep(ahead)
+            elif sent % 1000 == 0:
+                await asyncio.sleep(0)  # Let other clients and the server's own tasks run
+        print(f"[JetstreamReplay] Replay complete: {sent} events.")
+        await ws.close()
+
+    async def start(self):
+        self.server = await websockets.serve(self.handler, self.host, self.port, max_size=None)
+        print(f"[JetstreamReplay] Listening on {self.url}")
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/subscribe"
+
+
+async def main(opt):
+    if opt.record:
+        await record(config.JETSTREAM_URL, opt.record, opt.seconds)
+        return
+    if opt.file:
+        events = recorded_events(opt.file)
+    elif opt.db:
+        events = db_events(opt.events, opt.db)
+    else:
+        import services
+        events = synthetic_events(services.get_universe().keywords, opt.events, opt.match)
+    replay = JetstreamReplay(events, opt.host, opt.port, opt.rate, opt.disconnect)
+    await replay.start()
+    await asyncio.Future()  # Serve until interrupted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="usage: jetstreamReplay -p port [-f recording.jsonl | -db file | -n events] [-r rate]")
+    parser.add_argument("--host", action="store", dest="host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", action="store", dest="port", type=int, default=8767)
+    parser.add_argument("-f", "--file", action="store", dest="file", help="Replay a recording (one event per line)")
+    parser.add_argument("-db", action="store", dest="db", help="Replay bluesky_posts from this database")
+    parser.add_argument("-n", "--events", action="store", dest="events", type=int, default=100000,
+                        help="Generated events (or stored posts with -db)")
+    parser.add_argument("-m", "--match", action="store", dest="match", type=float, default=0.02,
+                        help="Fraction of generated posts mentioning a universe keyword")
+    parser.add_argument("-r", "--rate", action="store", dest="rate", type=float, default=0.0, help="Events per second")
+    parser.add_argument("-d", "--disconnect", action="store", dest="disconnect", type=int, default=0,
+                        help="Drop each connection after this many events")
+    parser.add_argument("-record", action="store", dest="record", help="Record JETSTREAM_URL events to this file instead")
+    parser.add_argument("-seconds", action="store", dest="seconds", type=float, default=60, help="Recording length")
+
+    opt = parser.parse_args()
+    try:
+        asyncio.run(main(opt))
+    except KeyboardInterrupt:
+        print("\nShutting down Jetstream replay...")
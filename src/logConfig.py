@@ -0,0 +1,21 @@
+import config
+
+# Log verbosity. Hot paths check a flag before building a message, so disabled
+# levels cost one attribute lookup instead of an f-string:
+#     if logConfig.DEBUG:
+#         print(f"[LIVE] {symbol} ...")
+# Per-cycle [INFO] and recurring [WARN] prints check INFO and WARN the same way;
+# errors and one-off startup messages are always printed.
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+
+DEBUG = INFO = WARN = True
+
+def set_level(name):
+    """Sets the minimum level that gets printed (DEBUG, INFO, WARN or ERROR)."""
+    global DEBUG, INFO, WARN
+    level = LEVELS[name.upper()]
+    DEBUG = level <= LEVELS["DEBUG"]
+    INFO = level <= LEVELS["INFO"]
+    WARN = level <= LEVELS["WARN"]
+
+set_level(config.LOG_LEVEL)
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+import config
+import logConfig
+import metrics
+
+LOOP_LAG_SECONDS = metrics.histogram("event_loop_lag_seconds", "How late each loop monitor tick ran")
+LOOP_STALLS = metrics.counter("event_loop_stalls_total", "Ticks later than LOOP_LAG_THRESHOLD")
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+### =========================
+###   EVENT LOOP LAG MONITOR
+### =========================
+
+class LoopMonitor:
+    """
+    Measures how late the event loop wakes up and names the code that blocked it.
+
+    A coroutine ticks every `interval` seconds and records how late each tick was.
+    A watchdog thread notices when ticks stop and samples the loop thread's stack,
+    so each stall is reported with the function that was running at the time.
+    """
+
+    def __init__(self, interval=None, threshold=None, history=100):
+        self.interval = interval or config.LOOP_MONITOR_INTERVAL
+        self.threshold = threshold or config.LOOP_LAG_THRESHOLD
+        self.stalls = deque(maxlen=history)  # Recent stalls: {"at", "lag_ms", "blocked_by"}
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.ticks = 0
+        self.heartbeat = None
+        self.loop_thread_id = None
+        self.blocked_by = None   # Stack sample for the stall in progress
+        self.watchdog = None
+        self.stopped = threading.Event()
+
+    def sample_stack(self):
+        """Innermost frames of the loop thread, preferring this repo's code over library frames."""
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+        ours = [entry for entry in stack if entry.filename.startswith(SRC_DIR) and not entry.filename.endswith("loopMonitor.py")]
+        entry = (ours or stack)[-1]
+        return f"{os.path.basename(entry.filename)}:{entry.lineno} in {entry.name}"
+
+    def watch(self):
+        """Watchdog thread: samples the loop's stack once per stall."""
+        while not self.stopped.wait(self.interval / 2):
+            if self.heartbeat is None or self.blocked_by is not None:
+                continue
+            if time.monotonic() - self.heartbeat > self.interval + self.threshold:
+                self.blocked_by = self.sample_stack()
+
+    async def run(self):
+        """Ticks forever, logging every tick that came more than `threshold` seconds late."""
+        self.loop_thread_id = threading.get_ident()
+        self.watchdog = threading.Thread(target=self.watch, name="loop-monitor", daemon=True)
+        self.watchdog.start()
+
+        try:
+            while True:
+                self.heartbeat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                lag = time.monotonic() - self.heartbeat - self.interval
+                self.ticks += 1
+                self.total_lag += max(lag, 0.0)
+                self.max_lag = max(self.max_lag, lag)
+                LOOP_LAG_SECONDS.observe(max(lag, 0.0))
+
+                if lag > self.threshold:
+                    blocked_by = self.blocked_by or "unknown (stall shorter than a watchdog sample)"
+                    self.stalls.append({"at": time.time(), "lag_ms": round(lag * 1000, 1), "blocked_by": blocked_by})
+                    LOOP_STALLS.inc()
+                    if logConfig.WARN:
+                        print(f"[WARN] Event loop blocked for {lag * 1000:.0f} ms by {blocked_by}")
+                self.blocked_by = None
+        finally:
+            self.stopped.set()
+
+    def summary(self):
+        """Lag statistics since start."""
+        return {
+            "ticks": self.ticks,
+            "stalls": len(self.stalls),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "mean_lag_ms": round(self.total_lag / self.ticks * 1000, 3) if self.ticks else 0.0,
+            "recent": list(self.stalls)[-5:],
+        }
+
+loop_monitor = LoopMonitor()
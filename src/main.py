@@ -1,43 +1,20 @@
-import time
 import config
+import services
+from tracing import tracer
+from executors import run_blocking
+from loopMonitor import loop_monitor
+from scheduler import Scheduler
+from metrics import start_metrics_server
+import logConfig
 import asyncio
-import sqlite3
-import pandas as pd
-from datetime import datetime, timezone
-from dataFromAlpaca import fetch_historical_data, fetch_realtime_data, run_data_processing
+from dataFromAlpaca import backfill, fetch_realtime_data, run_data_processing
 from dataFromBlueSky import download_bluesky_posts
-from dataCombine import merge_sentiment_data, compute_technical_indicators
-from tradeLogic import trading_loop
+from blueSkyStream import stream_bluesky_posts
+from tradeLogic import trade_symbols, start_trade_updates
+from featureCache import feature_cache
 
 DB_FILE = config.DB_FILE  # Use centralized configuration
 
-# Dictionary to track last recorded time for each stock
-last_recorded_time = {}
-last_sentiment_fetch = 0
-
-def get_latest_features(symbol):
-    """Fetch the latest feature row from the database for the given stock."""
-    with sqlite3.connect(DB_FILE) as conn:
-        query = """
-            SELECT * FROM merged_data
-            WHERE symbol = ?
-            ORDER BY timestamp DESC
-            LIMIT 1
-        """
-        df = pd.read_sql(query, conn, params=(symbol,))
-
-        if df.empty:
-            return None  # No data available
-
-        # Explicitly drop `trade_count`
-        if "trade_count" in df.columns:
-            df.drop(columns=["trade_count"], inplace=True)
-
-        # Update last recorded time for the stock
-        last_recorded_time[symbol] = df.iloc[0]["timestamp"]
-
-        return df.iloc[0].values[1:]  # Exclude `symbol` column from features
-
 async def start_websocket():
     """Runs Alpaca WebSocket handler asynchronously and ensures automatic reconnection."""
     while True:
@@ -48,19 +25,21 @@ async def start_websocket():
             print(f"[ERROR] WebSocket disconnected: {e}. Reconnecting in 10 seconds...")
             await asyncio.sleep(10)  # Wait before reconnecting
 
-async def periodic_data_processing():
-    """Periodically runs data processing."""
-    while True:
-        print("\n[INFO] Running scheduled data processing...")
-        try:
-            # Fetch BlueSky data
-            print("\n[Step 4] Fetching BlueSky sentiment data...")
-            await download_bluesky_posts()
+async def refresh_sentiment():
+    print("\n[Step 4] Fetching BlueSky sentiment data...")
+    await download_bluesky_posts()
 
-            run_data_processing()
-        except Exception as e:
-            print(f"[ERROR] Periodic data processing failed: {e}")
-        await asyncio.sleep(900)  # Wait 15 minutes (900 seconds)
+async def refresh_features():
+    print("\n[INFO] Running scheduled data processing...")
+    await run_blocking(run_data_processing, executor="db")
+
+def create_scheduler():
+    """Sentiment lands shortly before each bar close; indicators and merge run just after it."""
+    scheduler = Scheduler()
+    if config.BLUESKY_INGEST_MODE == "search":  # Streamed posts need no refresh
+        scheduler.add("sentiment", refresh_sentiment, offset=config.SENTIMENT_REFRESH_OFFSET)
+    scheduler.add("features", refresh_features, offset=config.FEATURE_REFRESH_OFFSET)
+    return scheduler
 
 async def main():
     """Main async function to run historical fetch, WebSocket streaming, and periodic processing."""
@@ -68,17 +47,41 @@ async def main():
     print("   Starting Real-Time Trading Pipeline   ")
     print("==============================\n")
 
-    # Step 1: Fetch historical stock data before real-time streaming
-    fetch_historical_data()
+    # Counters, gauges and latency histograms in Prometheus format
+    if config.METRICS_ENABLED:
+        start_metrics_server()
+
+    # Report whenever blocking work holds up the event loop
+    loop_monitor_task = asyncio.create_task(loop_monitor.run())
+
+    # Create REST clients, the BlueSky session and the model up front, with a timing report
+    await run_blocking(services.bootstrap)
+
+    # Step 1: Fetch historical stock data before real-time streaming (sharded across threads)
+    await backfill()
 
     # Step 2: Start real-time stock data streaming
     websocket_task = asyncio.create_task(start_websocket())
 
-    # Step 3: Start periodic data processing as a separate task
-    processing_task = asyncio.create_task(periodic_data_processing())
-
-    symbols_to_trade = config.ALL_SYMBOLS
-    previous_features = {}
+    # Step 3: Bar-aligned sentiment and feature refreshes (sentiment also runs once now)
+    scheduler = create_scheduler()
+    processing_task = asyncio.create_task(scheduler.run(run_now=["sentiment", "features"]))
+    if config.BLUESKY_INGEST_MODE == "stream":
+        # Posts are scored and stored as they are published, so every merge sees them
+        stream_task = asyncio.create_task(stream_bluesky_posts())
+
+    # Keep the local order/position book current from Alpaca trade updates
+    trade_updates_task = asyncio.create_task(start_trade_updates())
+
+    try:
+        await decision_loop()
+    finally:
+        scheduler.report()
+
+async def decision_loop():
+    """Step 5: trades every symbol whose features changed, waking on feature cache updates."""
+    symbols_to_trade = set(services.get_universe())
+    last_version = 0
     start_flag = 1
 
     while True:
@@ -86,30 +89,38 @@ async def main():
             # Step 3: done in dataFromeAlpaca
 
             # Step 5: Prepare feature data & execute trades
-            features_dict = {}
-
-            for symbol in symbols_to_trade:
-                latest_features = get_latest_features(symbol)
-
-                print(f"[DEBUG] Latest features for {symbol}: {latest_features}")
-
-                if latest_features is not None:
-                    if symbol in previous_features and (previous_features[symbol] == latest_features).all():
-                        print(f"No change in features for {symbol}")
-                    else:
-                        print(f"Features updated for {symbol}")
-                        features_dict[symbol] = latest_features
-                        previous_features[symbol] = latest_features  # Persist the update
-
-                        # Refrain from trading in the frist iteration
-                        if start_flag < 10:
-                            start_flag += 1
-                        else:
-                            trading_loop(features_dict)
-                            #print("[INFO] Not trading now")
-
-            print("\nPipeline iteration completed! Sleeping for 1 minute before next data fetch...\n")
-            await asyncio.sleep(60)  # Async-friendly sleep
+            # Latest features per symbol live in memory; the merge stage keeps them current
+            if not feature_cache.loaded:
+                await run_blocking(feature_cache.rebuild, executor="db")
+
+            # Wake as soon as the merge stage stores new rows (or after the max wait)
+            if not await feature_cache.wait_for_changes(last_version, config.DECISION_MAX_WAIT):
+                if logConfig.INFO:
+                    print(f"[INFO] No new features in {config.DECISION_MAX_WAIT} seconds.")
+                await run_blocking(tracer.flush, executor="db")
+                continue
+
+            symbols, feature_matrix, last_version = feature_cache.changed_since(last_version)
+            tradable = [i for i, symbol in enumerate(symbols) if symbol in symbols_to_trade]
+            symbols, feature_matrix = [symbols[i] for i in tradable], feature_matrix[tradable]
+
+            for symbol in symbols:
+                if logConfig.DEBUG:
+                    print(f"Features updated for {symbol}")
+                tracer.mark("features_read", [symbol])
+
+                # Refrain from trading in the frist iteration
+                if start_flag < 10:
+                    start_flag += 1
+
+            # Predict and trade every updated symbol in one batch
+            if symbols and start_flag >= 10:
+                await trade_symbols(symbols, feature_matrix)
+                #print("[INFO] Not trading now")
+
+            await run_blocking(tracer.flush, executor="db")  # Write this iteration's trace events in one batch
+
+            print("\nPipeline iteration completed! Waiting for the next feature update...\n")
 
         except Exception as e:
             print(f"\nERROR: {e}")
@@ -0,0 +1,233 @@
+import math
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+# Latency buckets in seconds (upper bounds)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+### =========================
+###   METRIC TYPES
+### =========================
+
+class Metric:
+    """Base for counters, gauges and histograms; `labels(...)` returns one child per label combination."""
+
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()  # Executor threads update metrics too
+
+    def labels(self, *labelvalues):
+        child = self.children.get(labelvalues)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(labelvalues, self.new_child())
+        return child
+
+    def samples(self):
+        """Yields (suffix, labelvalues, extra labels, value) for rendering."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labelvalues, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(self.labelnames, labelvalues, extra)} {format_value(value)}")
+        return "\n".join(lines)
+
+class CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Counter(Metric):
+    kind = "counter"
+
+    def new_child(self):
+        return CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for labelvalues, child in list(self.children.items()):
+            yield "", labelvalues, None, child.value
+
+class GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+class Gauge(Metric):
+    """A value that goes up and down. set_function() computes it at scrape time instead."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.function = None
+
+    def new_child(self):
+        return GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        """`function()` returns a number, or {labelvalues tuple: number} for labelled gauges."""
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            try:
+                values = self.function()
+            except Exception as e:
+                print(f"[WARN] Gauge {self.name} failed: {e}")
+                return
+            if not isinstance(values, dict):
+                values = {(): values}
+            for labelvalues, value in values.items():
+                yield "", labelvalues, None, value
+            return
+        for labelvalues, child in list(self.children.items()):
+            yield "", labelvalues, None, child.value
+
+class HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return HistogramTimer(self)
+
+class HistogramTimer:
+    """Context manager that observes the elapsed seconds of its block."""
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self):
+        for labelvalues, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(child.buckets, child.counts):
+                cumulative += count
+                yield "_bucket", labelvalues, [("le", format_value(bound))], cumulative
+            yield "_sum", labelvalues, None, child.sum
+            yield "_count", labelvalues, None, child.count
+
+### =========================
+###   REGISTRY
+### =========================
+
+_registry = {}
+
+def _register(cls, name, help, labelnames=(), **kwargs):
+    """Returns the metric called `name`, creating it once (modules can declare the same metric safely)."""
+    metric = _registry.get(name)
+    if metric is None:
+        metric = _registry[name] = cls(name, help, labelnames, **kwargs)
+    return metric
+
+def counter(name, help, labelnames=()):
+    return _register(Counter, name, help, labelnames)
+
+def gauge(name, help, labelnames=()):
+    return _register(Gauge, name, help, labelnames)
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help, labelnames, buckets=buckets)
+
+def render():
+    """Every registered metric in Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in list(_registry.values())) + "\n"
+
+### =========================
+###   HTTP ENDPOINT
+### =========================
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    """Serves /metrics from a daemon thread, so it works for both the async pipeline and threaded tools."""
+    port = port or config.METRICS_PORT
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[INFO] Metrics available at http://{host}:{port}/metrics")
+    return server
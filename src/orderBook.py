@@ -0,0 +1,214 @@
+import json
+import asyncio
+import websockets
+import inspect
+import config
+from executors import run_blocking
+from datetime import datetime, timezone
+
+# Trade update events after which an order is no longer open
+TERMINAL_EVENTS = {"fill", "canceled", "expired", "rejected", "done_for_day", "replaced"}
+FILL_EVENTS = {"fill", "partial_fill"}
+
+class BookOrder:
+    """Open order as tracked by the local book (same attribute names as Alpaca's order entity)."""
+
+    def __init__(self, id, symbol, side, qty, limit_price=None, filled_qty=0, status="new"):
+        self.id = id
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.limit_price = limit_price
+        self.filled_qty = filled_qty
+        self.status = status
+
+    @classmethod
+    def from_alpaca(cls, order):
+        """Builds a BookOrder from an Alpaca REST order entity or a trade_updates order dict."""
+        get = order.get if isinstance(order, dict) else lambda key: getattr(order, key, None)
+        return cls(
+            id=get("id"),
+            symbol=get("symbol"),
+            side=get("side"),
+            qty=float(get("qty") or 0),
+            limit_price=float(get("limit_price")) if get("limit_price") is not None else None,
+            filled_qty=float(get("filled_qty") or 0),
+            status=get("status") or "new",
+        )
+
+async def call_broker(method, *args, **kwargs):
+    """Awaits a Broker method; a synchronous client (tradeapi.REST) is called in the io executor instead."""
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await run_blocking(method, *args, **kwargs)
+
+### =========================
+###   ORDER & POSITION BOOK
+### =========================
+
+class OrderBook:
+    """
+    Local order/position book fed by Alpaca's trade_updates stream.
+
+    Fills and cancels are applied incrementally, so position and pending checks are
+    dictionary lookups. REST is only used to reconcile on (re)connect.
+    """
+
+    def __init__(self):
+        self.cash = None
+        self.positions = {}         # {symbol: {quantity, avg_price}}
+        self.open_orders = {}       # {symbol: {side: {order_id: BookOrder}}}
+        self.orders = {}            # {order_id: BookOrder} for open orders
+        self.reconciled_fills = {}  # {order_id: filled_qty} already counted in the last reconcile
+        self.live = False           # True while the stream is connected and reconciled
+        self.last_event_at = None
+        self.listeners = []         # Called as listener(event, order) after each update
+
+    def add_listener(self, listener):
+        """Registers a callback for every applied trade update."""
+        self.listeners.append(listener)
+
+    async def reconcile(self, broker):
+        """
+        Rebuilds the book from Alpaca REST (account, positions, open and recently closed orders,
+        fetched concurrently). The stream is subscribed first, so fills that land meanwhile are
+        buffered on the socket; each order's filled_qty is kept so those fills are not counted twice.
+        """
+        account, alpaca_positions, alpaca_orders, closed_orders = await asyncio.gather(
+            call_broker(broker.get_account), call_broker(broker.list_positions),
+            call_broker(broker.list_orders, status="open", limit=500),
+            call_broker(broker.list_orders, status="closed", limit=500)
+        )
+        positions = {
+            position.symbol: {"quantity": int(position.qty), "avg_price": float(position.avg_entry_price)}
+            for position in alpaca_positions
+        }
+
+        orders = {}
+        open_orders = {}
+        for alpaca_order in alpaca_orders:
+            order = BookOrder.from_alpaca(alpaca_order)
+            orders[order.id] = order
+            open_orders.setdefault(order.symbol, {}).setdefault(order.side, {})[order.id] = order
+
+        self.cash = float(account.cash)
+        self.positions = positions
+        self.orders = orders
+        self.open_orders = open_orders
+        self.reconciled_fills = {order.id: order.filled_qty
+                                 for order in map(BookOrder.from_alpaca, [*closed_orders, *alpaca_orders])}
+        print(f"[INFO] Order book reconciled: {len(positions)} positions, {len(orders)} open orders.")
+
+    def _add_open(self, order):
+        self.orders[order.id] = order
+        self.open_orders.setdefault(order.symbol, {}).setdefault(order.side, {})[order.id] = order
+
+    def _remove_open(self, order):
+        self.orders.pop(order.id, None)
+        sides = self.open_orders.get(order.symbol, {})
+        sides.get(order.side, {}).pop(order.id, None)
+        if order.side in sides and not sides[order.side]:
+            del sides[order.side]
+        if order.symbol in self.open_orders and not sides:
+            del self.open_orders[order.symbol]
+
+    def _apply_fill(self, symbol, side, qty, price, position_qty=None):
+        """Updates position and cash for one (partial) fill."""
+        position = self.positions.get(symbol, {"quantity": 0, "avg_price": 0.0})
+        old_quantity = position["quantity"]
+        new_quantity = old_quantity + (qty if side == "buy" else -qty)
+
+        # The broker's resulting position is authoritative when present
+        if position_qty is not None:
+            new_quantity = int(float(position_qty))
+
+        if new_quantity == 0:
+            self.positions.pop(symbol, None)
+        else:
+            if old_quantity == 0 or (old_quantity > 0) != (new_quantity > 0):
+                avg_price = price  # New or flipped position
+            elif abs(new_quantity) > abs(old_quantity):
+                avg_price = (abs(old_quantity) * position["avg_price"] + qty * price) / abs(new_quantity)
+            else:
+                avg_price = position["avg_price"]  # Reducing keeps the entry price
+            self.positions[symbol] = {"quantity": new_quantity, "avg_price": avg_price}
+
+        if self.cash is not None:
+            self.cash += qty * price if side == "sell" else -qty * price
+
+    def apply_trade_update(self, data):
+        """Applies one trade_updates message payload ({"event", "order", "price", "qty", "position_qty"})."""
+        event = data.get("event")
+        order = BookOrder.from_alpaca(data.get("order", {}))
+        if order.id is None:
+            return
+        order.status = event
+
+        # A fill the reconcile already saw (buffered while it ran) is in the REST cash and positions
+        covered = order.filled_qty <= self.reconciled_fills.get(order.id, 0)
+        if event in FILL_EVENTS and data.get("qty") is not None and not covered:
+            self._apply_fill(order.symbol, order.side, float(data["qty"]), float(data["price"]), data.get("position_qty"))
+
+        if event in TERMINAL_EVENTS:
+            self._remove_open(order)
+        else:
+            self._add_open(order)
+
+        self.last_event_at = datetime.now(timezone.utc)
+        for listener in self.listeners:
+            listener(event, order)
+
+    def record_submission(self, order):
+        """Tracks our own submitted order as open until its trade update arrives."""
+        self._add_open(BookOrder.from_alpaca(order))
+
+    ### Queries (all served from memory)
+
+    def position(self, symbol):
+        return self.positions.get(symbol)
+
+    def has_open_order(self, symbol, side=None):
+        sides = self.open_orders.get(symbol)
+        if not sides:
+            return False
+        return side is None or bool(sides.get(side))
+
+    def pending_orders(self):
+        """Open orders as {symbol: side}, like AccountSnapshot.pending_orders()."""
+        return {symbol: side for symbol, sides in self.open_orders.items() for side in sides}
+
+### =========================
+###   TRADE UPDATES STREAM
+### =========================
+
+async def run_trade_updates(book, broker, url=None, reconnect_delay=5):
+    """Keeps `book` current from the trade_updates WebSocket, reconciling via REST on every (re)connect."""
+    url = url or config.ALPACA_TRADE_STREAM_URL
+    while True:
+        try:
+            async with websockets.connect(url) as ws:
+                await ws.send(json.dumps({
+                    "action": "auth",
+                    "key": config.ALPACA_API_KEY,
+                    "secret": config.ALPACA_API_SECRET
+                }))
+                print(f"[TradeUpdates] Authenticated: {await ws.recv()}")
+
+                await ws.send(json.dumps({"action": "listen", "data": {"streams": ["trade_updates"]}}))
+                print(f"[TradeUpdates] Listening: {await ws.recv()}")
+
+                # Fills may have happened while we were disconnected. Reconciling after "listen" leaves
+                # no gap; fills buffered meanwhile that REST already counted are skipped when applied
+                await book.reconcile(broker)
+                book.live = True
+
+                async for message in ws:
+                    payload = json.loads(message)  # Paper trading sends binary frames; json handles bytes
+                    if payload.get("stream") == "trade_updates":
+                        book.apply_trade_update(payload["data"])
+
+        except Exception as e:
+            print(f"[TradeUpdates] Stream error: {e}. Reconnecting in {reconnect_delay} seconds...")
+        finally:
+            book.live = False
+        await asyncio.sleep(reconnect_delay)
@@ -0,0 +1,161 @@
+import time
+import numpy as np
+import config
+import logConfig
+import services
+import metrics
+
+### =========================
+###   PRICE SERVICE
+### =========================
+
+class PriceService:
+    """
+    Last trade and quote per symbol, kept in memory from the market-data WebSocket.
+
+    Lookups in the decision path are array reads by symbol ID. Symbols with no update
+    within `max_age` seconds are refreshed with one batched snapshot request.
+    """
+
+    def __init__(self, max_age=None, symbols=None):
+        self.max_age = max_age or config.PRICE_MAX_AGE
+        self.initial_symbols = symbols  # Default: the universe, registered on the first update
+        self.symbols = []
+        self.symbol_index = {}
+        capacity = 16
+        self.trade_price = np.full(capacity, np.nan)
+        self.trade_received = np.full(capacity, -np.inf)   # time.monotonic() of the last trade
+        self.bid = np.full(capacity, np.nan)
+        self.ask = np.full(capacity, np.nan)
+        self.quote_received = np.full(capacity, -np.inf)
+        self.timestamps = [None] * capacity                # Exchange timestamp of the last update
+
+    def _row(self, symbol):
+        if not self.symbols:
+            # Universe symbols take their universe IDs as rows; others are appended as they appear
+            for known in self.initial_symbols if self.initial_symbols is not None else services.get_universe().symbols:
+                self._add(known)
+        row = self.symbol_index.get(symbol)
+        return row if row is not None else self._add(symbol)
+
+    def _add(self, symbol):
+        row = self.symbol_index[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        if row == len(self.trade_price):
+            self._grow()
+        return row
+
+    def _grow(self):
+        extra = len(self.trade_price)
+        for name, fill in (("trade_price", np.nan), ("trade_received", -np.inf), ("bid", np.nan), ("ask", np.nan), ("quote_received", -np.inf)):
+            setattr(self, name, np.concatenate([getattr(self, name), np.full(extra, fill)]))
+        self.timestamps.extend([None] * extra)
+
+    def on_trade(self, symbol, price, size=None, timestamp=None):
+        row = self._row(symbol)
+        self.trade_price[row] = price
+        self.trade_received[row] = time.monotonic()
+        self.timestamps[row] = timestamp
+
+    def on_quote(self, symbol, bid, ask, timestamp=None):
+        row = self._row(symbol)
+        self.bid[row] = bid
+        self.ask[row] = ask
+        self.quote_received[row] = time.monotonic()
+        self.timestamps[row] = timestamp
+
+    def apply_message(self, message):
+        """Applies one Alpaca stream message (T="t" trade, T="q" quote). Returns True if it was a price update."""
+        kind = message.get("T")
+        if kind == "t":
+            self.on_trade(message["S"], message["p"], message.get("s"), message.get("t"))
+        elif kind == "q":
+            self.on_quote(message["S"], message["bp"], message["ap"], message.get("t"))
+        else:
+            return False
+        return True
+
+    def apply_snapshot(self, symbol, trade=None, quote=None):
+        """Stores the latest trade/quote from a REST snapshot (objects with .p / .bp / .ap / .t)."""
+        if trade is not None:
+            self.on_trade(symbol, trade.p, getattr(trade, "s", None), getattr(trade, "t", None))
+        if quote is not None and quote.bp and quote.ap:
+            self.on_quote(symbol, quote.bp, quote.ap, getattr(quote, "t", None))
+
+    ### Memory reads
+
+    def staleness(self, symbol):
+        """Seconds since the last trade or quote for `symbol` arrived (inf if never)."""
+        row = self.symbol_index.get(symbol)
+        if row is None:
+            return float("inf")
+        return time.monotonic() - float(max(self.trade_received[row], self.quote_received[row]))
+
+    def latest_price(self, symbol, max_age=None):
+        """Last trade price, or the quote midpoint if only the quote is fresh. None if both are stale."""
+        row = self.symbol_index.get(symbol)
+        if row is None:
+            return None
+        max_age = self.max_age if max_age is None else max_age
+        now = time.monotonic()
+        if now - self.trade_received[row] <= max_age:
+            return float(self.trade_price[row])
+        if now - self.quote_received[row] <= max_age:
+            return float((self.bid[row] + self.ask[row]) / 2)
+        return None
+
+    def stale_symbols(self, symbols, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        return [symbol for symbol in symbols if self.staleness(symbol) > max_age]
+
+    def staleness_report(self, symbols=None):
+        """{symbol: seconds since last update} for `symbols` (default: every symbol seen)."""
+        if symbols is None:
+            seen = np.flatnonzero(np.maximum(self.trade_received, self.quote_received)[:len(self.symbols)] > -np.inf)
+            symbols = [self.symbols[row] for row in seen]
+        return {symbol: round(self.staleness(symbol), 3) for symbol in symbols}
+
+    ### Batched fallback
+
+    async def get_prices(self, symbols, broker, max_age=None):
+        """Prices for `symbols`: memory reads, plus one snapshot request for any stale symbols."""
+        stale = self.stale_symbols(symbols, max_age)
+        if stale:
+            try:
+                snapshots = await broker.get_snapshots(stale)
+                for symbol, snapshot in snapshots.items():
+                    self.apply_snapshot(symbol, snapshot.latestTrade, snapshot.latestQuote)
+            except Exception as e:
+                if logConfig.WARN:
+                    print(f"[WARN] Snapshot request failed for {len(stale)} stale symbols: {e}")
+        return self.collect(symbols, max_age)
+
+    def get_prices_sync(self, symbols, api, max_age=None):
+        """Same as get_prices() for synchronous callers holding an alpaca_trade_api REST client."""
+        stale = self.stale_symbols(symbols, max_age)
+        if stale:
+            try:
+                for symbol, snapshot in api.get_snapshots(stale).items():
+                    if snapshot is not None:
+                        self.on_trade(symbol, snapshot.latest_trade.price)
+            except Exception as e:
+                if logConfig.WARN:
+                    print(f"[WARN] Snapshot request failed for {len(stale)} stale symbols: {e}")
+        return self.collect(symbols, max_age)
+
+    def collect(self, symbols, max_age=None):
+        prices = {}
+        for symbol in symbols:
+            price = self.latest_price(symbol, max_age)
+            if price is None:
+                if logConfig.WARN:
+                    print(f"[WARN] No fresh price for {symbol} (last update {self.staleness(symbol):.1f}s ago)")
+            else:
+                prices[symbol] = price
+        return prices
+
+# Shared by the market-data stream (dataFromAlpaca) and the trading cycle (tradeLogic)
+price_service = PriceService()
+
+metrics.gauge("price_staleness_seconds", "Seconds since the last trade or quote per symbol", ["symbol"]).set_function(
+    lambda: {(symbol,): age for symbol, age in price_service.staleness_report().items()})
@@ -0,0 +1,270 @@
+import os
+import sys
+import signal
+import asyncio
+import sqlite3
+import multiprocessing as mp
+import numpy as np
+import config
+import logConfig
+import services
+import metrics
+import executors
+from executors import run_blocking
+from loopMonitor import loop_monitor
+from rateLimiter import rate_limiter
+from scheduler import Scheduler, timeframe_seconds
+from sharedRing import SharedRing, BAR_DTYPE, PRICE_DTYPE, PRICE_TRADE, PRICE_QUOTE, feature_dtype, wait_any
+
+STAGE_RESTARTS = metrics.counter("stage_restarts_total", "Stage processes restarted after exiting", ["stage"])
+
+### =========================
+###   STAGE PROCESSES
+### =========================
+
+def run_stage(name, metrics_port, target, *args):
+    """Child process entry point: a metrics endpoint for this process, then the stage loop."""
+    print(f"[INFO] Stage {name} started (pid {os.getpid()}).")
+    # Stage.stop() terminates the stage: exit normally so its scoring processes are shut down too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if config.METRICS_ENABLED:
+        metrics.start_metrics_server(metrics_port)
+    try:
+        target(*args)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executors.shutdown(wait=False)
+
+def ingestion_stage(symbols, bar_spec, price_spec):
+    """Backfills `symbols`, then streams them: stores bars in SQLite and forwards bars and prices to the rings."""
+    from dataFromAlpaca import fetch_historical_data, fetch_realtime_data
+    bar_ring, price_ring = SharedRing.attach(bar_spec), SharedRing.attach(price_spec)
+    ids = services.get_universe().ids  # Symbols travel through the rings as their universe ID
+    rate_limiter("alpaca_data").set_share(1 / config.INGEST_PROCESSES)  # Shards split the account's data quota
+
+    fetch_historical_data(symbols)  # Step 1 for this shard
+
+    def bar_sink(message):
+        bar_ring.push((ids[message["S"]], message["t"], message["o"], message["h"], message["l"], message["c"], message["v"]))
+
+    def price_sink(message):
+        if message["T"] == "t":
+            price_ring.push((ids[message["S"]], PRICE_TRADE, message["p"], 0.0, 0.0, message.get("t") or ""))
+        else:
+            price_ring.push((ids[message["S"]], PRICE_QUOTE, 0.0, message["bp"], message["ap"], message.get("t") or ""))
+
+    async def stream():
+        while True:
+            try:
+                await fetch_realtime_data(symbols, bar_sink, price_sink)
+            except Exception as e:
+                print(f"[ERROR] WebSocket disconnected: {e}. Reconnecting in 10 seconds...")
+                await asyncio.sleep(10)
+
+    asyncio.run(stream())
+
+def feature_stage(bar_specs, feature_spec):
+    """Computes indicators and merges sentiment whenever bars arrive, then publishes the new feature rows."""
+    from dataFromAlpaca import run_data_processing
+    from featureCache import feature_cache
+    bar_rings = [SharedRing.attach(spec) for spec in bar_specs]
+    feature_ring = SharedRing.attach(feature_spec)
+
+    # Local cache: merge_sentiment_data() pushes merged rows into it, and changed rows go out on the ring
+    feature_cache.rebuild()
+    if feature_ring.dtype["values"].shape[0] != len(feature_cache.columns):
+        raise ValueError(f"Feature ring holds {feature_ring.dtype['values'].shape[0]} features, merged_data has {len(feature_cache.columns)}")
+    published = publish_features(feature_cache, feature_ring, 0)  # Full snapshot for the decision process
+
+    while True:
+        # Bars that arrive during a run are handled together by the next one.
+        # Without bars, runs still happen once per bar period as a backstop.
+        wait_any(bar_rings, timeframe_seconds(config.TIMEFRAME))
+        bars = sum(len(ring.pop_many()) for ring in bar_rings)
+        print(f"\n[INFO] Running data processing for {bars} new bars...")
+        try:
+            run_data_processing()
+        except Exception as e:
+            print(f"[ERROR] Data processing failed: {e}")
+        published = publish_features(feature_cache, feature_ring, published)
+
+def publish_features(cache, ring, version):
+    """Pushes rows that changed after `version` onto the feature ring. Returns the cache version published."""
+    ids = services.get_universe().ids
+    symbols, matrix, current = cache.changed_since(version)
+    rows = [i for i, symbol in enumerate(symbols) if symbol in ids]
+    if rows:
+        records = np.zeros(len(rows), dtype=ring.dtype)
+        records["symbol_id"] = [ids[symbols[i]] for i in rows]
+        records["timestamp"] = [cache.get(symbols[i])[0] for i in rows]
+        records["values"] = matrix[rows]
+        written = ring.push_many(records)
+        if written < len(rows):
+            if logConfig.WARN:
+                print(f"[WARN] Feature ring full: dropped {len(rows) - written} rows.")
+    return current
+
+def sentiment_stage(symbols, shards):
+    """Scrapes and scores BlueSky posts for `symbols` shortly before each bar close (see scheduler.py), or streams them."""
+    from dataFromBlueSky import download_bluesky_posts
+    rate_limiter("bluesky").set_share(1 / shards)
+    if config.BLUESKY_INGEST_MODE == "stream":
+        from blueSkyStream import stream_bluesky_posts
+        asyncio.run(stream_bluesky_posts(symbols))
+        return
+
+    async def scrape():
+        await download_bluesky_posts(symbols)
+
+    scheduler = Scheduler()
+    scheduler.add("sentiment", scrape, offset=config.SENTIMENT_REFRESH_OFFSET)
+    try:
+        asyncio.run(scheduler.run(run_now=["sentiment"]))
+    finally:
+        scheduler.report()
+
+### =========================
+###   DECISION (PARENT PROCESS)
+### =========================
+
+def apply_feature_records(cache, records):
+    symbols = [services.get_universe().symbol(i) for i in records["symbol_id"]]
+    timestamps = [timestamp.decode() for timestamp in records["timestamp"]]
+    return cache.apply_rows(symbols, timestamps, records["values"])
+
+def apply_price_records(prices, records):
+    universe = services.get_universe()
+    for record in records:
+        symbol = universe.symbol(record["symbol_id"])
+        timestamp = record["timestamp"].decode() or None
+        if record["kind"] == PRICE_TRADE:
+            prices.on_trade(symbol, record["price"], timestamp=timestamp)
+        else:
+            prices.on_quote(symbol, record["bid"], record["ask"], timestamp=timestamp)
+
+async def drain_rings(feature_ring, price_rings):
+    """Moves feature rows into the feature cache (waking the decision loop) and prices into the price service."""
+    from featureCache import feature_cache
+    from priceService import price_service
+    while True:
+        records = feature_ring.pop_many()
+        if len(records):
+            apply_feature_records(feature_cache, records)
+        for ring in price_rings:
+            apply_price_records(price_service, ring.pop_many())
+        await asyncio.sleep(config.RING_POLL_INTERVAL)
+
+async def run_decision(feature_ring, price_rings):
+    from featureCache import feature_cache
+    from tradeLogic import start_trade_updates
+    from main import decision_loop
+
+    if config.METRICS_ENABLED:
+        metrics.start_metrics_server()
+    loop_monitor_task = asyncio.create_task(loop_monitor.run())
+
+    # The decision process only needs the trading clients and the model
+    await run_blocking(services.bootstrap, ["rest_api", "broker", "model", "scaler"])
+    await run_blocking(feature_cache.rebuild, executor="db")
+
+    drain_task = asyncio.create_task(drain_rings(feature_ring, price_rings))
+    trade_updates_task = asyncio.create_task(start_trade_updates())
+    await decision_loop()
+
+### =========================
+###   SUPERVISOR
+### =========================
+
+class Stage:
+    """One stage process; restarted with the same rings if it exits, since ring state lives in shared memory."""
+
+    def __init__(self, context, name, metrics_port, target, *args):
+        self.context = context
+        self.name = name
+        self.args = (name, metrics_port, target) + args
+        self.process = None
+
+    def start(self):
+        # Not daemonic: daemonic processes cannot start children, and stages run the "sentiment" process pool
+        self.process = self.context.Process(target=run_stage, args=self.args, name=self.name, daemon=False)
+        self.process.start()
+
+    def stop(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+
+async def supervise(stages):
+    """Restarts stage processes that exit, so one crashed stage does not take the pipeline down."""
+    while True:
+        for stage in stages:
+            if not stage.process.is_alive():
+                print(f"[ERROR] Stage {stage.name} exited with code {stage.process.exitcode}. "
+                      f"Restarting in {config.PROCESS_RESTART_DELAY} seconds...")
+                STAGE_RESTARTS.labels(stage.name).inc()
+                await asyncio.sleep(config.PROCESS_RESTART_DELAY)
+                stage.start()
+        await asyncio.sleep(1)
+
+def create_rings():
+    """Bar and price rings per ingestion shard, plus one feature ring sized to merged_data's columns."""
+    from featureCache import feature_columns
+    with sqlite3.connect(config.DB_FILE) as conn:
+        columns = feature_columns(conn)
+    if not columns:
+        raise RuntimeError("merged_data has no feature columns; run the pipeline once with main.py first")
+
+    shards = services.get_universe().shard(config.INGEST_PROCESSES)
+    bar_rings = [SharedRing.create(BAR_DTYPE) for _ in shards]
+    price_rings = [SharedRing.create(PRICE_DTYPE) for _ in shards]
+    feature_ring = SharedRing.create(feature_dtype(len(columns)))
+    return shards, bar_rings, price_rings, feature_ring
+
+def main():
+    """Runs ingestion, feature/merge and sentiment in their own processes and trades in this one."""
+    print("\n==============================")
+    print("   Starting Multi-Process Trading Pipeline   ")
+    print("==============================\n")
+
+    shards, bar_rings, price_rings, feature_ring = create_rings()
+    rings = bar_rings + price_rings + [feature_ring]
+    ring_names = [f"bars_{i}" for i in range(len(bar_rings))] + [f"prices_{i}" for i in range(len(price_rings))] + ["features"]
+    metrics.gauge("ring_depth", "Records waiting in a shared-memory ring", ["ring"]).set_function(
+        lambda: {(name,): len(ring) for name, ring in zip(ring_names, rings)})
+    metrics.gauge("ring_dropped", "Records dropped because a ring was full", ["ring"]).set_function(
+        lambda: {(name,): ring.dropped for name, ring in zip(ring_names, rings)})
+
+    # spawn: children start clean instead of inheriting this process's threads and sockets
+    context = mp.get_context("spawn")
+    port = config.METRICS_PORT
+    stages = [Stage(context, "features", port + 1, feature_stage, [ring.spec() for ring in bar_rings], feature_ring.spec())]
+    for i, symbols in enumerate(shards):
+        stages.append(Stage(context, f"ingest_{i}", port + 2 + i, ingestion_stage, symbols, bar_rings[i].spec(), price_rings[i].spec()))
+    # One stream carries every post, so streaming runs a single sentiment process for the whole universe
+    sentiment_shards = services.get_universe().shard(config.SENTIMENT_PROCESSES if config.BLUESKY_INGEST_MODE == "search" else 1)
+    for i, symbols in enumerate(sentiment_shards):
+        stages.append(Stage(context, f"sentiment_{i}", port + 2 + len(shards) + i, sentiment_stage, symbols, len(sentiment_shards)))
+
+    try:
+        for stage in stages:
+            stage.start()
+
+        async def decide():
+            supervise_task = asyncio.create_task(supervise(stages))
+            await run_decision(feature_ring, price_rings)
+
+        asyncio.run(decide())
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down...")
+    finally:
+        for stage in stages:
+            stage.stop()
+        for ring in rings:
+            ring.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+import config
+import metrics
+
+RATE_LIMIT_WAIT = metrics.histogram("rate_limit_wait_seconds", "Time a request waited for a rate limiter token", ["limiter"])
+RATE_LIMIT_PAUSES = metrics.counter("rate_limit_pauses_total", "Limiter pauses until a server reset (429 or none remaining)", ["limiter"])
+
+def header(headers, *names):
+    """First of `names` present in `headers`, matched case-insensitively (aiohttp, requests and atproto headers)."""
+    lowered = {key.lower(): value for key, value in headers.items()}
+    for name in names:
+        if lowered.get(name) not in (None, ""):
+            return lowered[name]
+    return None
+
+def retry_after_seconds(headers):
+    """Seconds to wait from Retry-After or (X-)RateLimit-Reset headers, or None."""
+    retry_after = header(headers, "retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+
+    reset = header(headers, "x-ratelimit-reset", "ratelimit-reset")
+    if reset:
+        reset = float(reset)
+        # Alpaca and BlueSky send an epoch time; the IETF draft header is seconds from now
+        return max(0.0, reset - time.time()) if reset > 1e9 else reset
+    return None
+
+### =========================
+###   TOKEN BUCKET
+### =========================
+
+class TokenBucket:
+    """
+    Request budget for one API: at most `limit` requests in any `window` seconds.
+
+    Holds up to `burst` tokens and refills at limit / window per second, so steady
+    traffic spends the whole quota. A saved-up burst on top of a window of refill can
+    go past the limit; the server's headers (observe) stop that. Callers reserve tokens
+    in arrival order (the balance may go negative) and sleep until theirs is due, so
+    waiting tasks are spread out instead of waking together. Thread-safe: executor
+    threads (acquire_sync) and event loop tasks (acquire) share one budget.
+
+    The server's view wins: rate-limit headers cap the balance at the remaining
+    count, and an exhausted count or a 429 pauses the bucket until the reset.
+    """
+
+    def __init__(self, name, limit, window, burst=1):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.burst = min(burst, limit - 1) if limit > 1 else 1
+        self.share = 1.0               # Fraction of the budget this process may spend
+        self.lock = threading.Lock()
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()  # Refill resumes from here; in the future while paused
+
+    @property
+    def rate(self):
+        return self.limit / self.window * self.share
+
+    @property
+    def capacity(self):
+        return max(self.burst * self.share, 1.0)
+
+    def set_share(self, share):
+        """Limits this process to `share` of the budget, when several processes spend the same API quota."""
+        with self.lock:
+            self.share = share
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, tokens=1):
+        """Takes `tokens` now and returns the seconds until they may be spent."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+            return max(self.updated - now, 0.0) + max(-self.tokens, 0.0) / self.rate
+
+    def paused_for(self):
+        return max(self.updated - time.monotonic(), 0.0)
+
+    async def acquire(self, tokens=1):
+        """Waits (without blocking the event loop) until a request may be sent."""
+        wait = self.reserve(tokens)
+        RATE_LIMIT_WAIT.labels(self.name).observe(wait)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.paused_for()  # A 429 may have paused the bucket meanwhile
+
+    def acquire_sync(self, tokens=1):
+        """Blocking acquire, for synchronous clients running on executor threads."""
+        wait = self.reserve(tokens)
+        RATE_LIMIT_WAIT.labels(self.name).observe(wait)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.paused_for()
+
+    def pause(self, seconds):
+        """Stops handing out tokens for `seconds`, e.g. after a 429, and drops any saved-up burst."""
+        RATE_LIMIT_PAUSES.labels(self.name).inc()
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = max(self.updated, now + seconds)
+
+    def observe(self, headers):
+        """Applies a response's rate-limit headers: the balance never exceeds what the server says remains."""
+        remaining = header(headers, "x-ratelimit-remaining", "ratelimit-remaining")
+        if remaining is None:
+            return
+        remaining = float(remaining)
+        reset = retry_after_seconds(headers)
+        if remaining < 1 and reset:
+            self.pause(reset)
+            return
+        with self.lock:
+            self.tokens = min(self.tokens, remaining)
+
+### =========================
+###   SHARED LIMITERS
+### =========================
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def rate_limiter(name):
+    """The process-wide limiter for an API in config.RATE_LIMITS ("alpaca_trading", "alpaca_data", "bluesky")."""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = TokenBucket(name, *config.RATE_LIMITS[name])
+        return _limiters[name]
+
+def reset():
+    """Drops every limiter so the next rate_limiter() call rereads config.RATE_LIMITS."""
+    with _limiters_lock:
+        _limiters.clear()
+
+metrics.gauge("rate_limit_tokens", "Tokens left in each rate limiter (negative: requests queued)", ["limiter"]).set_function(
+    lambda: {(name,): bucket.tokens for name, bucket in list(_limiters.items())})
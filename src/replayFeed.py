@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+import asyncio
+import argparse
+import numpy as np
+import websockets
+from datetime import datetime, timedelta
+import config
+
+# Local stand-in for Alpaca's market-data stream (ALPACA_STREAM_URL), replaying bars from
+# stock_prices or generating synthetic ones, for local runs and ingestion benchmarks
+
+def synthetic_bars(symbols, steps, start="2025-03-03T14:30:00Z", seed=0):
+    """Yields one list of Alpaca bar messages per minute: a random walk per symbol."""
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(20, 500, len(symbols))
+    start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    for step in range(steps):
+        timestamp = (start_dt + timedelta(minutes=step)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        opens = prices
+        closes = opens * np.exp(rng.normal(0, 0.001, len(symbols)))
+        highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.0005, len(symbols)))
+        lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.0005, len(symbols)))
+        volumes = rng.integers(100, 10000, len(symbols))
+        yield [{"T": "b", "S": symbol, "t": timestamp, "o": round(float(o), 4), "h": round(float(h), 4),
+                "l": round(float(l), 4), "c": round(float(c), 4), "v": int(v)}
+               for symbol, o, h, l, c, v in zip(symbols, opens, highs, lows, closes, volumes)]
+        prices = closes
+
+def db_bars(symbols=None, since=None, until=None, db_file=None):
+    """Yields one list of Alpaca bar messages per timestamp stored in stock_prices."""
+    query = "SELECT symbol, timestamp, open, high, low, close, volume FROM stock_prices WHERE timestamp >= ? AND timestamp <= ?"
+    params = [since or "", until or "9999"]
+    if symbols:
+        query += f" AND symbol IN ({','.join('?' * len(symbols))})"
+        params += list(symbols)
+    with sqlite3.connect(db_file or config.DB_FILE) as conn:
+        rows = conn.execute(query + " ORDER BY timestamp, symbol", params).fetchall()
+
+    step, current = [], None
+    for symbol, timestamp, o, h, l, c, v in rows:
+        if timestamp != current and step:
+            yield step
+            step = []
+        current = timestamp
+        iso = timestamp.replace(" ", "T").replace("Z", "") + "Z"
+        step.append({"T": "b", "S": symbol, "t": iso, "o": o, "h": h, "l": l, "c": c, "v": v})
+    if step:
+        yield step
+
+class ReplayFeed:
+    """Speaks the auth/subscribe handshake of Alpaca's market-data stream and replays bars to each client."""
+
+    def __init__(self, steps, host="127.0.0.1", port=8766, interval=0.0, batch_size=1000, trades=False):
+        self.steps = list(steps)         # [[bar message, ...], ...], one list per bar time
+        self.host = host
+        self.port = port
+        self.interval = interval         # Seconds between bar times (0: as fast as the client reads)
+        self.batch_size = batch_size     # Bars per WebSocket message; Alpaca also batches messages
+        self.trades = trades             # Also send a trade message at each bar's close
+        self.server = None
+
+    async def handler(self, ws):
+        auth = json.loads(await ws.recv())
+        if auth.get("action") != "auth":
+            await ws.close()
+            return
+        await ws.send(json.dumps([{"T": "success", "msg": "authenticated"}]))
+
+        # Subscriptions may come in several messages; stream once they stop arriving
+        subscribed = set()
+        while True:
+            try:
+                message = json.loads(await asyncio.wait_for(ws.recv(), 0.2 if subscribed else None))
+            except asyncio.TimeoutError:
+                break
+            subscribed.update(message.get("bars", []))
+            await ws.send(json.dumps([{"T": "subscription", "bars": message.get("bars", []),
+                                       "trades": message.get("trades", []), "quotes": message.get("quotes", [])}]))
+
+        sent = 0
+        for step in self.steps:
+            bars = [bar for bar in step if bar["S"] in subscribed]
+            if self.trades:
+                bars += [{"T": "t", "S": bar["S"], "p": bar["c"], "s": 100, "t": bar["t"]} for bar in bars]
+            for start in range(0, len(bars), self.batch_size):
+                await ws.send(json.dumps(bars[start:start + self.batch_size]))
+            sent += len(bars)
+            if self.interval:
+                await asyncio.sleep(self.interval)
+        print(f"[ReplayFeed] Replay complete: {sent} messages for {len(subscribed)} symbols.")
+        await ws.close()
+
+    async def start(self):
+        self.server = await websockets.serve(self.handler, self.host, self.port, max_size=None)
+        print(f"[ReplayFeed] Listening on {self.url}")
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+
+async def main(opt):
+    if opt.synthetic:
+        symbols = [f"SYM{i:04d}" for i in range(opt.synthetic)]
+        steps = synthetic_bars(symbols, opt.steps)
+    else:
+        steps = db_bars(opt.symbols.split(",") if opt.symbols else None, opt.since, opt.until, opt.db)
+    feed = ReplayFeed(steps, opt.host, opt.port, opt.interval, trades=opt.trades)
+    await feed.start()
+    await asyncio.Future()  # Serve until interrupted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="usage: replayFeed -p port [-n symbols -steps N | -db file -since ts]")
+    parser.add_argument("--host", action="store", dest="host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", action="store", dest="port", type=int, default=8766)
+    parser.add_argument("-n", "--synthetic", action="store", dest="synthetic", type=int,
+                        help="Generate bars for this many symbols (SYM0000...) instead of reading stock_prices")
+    parser.add_argument("-steps", action="store", dest="steps", type=int, default=390, help="Synthetic bar times")
+    parser.add_argument("-db", action="store", dest="db", default=config.DB_FILE)
+    parser.add_argument("-symbols", action="store", dest="symbols", help="Comma-separated symbols to replay")
+    parser.add_argument("-since", action="store", dest="since")
+    parser.add_argument("-until", action="store", dest="until")
+    parser.add_argument("-t", "--time-interval", action="store", dest="interval", type=float, default=0.0)
+    parser.add_argument("--trades", action="store_true", dest="trades", help="Send a trade at each bar close")
+
+    opt = parser.parse_args()
+    try:
+        asyncio.run(main(opt))
+    except KeyboardInterrupt:
+        print("\nShutting down replay feed...")
@@ -0,0 +1,197 @@
+import re
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+import config
+import logConfig
+import metrics
+from executors import run_blocking
+
+JOB_SECONDS = metrics.histogram("job_runtime_seconds", "Scheduled job run time", ["job"])
+JOB_RUNS = metrics.counter("job_runs_total", "Scheduled job runs by outcome", ["job", "outcome"])
+JOB_MISSED = metrics.counter("job_missed_total", "Scheduled runs that did not happen", ["job", "reason"])
+
+def timeframe_seconds(timeframe):
+    """Bar length of an Alpaca timeframe string ("1Min", "15Min", "1Hour", "1Day") in seconds."""
+    match = re.fullmatch(r"(\d+)\s*(Min|T|Hour|H|Day|D)", timeframe)
+    if not match:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    units = {"Min": 60, "T": 60, "Hour": 3600, "H": 3600, "Day": 86400, "D": 86400}
+    return int(match.group(1)) * units[match.group(2)]
+
+def format_time(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+### =========================
+###   EXCHANGE CALENDAR
+### =========================
+
+class MarketCalendar:
+    """Session open/close times (epoch seconds) from pandas_market_calendars, loaded a month at a time."""
+
+    def __init__(self, name="NYSE", days=30):
+        self.name = name
+        self.days = days
+        self.opens = self.closes = None
+
+    def load(self, ts):
+        import pandas_market_calendars as mcal
+        start = pd.Timestamp(ts, unit="s", tz="UTC").normalize() - pd.Timedelta(days=1)
+        schedule = mcal.get_calendar(self.name).schedule(start_date=start, end_date=start + pd.Timedelta(days=self.days))
+        self.opens = np.array([t.timestamp() for t in schedule["market_open"]])
+        self.closes = np.array([t.timestamp() for t in schedule["market_close"]])
+
+    def covers(self, ts):
+        return self.closes is not None and len(self.closes) and self.opens[0] <= ts <= self.closes[-1]
+
+    def in_session(self, ts):
+        """True if `ts` falls in (open, close] of a session, i.e. a bar closing at `ts` was a trading bar."""
+        i = np.searchsorted(self.closes, ts)  # First session closing at or after ts
+        return i < len(self.closes) and self.opens[i] < ts
+
+    def next_open(self, ts):
+        """Open of the first session that has not closed by `ts` (None past the loaded window)."""
+        i = np.searchsorted(self.closes, ts, side="right")
+        return float(self.opens[i]) if i < len(self.opens) else None
+
+### =========================
+###   SCHEDULER
+### =========================
+
+class Job:
+    """A coroutine (or blocking function) run at `offset` seconds from every `period`-second boundary."""
+
+    def __init__(self, name, func, period, offset=0.0, market_hours=True):
+        self.name = name
+        self.func = func
+        self.period = period
+        self.offset = offset              # Negative: before the boundary (e.g. ahead of a bar close)
+        self.market_hours = market_hours  # Only for boundaries that close a bar inside a session
+        self.running = False
+        self.next_run = None
+        self.runs = self.failures = 0
+        self.missed = {"late": 0, "overlap": 0}
+        self.last_start = self.last_duration = None
+        self.total_duration = self.max_duration = self.total_lateness = 0.0
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "missed_late": self.missed["late"],
+            "missed_overlap": self.missed["overlap"],
+            "last_start": format_time(self.last_start) if self.last_start else None,
+            "last_duration_s": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "mean_duration_s": round(self.total_duration / self.runs, 3) if self.runs else None,
+            "max_duration_s": round(self.max_duration, 3),
+            "mean_lateness_ms": round(self.total_lateness / self.runs * 1000, 1) if self.runs else None,
+            "next_run": format_time(self.next_run) if self.next_run else None,
+        }
+
+class Scheduler:
+    """
+    Runs jobs at wall-clock-aligned times instead of sleeping a fixed interval after each run.
+
+    A job never overlaps itself: times that come due while it is still running (or while
+    the loop was blocked) are skipped and counted as missed. Boundaries outside exchange
+    sessions are skipped without counting, for jobs with `market_hours` set.
+    """
+
+    def __init__(self, calendar=None, tolerance=None):
+        self.calendar = calendar or MarketCalendar()
+        self.tolerance = tolerance if tolerance is not None else config.SCHEDULER_LATE_TOLERANCE
+        self.jobs = {}
+
+    def add(self, name, func, period=None, offset=0.0, market_hours=True):
+        """Adds a job; `period` defaults to the bar length of config.TIMEFRAME."""
+        job = Job(name, func, period or timeframe_seconds(config.TIMEFRAME), offset, market_hours)
+        self.jobs[name] = job
+        return job
+
+    def next_run(self, job, after):
+        """First aligned run time strictly after `after` (epoch seconds)."""
+        boundary = (np.floor((after - job.offset) / job.period) + 1) * job.period
+        if job.market_hours:
+            while not self.calendar.in_session(boundary):
+                open_ts = self.calendar.next_open(boundary)
+                if open_ts is None:
+                    raise RuntimeError(f"No {self.calendar.name} session loaded after {format_time(boundary)}")
+                boundary = (np.floor(open_ts / job.period) + 1) * job.period  # First bar close of that session
+        return float(boundary + job.offset)
+
+    async def ensure_calendar(self, ts):
+        # Loading the calendar takes a few hundred ms, so it runs off the event loop
+        if not self.calendar.covers(ts + 7 * 86400):
+            await run_blocking(self.calendar.load, ts)
+
+    async def execute(self, job, due):
+        job.running = True
+        start = time.time()
+        job.last_start = start
+        try:
+            if asyncio.iscoroutinefunction(job.func):
+                await job.func()
+            else:
+                await run_blocking(job.func)
+            JOB_RUNS.labels(job.name, "ok").inc()
+        except Exception as e:
+            job.failures += 1
+            JOB_RUNS.labels(job.name, "failed").inc()
+            print(f"[ERROR] Scheduled job {job.name} failed: {e}")
+        finally:
+            job.running = False
+            duration = time.time() - start
+            job.runs += 1
+            job.last_duration = duration
+            job.total_duration += duration
+            job.max_duration = max(job.max_duration, duration)
+            job.total_lateness += max(start - due, 0.0)
+            JOB_SECONDS.labels(job.name).observe(duration)
+
+    async def run_job(self, job, run_now=False):
+        if run_now:
+            await self.execute(job, time.time())
+        await self.ensure_calendar(time.time())
+        job.next_run = self.next_run(job, time.time())
+        if logConfig.INFO:
+            print(f"[INFO] Job {job.name} scheduled for {format_time(job.next_run)}")
+
+        while True:
+            # Sleep to the due time; re-check the clock in case the sleep ended early
+            while (remaining := job.next_run - time.time()) > 0:
+                await asyncio.sleep(remaining)
+
+            due, woke = job.next_run, time.time()
+            if woke - due > self.tolerance:
+                if logConfig.WARN:
+                    print(f"[WARN] Job {job.name} started {woke - due:.1f} s late")
+            await self.execute(job, due)
+
+            # Times that passed meanwhile are skipped, not queued: a late wake-up or a run still in progress
+            await self.ensure_calendar(time.time())
+            next_run = self.next_run(job, due)
+            while next_run <= time.time():
+                reason = "late" if next_run <= woke else "overlap"
+                job.missed[reason] += 1
+                JOB_MISSED.labels(job.name, reason).inc()
+                if logConfig.WARN:
+                    print(f"[WARN] Job {job.name} missed its {format_time(next_run)} run ({reason})")
+                next_run = self.next_run(job, next_run)
+            job.next_run = next_run
+
+    async def run(self, run_now=()):
+        """Runs every job forever; jobs named in `run_now` also run once immediately."""
+        await asyncio.gather(*(self.run_job(job, job.name in run_now) for job in self.jobs.values()))
+
+    def stats(self):
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+    def report(self):
+        """Prints each job's runs, failures, missed runs and timings (at shutdown)."""
+        for name, stats in self.stats().items():
+            print(f"[INFO] Job {name}: {stats['runs']} runs, {stats['failures']} failed, "
+                  f"{stats['missed_late']} missed late, {stats['missed_overlap']} missed overlapping, "
+                  f"mean {stats['mean_duration_s']} s, max {stats['max_duration_s']} s, "
+                  f"mean lateness {stats['mean_lateness_ms']} ms")
@@ -0,0 +1,205 @@
+import re
+import time
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+import config
+import metrics
+from executors import run_blocking
+
+SCORE_CACHE = metrics.counter("sentiment_cache_lookups_total", "Sentiment score cache lookups", ["result"])
+SCORE_BATCH_SECONDS = metrics.histogram("sentiment_batch_seconds", "Time to score one batch of texts in the pool", ["backend"])
+POSTS_SCORED = metrics.counter("posts_scored_total", "Texts scored by the sentiment model (cache misses)", ["backend"])
+
+WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text):
+    """The text that gets scored and hashed: Unicode NFC with whitespace runs collapsed to one space."""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+def text_key(normalized, prefix=b""):
+    """Cache key of a normalized text; `prefix` keeps scores of different backends apart."""
+    return hashlib.blake2b(prefix + normalized.encode("utf-8"), digest_size=16).digest()
+
+### =========================
+###   SCORERS
+### =========================
+
+class Scorer:
+    """Maps texts to sentiment scores in [-1, 1], negative to positive. Backends are listed in SCORERS."""
+
+    name = None
+
+    def score(self, texts):
+        raise NotImplementedError
+
+class VaderScorer(Scorer):
+    """VADER's rule-based compound score: fast and dependency-light, but blind to context and sarcasm."""
+
+    name = "vader"
+
+    def __init__(self):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def score(self, texts):
+        return [self.analyzer.polarity_scores(text)["compound"] for text in texts]
+
+class TransformerScorer(Scorer):
+    """
+    Hugging Face sequence classifier on CPU (transformers and torch are imported on first use).
+
+    Posts are sorted by length before batching, so each forward pass pads to a similar
+    length, and are truncated to `max_length` tokens. The score is the expected label
+    value: P(positive) - P(negative) for two-class models, neutral counting as 0.
+    """
+
+    name = "transformer"
+
+    def __init__(self, model=None, max_length=None, threads=None, batch_size=None, sort_by_length=True):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        self.torch = torch
+        torch.set_num_threads(threads or config.TRANSFORMER_THREADS)
+        self.max_length = max_length or config.TRANSFORMER_MAX_LENGTH
+        self.batch_size = batch_size or config.TRANSFORMER_BATCH_SIZE
+        self.sort_by_length = sort_by_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model or config.TRANSFORMER_MODEL)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model or config.TRANSFORMER_MODEL).eval()
+        self.values = torch.tensor(label_values(self.model.config.id2label))
+
+    def score(self, texts):
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i])) if self.sort_by_length else list(range(len(texts)))
+        scores = [0.0] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self.tokenizer([texts[i] for i in batch], padding=True, truncation=True,
+                                     max_length=self.max_length, return_tensors="pt")
+            with self.torch.inference_mode():
+                probabilities = self.torch.softmax(self.model(**encoded).logits, dim=-1)
+            for i, value in zip(batch, (probabilities @ self.values).tolist()):
+                scores[i] = value
+        return scores
+
+def label_values(id2label):
+    """Score of each class, from its label name (negative -1, neutral 0, positive 1), else by index order."""
+    labels = [id2label[i].lower() for i in range(len(id2label))]
+    if all(any(word in label for word in ("neg", "neu", "pos")) for label in labels):
+        return [-1.0 if "neg" in label else 1.0 if "pos" in label else 0.0 for label in labels]
+    # Unnamed labels (LABEL_0, ...): negative first and positive last, as in SST-2 and TweetEval models
+    return [-1.0, 1.0] if len(labels) == 2 else [-1.0 + 2.0 * i / (len(labels) - 1) for i in range(len(labels))]
+
+SCORERS = {"vader": VaderScorer, "transformer": TransformerScorer}
+
+def scorer_spec(backend=None):
+    """(backend, options) from config, passed to pool workers so they build the scorer the parent asked for."""
+    backend = backend or config.SENTIMENT_BACKEND
+    if backend not in SCORERS:
+        raise ValueError(f"Unknown sentiment backend {backend}; expected one of {sorted(SCORERS)}")
+    if backend == "transformer":
+        return backend, (("model", config.TRANSFORMER_MODEL), ("max_length", config.TRANSFORMER_MAX_LENGTH),
+                         ("threads", config.TRANSFORMER_THREADS), ("batch_size", config.TRANSFORMER_BATCH_SIZE))
+    return backend, ()
+
+### =========================
+###   SCORING (POOL WORKERS)
+### =========================
+
+_scorers = {}  # {spec: Scorer}, one per worker process, created on its first batch
+
+def score_batch(texts, spec=("vader", ())):
+    """Scores for a batch of normalized texts. Runs in the "sentiment" process pool."""
+    if spec not in _scorers:
+        backend, options = spec
+        _scorers[spec] = SCORERS[backend](**dict(options))
+    return _scorers[spec].score(texts)
+
+### =========================
+###   SCORE CACHE
+### =========================
+
+class ScoreCache:
+    """
+    Scores by normalized text hash, least recently used evicted first.
+
+    Reposts, quote chains and bot boilerplate repeat the same text many times
+    across symbols and runs; each distinct text is scored once.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or config.SENTIMENT_CACHE_SIZE
+        self.scores = OrderedDict()
+        self.lock = threading.Lock()  # Shared by every task and thread in the process
+
+    def get_many(self, keys):
+        """{key: score} for the keys already cached."""
+        found = {}
+        with self.lock:
+            for key in keys:
+                score = self.scores.get(key)
+                if score is not None:
+                    self.scores.move_to_end(key)
+                    found[key] = score
+        return found
+
+    def put_many(self, items):
+        with self.lock:
+            for key, score in items:
+                self.scores[key] = score
+                self.scores.move_to_end(key)
+            while len(self.scores) > self.capacity:
+                self.scores.popitem(last=False)
+
+    def __len__(self):
+        return len(self.scores)
+
+score_cache = ScoreCache()
+
+### =========================
+###   SCORING STAGE
+### =========================
+
+async def score_texts(texts, batch_size=None, backend=None):
+    """
+    Sentiment score per text, in order, from `backend` (default config.SENTIMENT_BACKEND).
+    Cached texts are not rescored; the rest are deduplicated and scored in batches
+    spread over the "sentiment" process pool, so scoring runs in parallel and off the
+    event loop.
+    """
+    batch_size = batch_size or config.SENTIMENT_BATCH_SIZE
+    spec = scorer_spec(backend)
+    prefix = repr(spec).encode("utf-8")
+    normalized = [normalize_text(text) for text in texts]
+    keys = [text_key(text, prefix) for text in normalized]
+    scores = score_cache.get_many(set(keys))
+
+    missing = {}
+    for key, text in zip(keys, normalized):
+        if key not in scores:
+            missing.setdefault(key, text)
+    SCORE_CACHE.labels("hit").inc(len(keys) - len(missing))  # Repeats within `texts` count as hits
+    SCORE_CACHE.labels("miss").inc(len(missing))
+
+    if missing:
+        missing_keys, missing_texts = list(missing), list(missing.values())
+        batches = [missing_texts[i:i + batch_size] for i in range(0, len(missing_texts), batch_size)]
+        results = await asyncio.gather(*(timed_batch(batch, spec) for batch in batches))
+        new_scores = [score for batch_scores in results for score in batch_scores]
+        score_cache.put_many(zip(missing_keys, new_scores))
+        scores.update(zip(missing_keys, new_scores))
+        POSTS_SCORED.labels(spec[0]).inc(len(new_scores))
+
+    return [scores[key] for key in keys]
+
+async def timed_batch(texts, spec=("vader", ())):
+    start = time.perf_counter()
+    # With SENTIMENT_WORKERS = 0 batches are scored on an "io" thread instead (no process start-up cost)
+    scores = await run_blocking(score_batch, texts, spec, executor="sentiment" if config.SENTIMENT_WORKERS else "io")
+    SCORE_BATCH_SECONDS.labels(spec[0]).observe(time.perf_counter() - start)
+    return scores
+
+async def score_posts(posts):
+    """Scores for BlueSky PostViews, in order."""
+    return await score_texts([post.record.text for post in posts])
@@ -0,0 +1,147 @@
+import time
+import pickle
+import threading
+import config
+
+# Shared clients and models, created on first use (or all at once by bootstrap()).
+# Importing this module, or any module that uses it, does no I/O.
+
+_instances = {}     # {name: object}
+_init_times = {}    # {name: seconds spent creating it}
+_factories = {}     # {name: factory}
+_lock = threading.RLock()  # Executor threads may ask for a service first; reentrant, as factories get() others
+
+def service(name):
+    """Registers a factory as a lazily created, shared service."""
+    def register(factory):
+        _factories[name] = factory
+        return factory
+    return register
+
+def get(name):
+    """Returns the named service, creating it on first use."""
+    if name not in _instances:
+        with _lock:
+            if name not in _instances:  # Another thread may have created it while we waited
+                start = time.perf_counter()
+                _instances[name] = _factories[name]()
+                _init_times[name] = time.perf_counter() - start
+    return _instances[name]
+
+def provide(name, instance):
+    """Installs a ready-made service, e.g. a SimBroker in place of the Alpaca broker for replays."""
+    _instances[name] = instance
+    _init_times[name] = 0.0
+
+def reset(name=None):
+    """Drops one (or every) service so the next get() recreates it, e.g. after a BlueSky session expires."""
+    for key in [name] if name else list(_instances):
+        _instances.pop(key, None)
+        _init_times.pop(key, None)
+
+### =========================
+###   SERVICE FACTORIES
+### =========================
+
+@service("universe")
+def _load_universe():
+    from universe import load_universe
+    return load_universe(config.UNIVERSE_SOURCE)
+
+@service("rest_api")
+def _create_rest_api():
+    from brokerClient import RateLimitedREST
+    return RateLimitedREST(config.ALPACA_API_KEY, config.ALPACA_API_SECRET, config.ALPACA_TRADING_URL, api_version="v2")
+
+@service("broker")
+def _create_broker():
+    from brokerClient import AsyncBroker
+    return AsyncBroker()
+
+@service("bluesky")
+def _create_bluesky_client():
+    from atproto import Client
+    from rateLimiter import rate_limiter
+    client = Client(base_url=config.BLUESKY_BASE_URL)  # None: bsky.social
+
+    def observe(response):
+        # Every response caps the shared limiter at the server's remaining count; 429s are handled by the caller
+        if response.status_code != 429:
+            rate_limiter("bluesky").observe(response.headers)
+
+    http_client = getattr(client.request, "_client", None)  # The SDK's httpx.Client (private)
+    if http_client is not None and hasattr(http_client, "event_hooks"):
+        http_client.event_hooks["response"].append(observe)
+    else:
+        print("[WARN] atproto client has no httpx event hooks: BlueSky rate-limit headers are not observed.")
+    client.login(config.BLUESKY_USERNAME, config.BLUESKY_PASSWORD)
+    return client
+
+@service("sentiment_analyzer")
+def _create_sentiment_analyzer():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+@service("model")
+def _load_model():
+    with open(config.TRADING_MODEL_FILE, "rb") as f:
+        return pickle.load(f)
+
+@service("scaler")
+def _load_scaler():
+    with open(config.SCALER_FILE, "rb") as f:
+        return pickle.load(f)
+
+@service("compiled_model")
+def _compile_model():
+    from compiledModel import compile_model
+    try:
+        return compile_model(get_model(), get_scaler())
+    except TypeError as e:
+        print(f"[WARN] Could not compile {config.TRADING_MODEL_FILE}, using the sklearn model for predictions: {e}")
+        return None
+
+def get_universe():
+    return get("universe")
+
+def get_rest_api():
+    return get("rest_api")
+
+def get_broker():
+    return get("broker")
+
+def get_bluesky_client():
+    return get("bluesky")
+
+def get_sentiment_analyzer():
+    return get("sentiment_analyzer")
+
+def get_model():
+    return get("model")
+
+def get_scaler():
+    return get("scaler")
+
+def get_compiled_model():
+    return get("compiled_model")
+
+### =========================
+###   BOOTSTRAP
+### =========================
+
+def bootstrap(names=None):
+    """Creates the given services (default: all) up front and prints how long each took."""
+    for name in names or _factories:
+        try:
+            get(name)
+        except Exception as e:
+            print(f"[ERROR] Failed to initialize {name}: {e}")
+    print(startup_report())
+
+def startup_report():
+    """One line per created service with its initialization time."""
+    lines = ["[INFO] Startup report:"]
+    for name, seconds in _init_times.items():
+        lines.append(f"        {name:<20} {seconds * 1000:8.1f} ms")
+    lines.append(f"        {'total':<20} {sum(_init_times.values()) * 1000:8.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,176 @@
+import time
+import asyncio
+import numpy as np
+from multiprocessing import shared_memory
+import config
+
+# Record layouts. Symbols travel as their universe ID (see universe.py); timestamps
+# keep the exact strings stored in SQLite, so the feature cache compares them as before.
+BAR_DTYPE = np.dtype([
+    ("symbol_id", "<i4"),
+    ("timestamp", "S32"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+PRICE_TRADE, PRICE_QUOTE = 0, 1
+PRICE_DTYPE = np.dtype([
+    ("symbol_id", "<i4"),
+    ("kind", "<i1"),      # PRICE_TRADE or PRICE_QUOTE
+    ("price", "<f8"),
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+    ("timestamp", "S32"),
+])
+
+def feature_dtype(n_features):
+    """One merged_data row: symbol, bar timestamp and the feature vector."""
+    return np.dtype([("symbol_id", "<i4"), ("timestamp", "S32"), ("values", "<f8", (n_features,))])
+
+# Header: producer and consumer counters on separate cache lines, so neither side
+# writes to a line the other one writes to
+HEAD_OFFSET, TAIL_OFFSET, DROPPED_OFFSET = 0, 64, 128
+HEADER_SIZE = 192
+
+### =========================
+###   SINGLE-PRODUCER / SINGLE-CONSUMER RING
+### =========================
+
+class SharedRing:
+    """
+    Fixed-size ring of NumPy records in `multiprocessing.shared_memory`, for one
+    producer process and one consumer process.
+
+    No locks: only the producer advances `head` and only the consumer advances
+    `tail`. Both are monotonically increasing int64 counters (aligned 8-byte stores
+    are atomic on x86-64 and ARM64), and a record is written before `head` moves
+    past it. A full ring never blocks the producer; the record is dropped and
+    counted, so a slow consumer cannot stall the stage feeding it.
+
+    Ordering relies on x86-64's total store order: there is no fence between writing
+    a slot and publishing `head` (or reading a slot and publishing `tail`), so on
+    weakly ordered CPUs (ARM64) the consumer could see the index before the record.
+    Python exposes no fence, so these rings are only safe on x86-64.
+    """
+
+    def __init__(self, shm, dtype, capacity, owner=False):
+        if capacity & (capacity - 1):
+            raise ValueError(f"Ring capacity must be a power of two, got {capacity}")
+        self.shm = shm
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.owner = owner
+        self.counters = {
+            name: np.ndarray((1,), dtype=np.int64, buffer=shm.buf, offset=offset)
+            for name, offset in (("head", HEAD_OFFSET), ("tail", TAIL_OFFSET), ("dropped", DROPPED_OFFSET))
+        }
+        self.records = np.ndarray((capacity,), dtype=self.dtype, buffer=shm.buf, offset=HEADER_SIZE)
+
+    @classmethod
+    def create(cls, dtype, capacity=None, name=None):
+        """Allocates a new ring (in the parent process)."""
+        capacity = capacity or config.RING_CAPACITY
+        size = HEADER_SIZE + capacity * np.dtype(dtype).itemsize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        return cls(shm, dtype, capacity, owner=True)
+
+    @classmethod
+    def attach(cls, spec):
+        """Maps a ring created elsewhere, from its spec()."""
+        name, descr, capacity = spec
+        # Spawned children share the parent's resource tracker, so attaching here does not
+        # unlink the segment when a stage exits; only the creating ring's close() does
+        return cls(shared_memory.SharedMemory(name=name), np.dtype(descr), capacity)
+
+    def spec(self):
+        """Picklable (name, dtype, capacity) for handing the ring to a child process."""
+        return self.shm.name, self.dtype.descr, self.capacity
+
+    ### Producer side
+
+    def push(self, record):
+        """Appends one record (tuple or structured scalar). Returns False and counts a drop if full."""
+        head = int(self.counters["head"][0])
+        if head - int(self.counters["tail"][0]) >= self.capacity:
+            self.counters["dropped"][0] += 1
+            return False
+        self.records[head & self.mask] = record
+        self.counters["head"][0] = head + 1
+        return True
+
+    def push_many(self, records):
+        """Appends a structured array, as much as fits. Returns the number written."""
+        head = int(self.counters["head"][0])
+        free = self.capacity - (head - int(self.counters["tail"][0]))
+        count = min(len(records), free)
+        start = head & self.mask
+        first = min(count, self.capacity - start)  # Up to the end of the buffer, then wrap
+        self.records[start:start + first] = records[:first]
+        self.records[:count - first] = records[first:count]
+        self.counters["head"][0] = head + count
+        if count < len(records):
+            self.counters["dropped"][0] += len(records) - count
+        return count
+
+    ### Consumer side
+
+    def pop_many(self, max_records=None):
+        """Removes and returns up to `max_records` records (all available by default) as a copy."""
+        tail = int(self.counters["tail"][0])
+        available = int(self.counters["head"][0]) - tail
+        if max_records is not None:
+            available = min(available, max_records)
+        if available <= 0:
+            return self.records[:0].copy()
+        start = tail & self.mask
+        end = start + available
+        if end <= self.capacity:
+            out = self.records[start:end].copy()
+        else:
+            out = np.concatenate([self.records[start:], self.records[:end - self.capacity]])
+        self.counters["tail"][0] = tail + available
+        return out
+
+    def wait(self, timeout=None):
+        return wait_any([self], timeout)
+
+    async def wait_async(self, timeout=None):
+        """Same as wait() without blocking the event loop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not len(self):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(config.RING_POLL_INTERVAL)
+        return True
+
+    ### Either side
+
+    def __len__(self):
+        return int(self.counters["head"][0]) - int(self.counters["tail"][0])
+
+    @property
+    def dropped(self):
+        return int(self.counters["dropped"][0])
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        self.counters = self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def wait_any(rings, timeout=None):
+    """Blocks until any ring has records or `timeout` passes, backing off from 0.1 ms sleeps to RING_POLL_INTERVAL."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.0001
+    while not any(len(ring) for ring in rings):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, config.RING_POLL_INTERVAL)
+    return True
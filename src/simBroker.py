@@ -0,0 +1,260 @@
+from datetime import datetime, timedelta
+from brokerClient import Broker, BrokerError, to_entity
+
+# Order statuses that still wait for a fill
+OPEN_STATUSES = {"new", "accepted", "partially_filled"}
+
+def to_datetime(timestamp):
+    """Parses bar timestamps as stored in SQLite ("2025-02-10 14:30:00", ISO with or without Z)."""
+    if isinstance(timestamp, datetime):
+        return timestamp.replace(tzinfo=None)
+    return datetime.fromisoformat(str(timestamp).replace("Z", "+00:00")).replace(tzinfo=None)
+
+### =========================
+###   SIMULATED BROKER
+### =========================
+
+class SimBroker(Broker):
+    """
+    Deterministic local broker that fills orders against replayed bars.
+
+    Orders are accepted at the current simulated time and become fillable `latency`
+    seconds later, on the first later bar of their symbol: market orders at the bar
+    open plus `slippage_bps`, limit orders when the bar trades through the limit.
+    `max_volume_fraction` caps each fill at a share of the bar volume (partial fills).
+    Shorts need (short_margin - 1) x their value in buying power, like Reg T's 150%.
+    Every state change is emitted as an Alpaca trade_updates payload to the listeners.
+    """
+
+    def __init__(self, initial_cash=100000, latency=0.0, slippage_bps=0.0, short_margin=1.5, max_volume_fraction=None):
+        self.cash = float(initial_cash)
+        self.latency = timedelta(seconds=latency)
+        self.slippage = slippage_bps / 10000
+        self.short_margin = short_margin
+        self.max_volume_fraction = max_volume_fraction
+        self.positions = {}     # {symbol: {"qty": int, "avg_entry_price": float}}
+        self.orders = {}        # {order_id: Alpaca-shaped order dict}, in submission order
+        self.bars = {}          # {symbol: last bar dict}
+        self.clock = None       # Timestamp of the latest replayed bar
+        self.listeners = []     # Called as listener(payload) for every trade update
+        self.fills = []         # Fill history for reports and regression diffs
+        self.next_id = 1
+
+    def add_listener(self, listener):
+        """Registers a callback for trade_updates payloads (e.g. OrderBook.apply_trade_update)."""
+        self.listeners.append(listener)
+
+    ### Valuation
+
+    def last_price(self, symbol):
+        bar = self.bars.get(symbol)
+        return bar["close"] if bar else None
+
+    def market_value(self, symbol):
+        position = self.positions.get(symbol)
+        if not position:
+            return 0.0
+        return position["qty"] * (self.last_price(symbol) or position["avg_entry_price"])
+
+    def equity(self):
+        return self.cash + sum(self.market_value(symbol) for symbol in self.positions)
+
+    def buying_power(self):
+        """Cash minus margin held against shorts and cash reserved by open buy orders."""
+        short_value = sum(-self.market_value(symbol) for symbol, p in self.positions.items() if p["qty"] < 0)
+        reserved = sum(
+            (float(order["qty"]) - float(order["filled_qty"])) * self._reference_price(order)
+            for order in self.orders.values() if order["status"] in OPEN_STATUSES and order["side"] == "buy"
+        )
+        return self.cash - self.short_margin * short_value - reserved
+
+    def _reference_price(self, order):
+        if order["limit_price"] is not None:
+            return float(order["limit_price"])
+        return self.last_price(order["symbol"]) or 0.0
+
+    ### Bar replay
+
+    def on_bar(self, symbol, timestamp, open, high, low, close, volume):
+        """Advances the clock to one bar and fills the symbol's eligible open orders against it."""
+        bar_time = to_datetime(timestamp)
+        self.clock = bar_time if self.clock is None else max(self.clock, bar_time)
+        bar = {"timestamp": bar_time, "open": float(open), "high": float(high), "low": float(low),
+               "close": float(close), "volume": float(volume or 0)}
+
+        available = None
+        if self.max_volume_fraction is not None:
+            available = int(bar["volume"] * self.max_volume_fraction)
+
+        for order in list(self.orders.values()):
+            if order["symbol"] != symbol or order["status"] not in OPEN_STATUSES:
+                continue
+            if bar_time <= order["_accepted_at"] or bar_time < order["_accepted_at"] + self.latency:
+                continue  # Not yet at the broker when this bar traded
+
+            price = self._fill_price(order, bar)
+            if price is None:
+                continue
+
+            remaining = int(float(order["qty"]) - float(order["filled_qty"]))
+            qty = remaining if available is None else min(remaining, available)
+            if qty <= 0:
+                continue
+            if available is not None:
+                available -= qty
+            self._fill(order, qty, price, bar_time)
+
+        self.bars[symbol] = bar
+
+    def _fill_price(self, order, bar):
+        """Execution price on this bar, or None if a limit order does not trade."""
+        buy = order["side"] == "buy"
+        if order["type"] == "market":
+            return round(bar["open"] * (1 + self.slippage if buy else 1 - self.slippage), 4)
+
+        limit = float(order["limit_price"])
+        if buy and bar["low"] <= limit:
+            return min(bar["open"], limit)
+        if not buy and bar["high"] >= limit:
+            return max(bar["open"], limit)
+        return None
+
+    def _fill(self, order, qty, price, fill_time):
+        symbol = order["symbol"]
+        signed_qty = qty if order["side"] == "buy" else -qty
+        position = self.positions.get(symbol, {"qty": 0, "avg_entry_price": 0.0})
+        old_qty = position["qty"]
+        new_qty = old_qty + signed_qty
+
+        if new_qty == 0:
+            self.positions.pop(symbol, None)
+        else:
+            if old_qty == 0 or (old_qty > 0) != (new_qty > 0):
+                avg = price  # New or flipped position
+            elif abs(new_qty) > abs(old_qty):
+                avg = (abs(old_qty) * position["avg_entry_price"] + qty * price) / abs(new_qty)
+            else:
+                avg = position["avg_entry_price"]  # Reducing keeps the entry price
+            self.positions[symbol] = {"qty": new_qty, "avg_entry_price": avg}
+
+        self.cash += -qty * price if order["side"] == "buy" else qty * price
+
+        filled_qty = float(order["filled_qty"]) + qty
+        filled_value = float(order["filled_avg_price"] or 0) * float(order["filled_qty"]) + qty * price
+        done = filled_qty >= float(order["qty"])
+        order.update(
+            filled_qty=str(int(filled_qty)),
+            filled_avg_price=str(round(filled_value / filled_qty, 4)),
+            status="filled" if done else "partially_filled",
+            updated_at=fill_time.isoformat(),
+        )
+        if done:
+            order["filled_at"] = fill_time.isoformat()
+
+        self.fills.append({"timestamp": fill_time.isoformat(), "order_id": order["id"], "symbol": symbol,
+                           "side": order["side"], "qty": qty, "price": price, "position_qty": new_qty})
+        self.emit("fill" if done else "partial_fill", order, price=price, qty=qty, position_qty=new_qty)
+
+    ### Broker interface
+
+    async def get_account(self):
+        return to_entity({"cash": str(self.cash), "equity": str(self.equity()),
+                          "buying_power": str(self.buying_power()), "status": "ACTIVE"})
+
+    async def list_positions(self):
+        return [
+            to_entity({"symbol": symbol, "qty": str(position["qty"]), "avg_entry_price": str(position["avg_entry_price"]),
+                       "market_value": str(self.market_value(symbol)), "side": "long" if position["qty"] > 0 else "short"})
+            for symbol, position in self.positions.items()
+        ]
+
+    async def list_orders(self, status="open", symbols=None, limit=500):
+        orders = [
+            order for order in self.orders.values()
+            if (status == "all" or (order["status"] in OPEN_STATUSES) == (status == "open"))
+            and (not symbols or order["symbol"] in symbols)
+        ]
+        return [to_entity(self._public(order)) for order in orders[-limit:]]
+
+    async def submit_order(self, symbol, qty, side, type="market", time_in_force="gtc",
+                           limit_price=None, client_order_id=None):
+        qty = int(float(qty))
+        if qty <= 0:
+            raise BrokerError(422, "qty must be > 0")
+        if type == "limit" and limit_price is None:
+            raise BrokerError(422, "limit orders require limit_price")
+        if client_order_id and any(order["client_order_id"] == client_order_id for order in self.orders.values()):
+            raise BrokerError(422, "client_order_id must be unique")
+
+        order = {
+            "id": f"sim-{self.next_id:08d}",
+            "client_order_id": client_order_id or f"sim-client-{self.next_id:08d}",
+            "symbol": symbol,
+            "qty": str(qty),
+            "filled_qty": "0",
+            "filled_avg_price": None,
+            "side": side,
+            "type": type,
+            "time_in_force": time_in_force,
+            "limit_price": str(limit_price) if limit_price is not None else None,
+            "status": "new",
+            "submitted_at": self.clock.isoformat() if self.clock else None,
+            "updated_at": self.clock.isoformat() if self.clock else None,
+            "filled_at": None,
+            "_accepted_at": self.clock or datetime.min,
+        }
+
+        # Opening longs need buying power for their value; opening shorts need the extra short margin
+        price = self._reference_price(order)
+        held = self.positions.get(symbol, {"qty": 0})["qty"]
+        if side == "buy":
+            required = max(0, qty - max(-held, 0)) * price  # Covering a short frees margin
+        else:
+            required = (self.short_margin - 1) * max(0, qty - max(held, 0)) * price
+        if required > self.buying_power():
+            raise BrokerError(403, "insufficient buying power")
+
+        self.next_id += 1
+        self.orders[order["id"]] = order
+        self.emit("new", order)
+        return to_entity(self._public(order))
+
+    async def cancel_order(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None or order["status"] not in OPEN_STATUSES:
+            raise BrokerError(422, f"order {order_id} is not open")
+        order["status"] = "canceled"
+        self.emit("canceled", order)
+
+    async def get_latest_trades(self, symbols, feed="iex"):
+        return {
+            symbol: to_entity({"t": bar["timestamp"].isoformat(), "p": bar["close"], "s": bar["volume"]})
+            for symbol, bar in ((symbol, self.bars.get(symbol)) for symbol in symbols) if bar
+        }
+
+    async def get_snapshots(self, symbols, feed="iex"):
+        trades = await self.get_latest_trades(symbols, feed)
+        return {
+            symbol: to_entity({"latestTrade": trade, "latestQuote": to_entity({"t": trade.t, "bp": trade.p, "ap": trade.p})})
+            for symbol, trade in trades.items()
+        }
+
+    def _public(self, order):
+        return {key: value for key, value in order.items() if not key.startswith("_")}
+
+    def emit(self, event, order, **fields):
+        payload = {"event": event, "timestamp": order.get("updated_at"), "order": self._public(order)}
+        payload.update({key: str(value) for key, value in fields.items()})
+        for listener in self.listeners:
+            listener(payload)
+
+    def summary(self, initial_cash=None):
+        """Final account state for reports."""
+        statuses = {}
+        for order in self.orders.values():
+            statuses[order["status"]] = statuses.get(order["status"], 0) + 1
+        summary = {"cash": round(self.cash, 2), "equity": round(self.equity(), 2), "orders": statuses,
+                   "fills": len(self.fills), "positions": {s: p["qty"] for s, p in sorted(self.positions.items())}}
+        if initial_cash is not None:
+            summary["pnl"] = round(self.equity() - initial_cash, 2)
+        return summary
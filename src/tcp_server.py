@@ -9,10 +9,14 @@ import time
 import datetime
 import sqlite3
 import pandas as pd
+import metrics
+import logConfig
 
 DB_FILE = "data/trade_data.db"
 START_DATE = "2025-03-03"
 
+ROWS_STREAMED = metrics.counter("tcp_rows_streamed_total", "merged_data rows sent to TCP clients")
+
 
 class ThreadedServer(object):
     def __init__(self, host, opt):
@@ -89,10 +93,12 @@ class ThreadedServer(object):
             for row in data:
                 row["timestamp"] = row["timestamp"].strftime("%Y-%m-%d %H:%M:%S")  # Convert Timestamp to string
 
-                print(f"Sending: {row}")  # Debugging print
+                if logConfig.DEBUG:
+                    print(f"Sending: {row}")  # Debugging print
 
                 try:
                     client.send((self.convertStringToJSON(row) + '\n').encode('utf-8'))
+                    ROWS_STREAMED.inc()
                     time.sleep(self.opt.interval)  # Simulate real-time streaming
                 except:
                     print('Client disconnected or end of stream')
@@ -112,7 +118,7 @@ class ThreadedServer(object):
         df = pd.read_sql(query, conn, parse_dates=["timestamp"])
         conn.close()
 
-        if not df.empty:
+        if not df.empty and logConfig.DEBUG:
             print(df.head())  # Print first few rows
 
         return df.to_dict(orient="records")
@@ -126,8 +132,12 @@ if __name__ == "__main__":
     parser.add_argument("-p", "--port", action="store", dest="port", type=int)
     parser.add_argument("-t", "--time-interval", action="store",
                         dest="interval", type=float, default=0.5)
+    parser.add_argument("-M", "--metrics-port", action="store", dest="metrics_port", type=int,
+                        help="Serve Prometheus metrics on this port")
 
     opt = parser.parse_args()
     if not opt.port:
         parser.error('Port not given')
+    if opt.metrics_port:
+        metrics.start_metrics_server(opt.metrics_port)
     ThreadedServer('127.0.0.1', opt).listen()
@@ -0,0 +1,231 @@
+import time
+import sqlite3
+import asyncio
+import threading
+import numpy as np
+import config
+import logConfig
+from executors import get_executor
+
+# Stages a bar passes through on its way to an order, in pipeline order
+STAGES = [
+    "bar_received",     # dataFromAlpaca.alpaca_ws_handler
+    "db_written",       # save_stock_data
+    "indicators",       # run_data_processing: compute_technical_indicators
+    "merged",           # run_data_processing: merge_sentiment_data
+    "features_read",    # main: the feature cache reported the new row
+    "predicted",        # tradeLogic.trading_loop: batch prediction
+    "priced",           # latest prices
+    "decided",          # execute_trade
+    "submitted",        # submit_trades returned
+]
+
+### =========================
+###   TRACER
+### =========================
+
+class Tracer:
+    """
+    Per-bar stage timestamps in a preallocated ring buffer, flushed to SQLite in batches.
+
+    Each bar gets a monotonic trace ID when it arrives; later stages are marked per
+    symbol against that symbol's open trace. Recording is a few array writes, and
+    nothing touches the database until `flush_size` events are waiting (or flush()).
+    If the buffer wraps before a flush, the oldest events are dropped and counted.
+    Stages are marked from the event loop and from executor threads (save_stock_data),
+    so recording and the open traces are guarded by one lock.
+    """
+
+    def __init__(self, size=None, flush_size=None, db_file=None, enabled=None):
+        self.size = size or config.TRACE_BUFFER_SIZE
+        self.flush_size = flush_size or config.TRACE_FLUSH_SIZE
+        self.db_file = db_file or config.DB_FILE
+        self.enabled = config.TRACING_ENABLED if enabled is None else enabled
+
+        self.trace_ids = np.zeros(self.size, dtype=np.int64)
+        self.symbol_codes = np.zeros(self.size, dtype=np.int32)
+        self.stage_codes = np.zeros(self.size, dtype=np.int16)
+        self.times = np.zeros(self.size, dtype=np.int64)
+        self.head = 0       # Events recorded so far
+        self.flushed = 0    # Events written (or dropped) so far
+        self.dropped = 0
+
+        self.stage_index = {stage: i for i, stage in enumerate(STAGES)}
+        self.symbols = []
+        self.symbol_index = {}
+        self.open = {}      # {symbol: trace_id of the bar still in flight}
+
+        # Monotonic IDs that stay unique across restarts; wall clock anchors monotonic_ns for reports
+        self.next_id = time.time_ns() // 1000
+        self.wall_offset_ns = time.time_ns() - time.monotonic_ns()
+        self.table_ready = False
+        self.lock = threading.Lock()        # Ring, symbol codes and open traces
+        self.flush_lock = threading.Lock()  # main flushes from the db executor
+        self.flush_scheduled = False
+
+    def _symbol_code(self, symbol):
+        code = self.symbol_index.get(symbol)
+        if code is None:
+            code = self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return code
+
+    def record(self, trace_id, symbol, stage):
+        """Appends one (trace, symbol, stage, time) event to the ring."""
+        with self.lock:
+            self._record(trace_id, symbol, stage)
+        self._flush_if_full()
+
+    def record_many(self, trace_ids, symbols, stage):
+        """Appends one event per (trace, symbol) at the same time, with vectorized ring writes."""
+        with self.lock:
+            self._record_many(trace_ids, symbols, stage)
+        self._flush_if_full()
+
+    def _flush_if_full(self):
+        # Outside the lock: an inline flush takes it again to copy the events
+        if self.head - self.flushed >= self.flush_size:
+            self.request_flush()
+
+    def _record(self, trace_id, symbol, stage):
+        if self.head - self.flushed >= self.size:
+            self.flushed += 1  # Overwrite the oldest unflushed event
+            self.dropped += 1
+
+        i = self.head % self.size
+        self.trace_ids[i] = trace_id
+        self.symbol_codes[i] = self._symbol_code(symbol)
+        self.stage_codes[i] = self.stage_index[stage]
+        self.times[i] = time.monotonic_ns()
+        self.head += 1
+
+    def _record_many(self, trace_ids, symbols, stage):
+        count = len(trace_ids)
+        overflow = self.head + count - self.flushed - self.size
+        if overflow > 0:
+            self.flushed += overflow  # Overwrite the oldest unflushed events
+            self.dropped += overflow
+
+        slots = np.arange(self.head, self.head + count) % self.size
+        self.trace_ids[slots] = trace_ids
+        self.symbol_codes[slots] = [self._symbol_code(symbol) for symbol in symbols]
+        self.stage_codes[slots] = self.stage_index[stage]
+        self.times[slots] = time.monotonic_ns()
+        self.head += count
+
+    ### Pipeline hooks
+
+    def start(self, symbol):
+        """Opens a trace for a newly arrived bar. Returns its trace ID."""
+        if not self.enabled:
+            return None
+        with self.lock:
+            trace_id = self.next_id
+            self.next_id += 1
+            self.open[symbol] = trace_id  # A newer bar supersedes one still in flight
+            self._record(trace_id, symbol, "bar_received")
+        self._flush_if_full()
+        return trace_id
+
+    def start_many(self, symbols):
+        """Opens traces for bars that arrived together (one WebSocket message)."""
+        if not self.enabled or not symbols:
+            return
+        with self.lock:
+            trace_ids = list(range(self.next_id, self.next_id + len(symbols)))
+            self.next_id += len(symbols)
+            self.open.update(zip(symbols, trace_ids))
+            self._record_many(trace_ids, symbols, "bar_received")
+        self._flush_if_full()
+
+    def mark(self, stage, symbols=None):
+        """Records `stage` for the open traces of `symbols` (default: every open trace)."""
+        if not self.enabled or not self.open:
+            return
+        with self.lock:
+            symbols = [symbol for symbol in (self.open if symbols is None else symbols) if symbol in self.open]
+            if len(symbols) == 1:
+                self._record(self.open[symbols[0]], symbols[0], stage)
+            elif symbols:
+                self._record_many([self.open[symbol] for symbol in symbols], symbols, stage)
+        self._flush_if_full()
+
+    def finish(self, stage, symbols=None):
+        """Records the last stage for `symbols` and closes their traces."""
+        if not self.enabled:
+            return
+        if symbols is None:
+            with self.lock:
+                symbols = list(self.open)
+        self.mark(stage, symbols)
+        self.close(symbols)
+
+    def close(self, symbols):
+        """Closes traces without recording a stage (e.g. no order was placed)."""
+        with self.lock:
+            for symbol in symbols:
+                self.open.pop(symbol, None)
+
+    ### Storage
+
+    def create_table(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS trace_events (
+                trace_id INTEGER,
+                symbol TEXT,
+                stage TEXT,
+                ts_ns INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trace_events_trace ON trace_events (trace_id)")
+        self.table_ready = True
+
+    def request_flush(self):
+        """Flushes on the db executor when called from the event loop, inline otherwise."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            loop.run_in_executor(get_executor("db"), self.flush)
+
+    def flush(self):
+        """Writes every unflushed event in one executemany."""
+        with self.flush_lock:
+            self.flush_scheduled = False
+            return self._flush()
+
+    def _flush(self):
+        with self.lock:
+            start, end = self.flushed, self.head  # Events recorded while writing wait for the next flush
+            if end == start:
+                return 0
+            indices = np.arange(start, end) % self.size
+            events = (self.trace_ids[indices], self.symbol_codes[indices], self.stage_codes[indices], self.times[indices])
+            symbol_names = list(self.symbols)
+            self.flushed = end  # Copied out, so recorders may overwrite these slots without dropping them
+
+        rows = [
+            (int(trace_id), symbol_names[symbol], STAGES[stage], int(ts) + self.wall_offset_ns)
+            for trace_id, symbol, stage, ts in zip(*events)
+        ]
+        try:
+            with sqlite3.connect(self.db_file) as conn:
+                if not self.table_ready:
+                    self.create_table(conn)
+                conn.executemany("INSERT INTO trace_events (trace_id, symbol, stage, ts_ns) VALUES (?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            print(f"[WARN] Failed to flush {len(rows)} trace events: {e}")
+            with self.lock:
+                self.dropped += len(rows)
+            return 0
+
+        if self.dropped:
+            if logConfig.WARN:
+                print(f"[WARN] Trace buffer overflowed: {self.dropped} events dropped so far.")
+        return len(rows)
+
+# Shared by the data pipeline, main loop and trading cycle
+tracer = Tracer()
@@ -1,33 +1,21 @@
-import os
 import json
 import time
-import pickle
+import asyncio
 import numpy as np
-import alpaca_trade_api as tradeapi
-from sklearn.preprocessing import StandardScaler
-from dotenv import load_dotenv
 import pandas as pd
 import datetime
+import services
+from orderBook import OrderBook, run_trade_updates, TERMINAL_EVENTS
+from priceService import price_service
+from tracing import tracer
+import metrics
+import logConfig
 
-dotenv_path = os.path.expanduser("~/.secrets/.env")
-load_dotenv(dotenv_path)
+ORDERS_SUBMITTED = metrics.counter("orders_submitted_total", "Orders accepted by the broker", ["side"])
+PIPELINE_ERRORS = metrics.counter("pipeline_errors_total", "Errors by pipeline stage", ["stage"])
+TRADING_CYCLE_SECONDS = metrics.histogram("trading_cycle_seconds", "Snapshot, prediction, pricing, decisions and order submission")
 
-api_key = os.getenv("alpaca_api_key")
-api_secret = os.getenv("alpaca_api_secret")
-base_url = os.getenv("alpaca_api_endpoint")
-
-# Initialize Alpaca API Client
-api = tradeapi.REST(api_key, api_secret, base_url, api_version="v2")
-
-# Load Trained Model & Scaler
-MODEL_FILE = "model/RandomForest.pkl"
-SCALER_FILE = "model/scaler.pkl"
-
-with open(MODEL_FILE, "rb") as f:
-    model = pickle.load(f)
-
-with open(SCALER_FILE, "rb") as f:
-    scaler = pickle.load(f)
+# Clients, model and scaler are created on first use through services (no I/O at import)
 
 # Trading Variables
 INITIAL_CASH = 100000  # Start with $100,000
@@ -37,61 +25,44 @@ pending_orders = {}  # Track ongoing orders
 SHORT_THRESHOLD = -0.17  # Threshold for considering a short position
 MAX_SHARES = 10       # Maximum shares to hold (long or short)
 
-def get_account_cash():
-    """Fetch available cash balance from Alpaca."""
-    try:
-        account = api.get_account()
-        return float(account.cash)  # Convert string to float
-    except Exception as e:
-        print(f"Error fetching account cash balance: {e}")
-        return None
-
-cash = get_account_cash()
-
-
-def get_positions():
-    """Fetch all open positions from Alpaca and return as a dictionary."""
-    try:
-        positions = {}
-        alpaca_positions = api.list_positions()
-        for position in alpaca_positions:
-            symbol = position.symbol
-            positions[symbol] = {
-                "quantity": int(position.qty),  # Convert string to int
-                "avg_price": float(position.avg_entry_price)  # Convert string to float
-            }
-        return positions
-    except Exception as e:
-        print(f"Error fetching positions: {e}")
-        return {}
-
-positions = get_positions()
-
-def get_pending_orders():
-    """Fetch all pending orders from Alpaca."""
-    try:
-        orders = api.list_orders(status="open")  # Get open orders
-        pending = {order.symbol: order.side for order in orders}
-        return pending
-    except Exception as e:
-        print(f"Error fetching pending orders: {e}")
-        return {}
-
-pending_orders = get_pending_orders()
-
-
 def predict_next_open(features):
     """Uses the trained model to predict the next open price."""
-    
+    compiled_model = services.get_compiled_model()
+    if compiled_model is not None:
+        return compiled_model.predict_one(np.asarray(features, dtype=np.float64))
+
+    model, scaler = services.get_model(), services.get_scaler()
     feature_df = pd.DataFrame([features], columns=scaler.feature_names_in_)
     features_scaled = scaler.transform(feature_df)
     
     return model.predict(features_scaled)[0]
 
+def predict_next_open_batch(feature_matrix):
+    """Predicts the next open price for every row of a feature matrix in one call."""
+    compiled_model = services.get_compiled_model()
+    if compiled_model is not None:
+        return compiled_model.predict(feature_matrix)
+
+    model, scaler = services.get_model(), services.get_scaler()
+    feature_df = pd.DataFrame(feature_matrix, columns=scaler.feature_names_in_)
+    features_scaled = scaler.transform(feature_df)
+
+    return model.predict(features_scaled)
+
+async def get_latest_prices(symbols):
+    """Latest prices for many symbols from the price service: {symbol: price}.
+
+    Symbols kept fresh by the market-data stream are memory reads; the rest share one snapshot request.
+    """
+    return await price_service.get_prices(symbols, services.get_broker())
+
 def get_latest_price(symbol):
-    """Fetches the latest price from Alpaca."""
+    """Latest price from the price service, falling back to a REST call if it is stale."""
+    price = price_service.latest_price(symbol)
+    if price is not None:
+        return price
     try:
-        return float(api.get_latest_trade(symbol).price)
+        return float(services.get_rest_api().get_latest_trade(symbol).price)
     except Exception as e:
         print(f"Error fetching price for {symbol}: {e}")
         return None
@@ -99,25 +70,149 @@ def get_latest_price(symbol):
 # Maintain local pending orders
 local_pending_orders = {}
 
-def clear_completed_orders():
+def clear_completed_orders(open_orders):
     """
-    Checks completed orders on Alpaca and clears them from local_pending_orders.
+    Clears local_pending_orders entries that no longer have an open order on Alpaca.
+    `open_orders` is the snapshot's {symbol: {side: [orders]}} index.
     """
     global local_pending_orders
-    completed_symbols = []
-    for symbol, side in local_pending_orders.items():
-        try:
-            orders = api.list_orders(status='closed', symbols=[symbol], limit=1)
-            if orders:  # If there are closed orders for this symbol
-                completed_symbols.append(symbol)
-        except Exception as e:
-            print(f"Error checking order status for {symbol}: {e}")
-            continue
+    completed_symbols = [symbol for symbol in local_pending_orders if symbol not in open_orders]
 
     # Clear completed symbols from local_pending_orders
     for symbol in completed_symbols:
         del local_pending_orders[symbol]
-        print(f"[INFO] Cleared completed order for {symbol} from local pending orders.")
+        if logConfig.INFO:
+            print(f"[INFO] Cleared completed order for {symbol} from local pending orders.")
+
+### =========================
+###   ACCOUNT SNAPSHOT
+### =========================
+
+class AccountSnapshot:
+    """
+    Cash, positions and open orders fetched once per trading cycle.
+
+    Every decision in the cycle reads from memory instead of making its own REST calls.
+    While the trade_updates stream is live the snapshot copies the order book. Otherwise
+    it polls REST, and our own submissions are recorded into the snapshot until the
+    next cycle's refresh lists them.
+    """
+
+    def __init__(self):
+        self.cash = None
+        self.reserved_cash = 0.0    # Net cash of the orders planned this cycle
+        self.held_cash = {}         # {order_id: cash} of our submitted buys until they leave the open orders
+        self.positions = {}         # {symbol: {quantity, avg_price}}
+        self.open_orders = {}       # {symbol: {side: {order_id: order}}}
+
+    async def refresh(self):
+        """Reads the live order book, or fetches cash, positions and open orders concurrently."""
+        if order_book.live:
+            # The book is kept current by trade updates; copy it instead of polling, so
+            # local bookkeeping on the snapshot never writes into the book
+            self.cash = order_book.cash
+            self.positions = {symbol: dict(position) for symbol, position in order_book.positions.items()}
+            self.open_orders = {symbol: {side: dict(orders) for side, orders in sides.items()}
+                                for symbol, sides in order_book.open_orders.items()}
+        else:
+            broker = services.get_broker()
+            account, alpaca_positions, orders = await asyncio.gather(
+                broker.get_account(), broker.list_positions(), broker.list_orders(status="open"),
+                return_exceptions=True
+            )
+
+            if isinstance(account, Exception):
+                print(f"Error fetching account cash balance: {account}")
+                self.cash = None
+            else:
+                self.cash = float(account.cash)  # Convert string to float
+
+            if isinstance(alpaca_positions, Exception):
+                print(f"Error fetching positions: {alpaca_positions}")
+                alpaca_positions = []
+            self.positions = {
+                position.symbol: {"quantity": int(position.qty), "avg_price": float(position.avg_entry_price)}
+                for position in alpaca_positions
+            }
+
+            if isinstance(orders, Exception):
+                print(f"Error fetching pending orders: {orders}")
+                orders = []
+            open_orders = {}
+            for order in orders:
+                open_orders.setdefault(order.symbol, {}).setdefault(order.side, {})[order.id] = order
+            self.open_orders = open_orders
+
+        # Local pending orders are done once Alpaca no longer lists them as open
+        clear_completed_orders(self.open_orders)
+
+    async def start_cycle(self):
+        """
+        Takes the cycle's snapshot and releases the previous cycle's reservations, except the
+        cash of submitted buys that are still open (neither REST nor the book has charged it yet).
+        """
+        self.reserved_cash = 0.0
+        await self.refresh()
+        open_ids = {order_id for sides in self.open_orders.values() for orders in sides.values() for order_id in orders}
+        self.held_cash = {order_id: cash for order_id, cash in self.held_cash.items() if order_id in open_ids}
+
+    def pending_orders(self):
+        """Open orders as {symbol: side}."""
+        return {symbol: side for symbol, sides in self.open_orders.items() for side in sides}
+
+    def find_similar_order(self, symbol, side, open_price, tolerance=0.05):
+        """Returns an open limit order for the symbol and side priced within `tolerance`, or None."""
+        for order in self.open_orders.get(symbol, {}).get(side, {}).values():
+            if order.limit_price is not None and abs(float(order.limit_price) - open_price) <= tolerance:
+                return order
+        return None
+
+    def available_cash(self):
+        """Cash less this cycle's reservations, or None if the balance is unknown."""
+        if self.cash is None:
+            return None
+        return self.cash - self.reserved_cash - sum(self.held_cash.values())
+
+    def reserve(self, side, quantity, price):
+        """
+        Reserves the estimated cash of an order planned this cycle, so later decisions see it.
+        Kept apart from `cash`, so refreshes (from REST or the live book) within the cycle keep it.
+        """
+        self.reserved_cash += -quantity * price if side == "sell" else quantity * price  # Estimating
+
+    def record_submission(self, order, symbol, side, quantity, price):
+        """Adds our own submitted order to the snapshot and holds a buy's cash."""
+        if order is not None and side == "buy":
+            self.held_cash[order.id] = quantity * price
+            self.reserved_cash -= quantity * price  # Now held until the order is done
+        if order_book.live:
+            order_book.record_submission(order)  # Trade updates will confirm it
+            return
+
+        if order is not None:
+            self.open_orders.setdefault(symbol, {}).setdefault(side, {})[order.id] = order
+
+account_snapshot = AccountSnapshot()
+
+### =========================
+###   TRADE UPDATES
+### =========================
+
+# Local order/position book, kept current by the trade_updates stream
+order_book = OrderBook()
+
+def on_order_update(event, order):
+    """Clears a local pending order once the broker reports it done and nothing else is open for the symbol."""
+    if event in TERMINAL_EVENTS and order.symbol in local_pending_orders and not order_book.has_open_order(order.symbol):
+        del local_pending_orders[order.symbol]
+        if logConfig.INFO:
+            print(f"[INFO] {order.symbol} order {event}. Cleared from local pending orders.")
+
+order_book.add_listener(on_order_update)
+
+async def start_trade_updates():
+    """Runs the trade_updates stream that feeds the order book."""
+    await run_trade_updates(order_book, services.get_broker())
 
 def update_local_positions(symbol, quantity, open_price, side):
     """Updates the local positions dictionary after a trade."""
@@ -142,37 +237,40 @@ def is_order_pending(symbol, side, open_price):
     """
     Checks if a similar order is already pending for the given symbol and side.
     """
-    try:
-        orders = api.list_orders(status='open', symbols=[symbol])
-        for order in orders:
-            if order.side == side and abs(float(order.limit_price) - open_price) <= 0.05:  #Adjust tolerance as needed
-                print(f"[SKIP] Similar {side} order for {symbol} already pending (Order ID: {order.id}).")
-                return True
-        return False
-    except Exception as e:
-        print(f"[ERROR] Error checking pending orders: {e}")
-        return False
+    order = account_snapshot.find_similar_order(symbol, side, open_price)  #Adjust tolerance as needed
+    if order is not None:
+        print(f"[SKIP] Similar {side} order for {symbol} already pending (Order ID: {order.id}).")
+        return True
+    return False
+
+def plan_trade(symbol, quantity, side, label, open_price, predicted_next_open, cash, trade_time):
+    """Builds an order request and reserves its estimated cash in the snapshot for the rest of the cycle."""
+    account_snapshot.reserve(side, quantity, open_price)
+    return {
+        "order": {"symbol": symbol, "qty": quantity, "side": side, "type": "market", "time_in_force": "gtc"},
+        "label": label,
+        "open_price": open_price,
+        "predicted_next_open": predicted_next_open,
+        "cash": cash,
+        "trade_time": trade_time,
+    }
 
 def execute_trade(symbol, open_price, predicted_next_open, cash=None, positions=None):
-    global local_pending_orders
+    """Decides the trade for one symbol from the account snapshot. Returns an order request or None."""
 
-    # Fetch latest account details
-    cash = get_account_cash()
-    positions = get_positions()
-    alpaca_pending_orders = get_pending_orders()
-
-    # Clear completed orders from local pending orders
-    clear_completed_orders()
+    # Read account details from the per-cycle snapshot
+    cash = account_snapshot.available_cash()
+    positions = account_snapshot.positions
 
     # Merge API and local pending orders
-    pending_orders = {**alpaca_pending_orders, **local_pending_orders}
+    pending_orders = {**account_snapshot.pending_orders(), **local_pending_orders}
 
     trade_time = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
     # Prevent duplicate trades
     if symbol in pending_orders:
         print(f"[SKIP] {trade_time} | Order already pending for {symbol}, skipping new order.")
-        return
+        return None
 
     # Check for existing positions (long or short)
     current_position = 0
@@ -187,63 +285,33 @@ def execute_trade(symbol, open_price, predicted_next_open, cash=None, positions=
        #New Check
         if is_order_pending(symbol, "buy", open_price):
             print(f"[TRADE] Order to buy {symbol} has already been created")
-            return
+            return None
             #If we hold less than 10 shares of the stock, long
 
         quantity_to_buy = MAX_SHARES - current_position
         if quantity_to_buy > 0: #If shares are more than the positions, then create it
            quantity = int(min(quantity_to_buy,min(3000, cash) / open_price))#If its still less than the max, then put in quantity
            if quantity > 0 and cash >= quantity * open_price:
-                try:
-                    api.submit_order(
-                        symbol=symbol,
-                        qty=quantity,
-                        side="buy",
-                        type="market",
-                        time_in_force="gtc",
-                    )
-                    print(f"\n[TRADE] {trade_time} | BUY {quantity} shares of {symbol} (Long)")
-                    print(f"        Open Price: {open_price:.2f} | Predicted Next Open: {predicted_next_open:.2f}")
-                    print(f"        Cash Remaining: {cash - (quantity * open_price):.2f}") #Estimating
-
-                    update_local_positions(symbol, quantity, open_price, "buy")  # Update local positions
-                    local_pending_orders[symbol] = "buy"
-                except Exception as e:
-                    print(f"[ERROR] {trade_time} | Error submitting buy order for {symbol}: {e}")
+                return plan_trade(symbol, quantity, "buy", "Long", open_price, predicted_next_open, cash, trade_time)
            else:
                 print(f"[TRADE] Max shares limit met or insufficient cash to buy {symbol}")
         else:
             print(f"[TRADE] Order has already been created to buy {symbol}")
-            return
+            return None
     elif (predicted_next_open < open_price and long_position):
         # Sell Condition (Long - Close)
         if is_order_pending(symbol, "sell", open_price):
             print(f"[TRADE] Order to sell {symbol} has already been created")
-            return
+            return None
         # Check that we actually own the stock to sell it
         quantity = positions[symbol]["quantity"]  # Sell entire position
-        try:
-            api.submit_order(
-                symbol=symbol,
-                qty=quantity,
-                side="sell",
-                type="market",
-                time_in_force="gtc",
-            )
-            print(f"\n[TRADE] {trade_time} | SELL {quantity} shares of {symbol} (Close Long)")
-            print(f"        Open Price: {open_price:.2f} | Predicted Next Open: {predicted_next_open:.2f}")
-            print(f"        Cash After Sale: {cash + (quantity * open_price):.2f}")  # Estimating
-
-            update_local_positions(symbol, quantity, open_price, "sell")  # Update local positions
-            local_pending_orders[symbol] = "sell"
-        except Exception as e:
-            print(f"[ERROR] {trade_time} | Error submitting sell order for {symbol}: {e}")
+        return plan_trade(symbol, quantity, "sell", "Close Long", open_price, predicted_next_open, cash, trade_time)
     # Short Condition (Selling Short)
     elif predicted_next_open < open_price + SHORT_THRESHOLD:  # Use a more significant negative threshold
 
         if is_order_pending(symbol, "sell", open_price):
            print(f"[TRADE] Order to short {symbol} has already been created")
-           return
+           return None
 
             #If the existing short plus the total is still less than the total, we allow it
 
@@ -251,108 +319,161 @@ def execute_trade(symbol, open_price, predicted_next_open, cash=None, positions=
         if quantity_to_short > 0:
             quantity = int(min(quantity_to_short, min(500, cash) / open_price))
             if quantity > 0:
-                try:
-                   api.submit_order(
-                       symbol=symbol,
-                       qty=quantity,
-                       side="sell",
-                       type="market",
-                       time_in_force="gtc",
-                   )
-                   print(f"\n[TRADE] {trade_time} | SELL {quantity} shares of {symbol} (Short)")
-                   print(f"        Open Price: {open_price:.2f} | Predicted Next Open: {predicted_next_open:.2f}")
-                   print(f"        Cash increased by: {(quantity * open_price):.2f}")  # Estimating
-
-                   update_local_positions(symbol, quantity, open_price, "sell")  # Selling short is like selling
-                   local_pending_orders[symbol] = "sell"
-                except Exception as e:
-                   print(f"[ERROR] {trade_time} | Error submitting short order for {symbol}: {e}")
+                return plan_trade(symbol, quantity, "sell", "Short", open_price, predicted_next_open, cash, trade_time)
             else:
                 print(f"[TRADE] Max shares limit met to short {symbol}")
-                return #Skip code if it has been ordered to max
+                return None #Skip code if it has been ordered to max
         else:
             print(f"[TRADE] Has already been shorted to the max for  {symbol}")
-            return #Skip code if it has been ordered to max
+            return None #Skip code if it has been ordered to max
 
     # Buy Condition (Cover Short)
     elif predicted_next_open >= open_price and symbol in positions and positions[symbol]["quantity"] < 0:
         # If order has already been placed, skip
         if is_order_pending(symbol, "buy", open_price):
            print(f"[TRADE] Order to cover the short position for {symbol} has already been created")
-           return
+           return None
         quantity = abs(positions[symbol]["quantity"])  # Buy to cover entire short position
-        try:
-            api.submit_order(
-                symbol=symbol,
-                qty=quantity,
-                side="buy",
-                type="market",
-                time_in_force="gtc",
-            )
-            print(f"\n[TRADE] {trade_time} | BUY {quantity} shares of {symbol} (Cover Short)")
-            print(f"        Open Price: {open_price:.2f} | Predicted Next Open: {predicted_next_open:.2f}")
-            # I think we need to make it so that we have an idea of how much cash is added, but this is only an estimate
-            print(f"        Cash reduced by: {(quantity * open_price):.2f}")  # Estimating
+        return plan_trade(symbol, quantity, "buy", "Cover Short", open_price, predicted_next_open, cash, trade_time)
+
+    return None
+
+def print_trade(trade):
+    """Prints the confirmation lines for a submitted trade."""
+    order = trade["order"]
+    symbol, quantity, open_price = order["symbol"], order["qty"], trade["open_price"]
+
+    print(f"\n[TRADE] {trade['trade_time']} | {order['side'].upper()} {quantity} shares of {symbol} ({trade['label']})")
+    print(f"        Open Price: {open_price:.2f} | Predicted Next Open: {trade['predicted_next_open']:.2f}")
+    # Cash figures are only estimates until the fills come back
+    if trade["label"] == "Long":
+        print(f"        Cash Remaining: {trade['cash'] - (quantity * open_price):.2f}")
+    elif trade["label"] == "Close Long":
+        print(f"        Cash After Sale: {trade['cash'] + (quantity * open_price):.2f}")
+    elif trade["label"] == "Short":
+        print(f"        Cash increased by: {(quantity * open_price):.2f}")
+    else:
+        print(f"        Cash reduced by: {(quantity * open_price):.2f}")
+
+async def submit_trades(trades):
+    """Submits every planned order concurrently (one round-trip of wall-clock time) and records the results."""
+    if not trades:
+        return
+
+    results = await services.get_broker().submit_orders([trade["order"] for trade in trades])
+
+    for trade, result in zip(trades, results):
+        symbol, side, quantity = trade["order"]["symbol"], trade["order"]["side"], trade["order"]["qty"]
+        if isinstance(result, Exception):
+            print(f"[ERROR] {trade['trade_time']} | Error submitting {trade['label'].lower()} order for {symbol}: {result}")
+            PIPELINE_ERRORS.labels("order_submit").inc()
+            continue
 
-            update_local_positions(symbol, quantity, open_price, "buy")  # Buying to cover is like buying
-            local_pending_orders[symbol] = "buy"
-        except Exception as e:
-            print(f"[ERROR] {trade_time} | Error submitting buy order for {symbol}: {e}")
+        print_trade(trade)
+        ORDERS_SUBMITTED.labels(side).inc()
+        update_local_positions(symbol, quantity, trade["open_price"], side)  # Update local positions
+        local_pending_orders[symbol] = side
+        account_snapshot.record_submission(result, symbol, side, quantity, trade["open_price"])
 
 def synchronize_positions():
     """Synchronizes local positions with Alpaca account positions."""
     global positions
 
     try:
-        alpaca_positions = get_positions()  # Fetch positions from Alpaca
+        alpaca_positions = account_snapshot.positions  # Positions from this cycle's snapshot
         local_symbols = set(positions.keys())
         alpaca_symbols = set(alpaca_positions.keys())
 
         # Handle symbols present only locally
         for symbol in local_symbols - alpaca_symbols:
-            print(f"[WARN] Symbol {symbol} found locally but not on Alpaca.  Removing local position.")
+            if logConfig.WARN:
+                print(f"[WARN] Symbol {symbol} found locally but not on Alpaca.  Removing local position.")
             del positions[symbol]
 
         # Update/Add symbols from Alpaca
         for symbol, alpaca_pos in alpaca_positions.items():
             if symbol in positions:
                 if positions[symbol]["quantity"] != int(alpaca_pos["quantity"]):  # Need to convert the value of alpaca_pos to integer because that is what was done in the api call
-                    print(
-                        f"[INFO] Quantity mismatch for {symbol}. Local: {positions[symbol]['quantity']}, Alpaca: {alpaca_pos['quantity']}.  Updating local position.")
+                    if logConfig.INFO:
+                        print(
+                            f"[INFO] Quantity mismatch for {symbol}. Local: {positions[symbol]['quantity']}, Alpaca: {alpaca_pos['quantity']}.  Updating local position.")
                     positions[symbol]["quantity"] = int(alpaca_pos["quantity"])
                     positions[symbol]["avg_price"] = float(alpaca_pos["avg_entry_price"])  # Important: update avg_price too
             else:
-                print(f"[INFO] New position found on Alpaca: {symbol}.  Adding to local positions.")
-                positions[symbol] = alpaca_pos
+                if logConfig.INFO:
+                    print(f"[INFO] New position found on Alpaca: {symbol}.  Adding to local positions.")
+                positions[symbol] = dict(alpaca_pos)  # A copy: the snapshot's dicts stay untouched
 
-        print("[INFO] Local positions synchronized with Alpaca account.")
+        if logConfig.INFO:
+            print("[INFO] Local positions synchronized with Alpaca account.")
 
     except Exception as e:
         print(f"[ERROR] Error synchronizing positions: {e}")
 
-def trading_loop(features_dict):
+async def trading_loop(features_dict):
     """Runs the trading bot using the latest data from the database."""
 
-    # Synchronize positions at the start of each loop or periodically
-    synchronize_positions()
-
+    # Build one feature matrix for every symbol with updated features
+    expected_features = len(services.get_scaler().feature_names_in_)
+    symbols = []
+    rows = []
     for symbol, features in features_dict.items():
-        open_price = get_latest_price(symbol)
-        if open_price is None:
-            continue
-
         # Convert features to list (if it's a Pandas Series or NumPy array)
         features = list(features)
 
-        # Remove the unwanted columns (open = index 1, symbol = index 0)
-        features_filtered = [features[i] for i in range(len(features)) if i not in [0]]
+        # Remove the unwanted columns (symbol = index 0)
+        features_filtered = features[1:]
 
         # Ensure feature size matches model expectations
-        expected_features = len(scaler.feature_names_in_)
         if len(features_filtered) != expected_features:
             print(f"[ERROR] Feature count mismatch for {symbol}: Expected {expected_features}, got {len(features_filtered)}")
             continue
 
-        predicted_next_open = predict_next_open(features_filtered)
-        print(f"stock {symbol}, current at {features[1]}, predicted to be {predicted_next_open}")
-        execute_trade(symbol, open_price, predicted_next_open)
\ No newline at end of file
+        symbols.append(symbol)
+        rows.append(features_filtered)
+
+    if not symbols:
+        return
+
+    await trade_symbols(symbols, np.array(rows, dtype=np.float64))
+
+async def trade_symbols(symbols, feature_matrix):
+    """Runs one trading cycle on a feature matrix (one row per symbol, model feature order)."""
+    expected_features = len(services.get_scaler().feature_names_in_)
+    if feature_matrix.shape[1] != expected_features:
+        print(f"[ERROR] Feature count mismatch: Expected {expected_features}, got {feature_matrix.shape[1]}")
+        return
+
+    cycle_start = time.perf_counter()
+
+    # One account snapshot per cycle, then synchronize positions from it
+    await account_snapshot.start_cycle()
+    synchronize_positions()
+
+    # Scale and predict the whole universe in one call
+    predictions = predict_next_open_batch(feature_matrix)
+    tracer.mark("predicted", symbols)
+
+    # Latest prices for every symbol (memory reads, one snapshot request for stale ones)
+    latest_prices = await get_latest_prices(symbols)
+    tracer.mark("priced", symbols)
+
+    trades = []
+    for symbol, current_open, predicted_next_open in zip(symbols, feature_matrix[:, 0], predictions):
+        open_price = latest_prices.get(symbol)
+        if open_price is None:
+            continue
+
+        if logConfig.DEBUG:
+            print(f"stock {symbol}, current at {current_open}, predicted to be {predicted_next_open}")
+        trade = execute_trade(symbol, open_price, float(predicted_next_open))
+        if trade is not None:
+            trades.append(trade)
+
+    tracer.mark("decided", symbols)
+
+    # Submit the whole cycle's orders concurrently
+    await submit_trades(trades)
+    tracer.finish("submitted", [trade["order"]["symbol"] for trade in trades])
+    tracer.close(symbols)
+    TRADING_CYCLE_SECONDS.observe(time.perf_counter() - cycle_start)
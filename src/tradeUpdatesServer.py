@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import json
+import asyncio
+import argparse
+import websockets
+
+# Local stand-in for Alpaca's trade_updates WebSocket, used to exercise orderBook.py without a broker
+
+class TradeUpdatesServer:
+    """Speaks the auth/listen handshake of Alpaca's trading stream and broadcasts trade updates."""
+
+    def __init__(self, host="127.0.0.1", port=8765):
+        self.host = host
+        self.port = port
+        self.clients = set()
+        self.server = None
+
+    async def handler(self, ws):
+        """Performs the handshake, then keeps the client subscribed until it disconnects."""
+        auth = json.loads(await ws.recv())
+        if auth.get("action") != "auth":
+            await ws.close()
+            return
+        await ws.send(json.dumps({"stream": "authorization", "data": {"status": "authorized", "action": "authenticate"}}))
+
+        listen = json.loads(await ws.recv())
+        streams = listen.get("data", {}).get("streams", [])
+        await ws.send(json.dumps({"stream": "listening", "data": {"streams": streams}}))
+
+        self.clients.add(ws)
+        try:
+            await ws.wait_closed()
+        finally:
+            self.clients.discard(ws)
+
+    async def start(self):
+        self.server = await websockets.serve(self.handler, self.host, self.port)
+        print(f"[TradeUpdatesServer] Listening on ws://{self.host}:{self.port}")
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def publish(self, data):
+        """Broadcasts one trade update payload ({"event", "order", ...}) to every listening client."""
+        message = json.dumps({"stream": "trade_updates", "data": data})
+        for ws in list(self.clients):
+            try:
+                await ws.send(message)
+            except websockets.ConnectionClosed:
+                self.clients.discard(ws)
+
+    async def replay(self, events_file, interval):
+        """Waits for a client, then replays trade update payloads from a JSON lines file."""
+        while not self.clients:
+            await asyncio.sleep(0.1)
+
+        with open(events_file) as f:
+            for line in f:
+                if line.strip():
+                    await self.publish(json.loads(line))
+                    await asyncio.sleep(interval)
+        print("[TradeUpdatesServer] Replay complete.")
+
+
+async def main(opt):
+    server = TradeUpdatesServer(opt.host, opt.port)
+    await server.start()
+    if opt.file:
+        await server.replay(opt.file, opt.interval)
+    await asyncio.Future()  # Serve until interrupted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="usage: tradeUpdatesServer -p port [-f events.jsonl]")
+    parser.add_argument("--host", action="store", dest="host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", action="store", dest="port", type=int, default=8765)
+    parser.add_argument("-f", "--file", action="store", dest="file", help="JSON lines file of trade update payloads")
+    parser.add_argument("-t", "--time-interval", action="store", dest="interval", type=float, default=0.5)
+
+    opt = parser.parse_args()
+    try:
+        asyncio.run(main(opt))
+    except KeyboardInterrupt:
+        print("\nShutting down trade updates server...")
@@ -1,5 +1,9 @@
+import os
+import json
+import shutil
 import sqlite3
 import pickle
+import hashlib
 import config
 import numpy as np
 import pandas as pd
@@ -14,6 +18,13 @@ from tensorflow.keras.layers import Dense, Dropout
 from tensorflow.keras.optimizers import Adam
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 
+# Train/test split configuration (part of the preprocessing cache key)
+TEST_SIZE = 0.2
+RANDOM_STATE = 99
+
+# Bump when preprocess_data changes so stale cache entries are not reused
+PREPROCESS_VERSION = 1
+
 ### =========================
 ###   DATABASE FUNCTIONS
 ### =========================
@@ -40,11 +51,85 @@ def load_data():
 
     return df, features
 
+### =========================
+###   PREPROCESSING CACHE
+### =========================
+
+def compute_cache_key(df, features):
+    """Hash the source rows, feature list and split config into a cache key."""
+    hasher = hashlib.sha256()
+    hasher.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    hasher.update(json.dumps({
+        "columns": list(df.columns),
+        "features": list(features),
+        "test_size": TEST_SIZE,
+        "random_state": RANDOM_STATE,
+        "version": PREPROCESS_VERSION,
+    }).encode())
+    return hasher.hexdigest()[:20]
+
+def load_cached_matrices(cache_key):
+    """Load memory-mapped train/test matrices for `cache_key`, or None on a miss."""
+    cache_path = os.path.join(config.CACHE_DIR, cache_key)
+    if not os.path.exists(os.path.join(cache_path, "meta.json")):
+        return None
+
+    try:
+        with open(os.path.join(cache_path, "meta.json")) as f:
+            meta = json.load(f)
+
+        X_train = np.load(os.path.join(cache_path, "X_train.npy"), mmap_mode="r")
+        X_test = np.load(os.path.join(cache_path, "X_test.npy"), mmap_mode="r")
+        y_train = pd.Series(np.load(os.path.join(cache_path, "y_train.npy")),
+                            index=np.load(os.path.join(cache_path, "train_index.npy")), name="next_open")
+        y_test = pd.Series(np.load(os.path.join(cache_path, "y_test.npy")),
+                           index=np.load(os.path.join(cache_path, "test_index.npy")), name="next_open")
+        df = pd.read_pickle(os.path.join(cache_path, "frame.pkl"))
+
+        # Keep model/scaler.pkl consistent with the matrices the models are trained on
+        shutil.copyfile(os.path.join(cache_path, "scaler.pkl"), "model/scaler.pkl")
+    except Exception as e:
+        print(f"[WARN] Ignoring unreadable preprocessing cache {cache_key}: {e}")
+        return None
+
+    return X_train, X_test, y_train, y_test, df, meta["features"]
+
+def save_cached_matrices(cache_key, X_train, X_test, y_train, y_test, df, features, scaler):
+    """Write preprocessed matrices to the cache directory for `cache_key`."""
+    cache_path = os.path.join(config.CACHE_DIR, cache_key)
+    tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+
+    np.save(os.path.join(tmp_path, "X_train.npy"), np.ascontiguousarray(X_train))
+    np.save(os.path.join(tmp_path, "X_test.npy"), np.ascontiguousarray(X_test))
+    np.save(os.path.join(tmp_path, "y_train.npy"), y_train.to_numpy())
+    np.save(os.path.join(tmp_path, "y_test.npy"), y_test.to_numpy())
+    np.save(os.path.join(tmp_path, "train_index.npy"), y_train.index.to_numpy())
+    np.save(os.path.join(tmp_path, "test_index.npy"), y_test.index.to_numpy())
+    df.to_pickle(os.path.join(tmp_path, "frame.pkl"))
+    with open(os.path.join(tmp_path, "scaler.pkl"), "wb") as f:
+        pickle.dump(scaler, f)
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"features": features, "train_shape": X_train.shape, "test_shape": X_test.shape}, f)
+
+    # Publish atomically so a concurrent or interrupted run never sees a partial entry
+    try:
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
 ### =========================
 ###   DATA PREPROCESSING
 ### =========================
-def preprocess_data(df, features):
-    """Prepare data for training."""
+def preprocess_data(df, features, use_cache=True):
+    """Prepare data for training, reusing cached matrices when the inputs are unchanged."""
+    cache_key = compute_cache_key(df, features) if use_cache else None
+    if cache_key:
+        cached = load_cached_matrices(cache_key)
+        if cached is not None:
+            print(f"Loaded preprocessed data from cache {cache_key}.")
+            return cached
+
     print(f"Original data shape: {df.shape}")
 
     df = df.sort_values(["symbol", "timestamp"])
@@ -81,7 +166,7 @@ def preprocess_data(df, features):
 
     # Split dataset
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=99
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
     )
 
     print(f"Train shape: {X_train.shape}, Test shape: {X_test.shape}")
@@ -97,6 +182,10 @@ def preprocess_data(df, features):
     with open("model/scaler.pkl", "wb") as f:
         pickle.dump(scaler, f)
 
+    if cache_key:
+        save_cached_matrices(cache_key, X_train_scaled, X_test_scaled, y_train, y_test, df, features, scaler)
+        print(f"Saved preprocessed data to cache {cache_key}.")
+
     return X_train_scaled, X_test_scaled, y_train, y_test, df, features
 
 
@@ -154,7 +243,7 @@ def train_and_evaluate_model(model, model_name, X_train, X_test, y_train, y_test
 ###   TRAIN ALL MODELS
 ### =========================
 
-def train_all_models():
+def train_all_models(use_cache=True):
     """Load data, preprocess, and train multiple models on full dataset."""
     df, features = load_data()
     
@@ -162,7 +251,7 @@ def train_all_models():
         print("No data available for training.")
         return
 
-    X_train, X_test, y_train, y_test, df,features = preprocess_data(df, features)
+    X_train, X_test, y_train, y_test, df,features = preprocess_data(df, features, use_cache=use_cache)
 
     # Train Random Forest with Hyperparameter Tuning
     rf_model = RandomForestRegressor(random_state=99)
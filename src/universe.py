@@ -0,0 +1,90 @@
+import os
+import csv
+import sqlite3
+import config
+
+### =========================
+###   SYMBOL UNIVERSE
+### =========================
+
+class Universe:
+    """
+    The tradable symbols, each with a stable integer ID (its position in load order).
+
+    Per-symbol state elsewhere (feature matrix rows, price arrays, shared-memory ring
+    records) is indexed by this ID, so every process that loads the same source
+    agrees on it without exchanging symbol strings.
+    """
+
+    def __init__(self, symbols, keywords=None):
+        self.symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+        self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        keywords = keywords or {}
+        # Symbols without BlueSky keywords are searched by cashtag
+        self.keywords = {symbol: keywords.get(symbol) or [f"${symbol}"] for symbol in self.symbols}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.ids
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def id(self, symbol):
+        return self.ids[symbol]
+
+    def symbol(self, symbol_id):
+        return self.symbols[symbol_id]
+
+    def shard(self, count):
+        """Splits the universe into `count` contiguous ID ranges (one per worker), dropping empty ones."""
+        count = max(1, min(count, len(self.symbols)))
+        size, extra = divmod(len(self.symbols), count)
+        shards, start = [], 0
+        for i in range(count):
+            end = start + size + (i < extra)
+            shards.append(self.symbols[start:end])
+            start = end
+        return shards
+
+### =========================
+###   LOADING
+### =========================
+
+def load_universe(source=None):
+    """
+    Loads the universe from `source`:
+        None             - config.ALL_SYMBOLS with config.STOCK_DICT keywords
+        "path.csv"       - columns `symbol` and optional `keywords` ("Apple|iPhone")
+        "path.txt"       - one symbol per line
+        "table:<name>"   - SQLite table in config.DB_FILE with the same columns as the CSV
+    """
+    if not source:
+        return Universe(config.ALL_SYMBOLS, config.STOCK_DICT)
+
+    if source.startswith("table:"):
+        table = source.split(":", 1)[1]
+        with sqlite3.connect(config.DB_FILE) as conn:
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if "symbol" not in columns:
+                raise ValueError(f"Universe table {table} needs a symbol column (has {columns})")
+            select = "symbol, keywords" if "keywords" in columns else "symbol, NULL"
+            rows = conn.execute(f"SELECT {select} FROM {table} ORDER BY symbol").fetchall()
+        return Universe([row[0] for row in rows], {row[0].strip().upper(): split_keywords(row[1]) for row in rows})
+
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Universe file not found: {source}")
+
+    if source.endswith(".csv"):
+        with open(source, newline="") as f:
+            rows = list(csv.DictReader(f))
+        return Universe([row["symbol"] for row in rows],
+                        {row["symbol"].strip().upper(): split_keywords(row.get("keywords")) for row in rows})
+
+    with open(source) as f:
+        return Universe([line.split("#")[0] for line in f])
+
+def split_keywords(value):
+    return [keyword.strip() for keyword in (value or "").split("|") if keyword.strip()]